@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 
 # Add the project root to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -8,4 +9,6 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from src.main import main
 
 if __name__ == '__main__':
+    # In the frozen build, spawned queue workers must run as workers, not reopen the GUI
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,359 @@
+"""Headless batch conversion for whole logo libraries.
+
+Usage:
+    python -m src.batch INPUT_DIR -o OUTPUT_DIR [--workers N]
+    python -m src.batch --file-list files.txt -o OUTPUT_DIR
+    python -m src.batch INPUT_DIR -o OUTPUT_DIR --metrics metrics.prom
+    python -m src.batch INPUT_DIR -o OUTPUT_DIR --config formats.json
+    python -m src.batch INPUT_DIR -o OUTPUT_DIR --profile profiles/ [--profile-every 10]
+
+Every input image gets its own output folder containing all configured
+formats. Images are rendered across a process pool, one image per task.
+With ``--config`` the formats come from a JSON config file, which workers
+check for changes before every image, so edits apply without a restart.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field, replace
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+from src.config import config_manager, default_formats
+from src.core import bounded_loading, compositing, metrics, profiling
+from src.core.config_manager import AppConfig
+from src.core.encoding import PNG_PROFILES
+from src.core.error_handler import ConfigurationError, log_operation
+from src.core.image_format import OutputFormat
+from src.core.metrics import MetricsRecorder, StageMetrics
+from src.core.output_writer import OutputWriter
+from src.processors.fan_out import FanOutProcessor
+from src.processors.output_cache import OutputCache
+
+logger = logging.getLogger(__name__)
+
+# Memory ceiling of the batch CLI when neither --memory-ceiling-mb nor
+# LOGOCRAFT_MEMORY_CEILING_MB is given
+DEFAULT_MEMORY_CEILING_MB = 1024
+
+# Output cache and writer of the current process, set up once per worker by _init_worker
+_cache: Optional[OutputCache] = None
+_writer: Optional[OutputWriter] = None
+
+@dataclass
+class BatchResult:
+    """Outcome of converting a single source image."""
+    source: str
+    output_dir: str
+    outputs: int = 0
+    error: Optional[str] = None
+    cache_hits: int = 0
+    cache_misses: int = 0
+    metrics: List[StageMetrics] = field(default_factory=list)
+
+@dataclass
+class BatchSummary:
+    """Aggregate outcome of a batch run."""
+    results: List[BatchResult] = field(default_factory=list)
+    elapsed: float = 0.0
+    workers: int = 1
+    metrics: Optional[MetricsRecorder] = None
+
+    @property
+    def failed(self) -> List[BatchResult]:
+        return [result for result in self.results if result.error]
+
+    @property
+    def cache_hits(self) -> int:
+        return sum(result.cache_hits for result in self.results)
+
+    @property
+    def cache_misses(self) -> int:
+        return sum(result.cache_misses for result in self.results)
+
+    @property
+    def images_per_second(self) -> float:
+        return len(self.results) / self.elapsed if self.elapsed > 0 else 0.0
+
+def find_images(root: str, extensions: Iterable[str] = AppConfig.supported_formats) -> List[str]:
+    """Recursively collect supported images below ``root`` in a stable order."""
+    extensions = tuple(ext.lower() for ext in extensions)
+    images = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith(extensions):
+                images.append(os.path.join(dirpath, filename))
+    return images
+
+def read_file_list(list_path: str) -> List[str]:
+    """Read one image path per line, ignoring blank lines and # comments."""
+    base_dir = os.path.dirname(os.path.abspath(list_path))
+    with open(list_path) as f:
+        entries = [line.strip() for line in f]
+    return [
+        entry if os.path.isabs(entry) else os.path.join(base_dir, entry)
+        for entry in entries
+        if entry and not entry.startswith('#')
+    ]
+
+def plan_output_dirs(sources: Sequence[str], output_root: str, input_root: Optional[str] = None) -> Dict[str, str]:
+    """Map each source to its own output folder, mirroring the input tree.
+
+    Sources that differ only by extension (``logo.png`` and ``logo.jpg``)
+    keep it in their folder name (``logo_png``, ``logo_jpg``), so they never
+    render into the same folder.
+    """
+    if not sources:
+        return {}
+    if input_root is None:
+        input_root = os.path.commonpath([os.path.dirname(os.path.abspath(src)) for src in sources])
+    relatives = {source: os.path.relpath(os.path.abspath(source), os.path.abspath(input_root))
+                 for source in sources}
+    stems = Counter(os.path.normcase(os.path.splitext(relative)[0]) for relative in set(relatives.values()))
+    plan = {}
+    claimed = {}
+    for source, relative in relatives.items():
+        stem, extension = os.path.splitext(relative)
+        if stems[os.path.normcase(stem)] > 1:
+            stem += '_' + extension.lstrip('.')
+        output_dir = os.path.join(output_root, stem)
+        other = claimed.setdefault(os.path.normcase(output_dir), source)
+        if os.path.normcase(os.path.abspath(other)) != os.path.normcase(os.path.abspath(source)):
+            raise ConfigurationError(f"{source} and {other} would both be written to {output_dir}")
+        plan[source] = output_dir
+    return plan
+
+def _init_worker(cache_dir: Optional[str], cache_max_bytes: int,
+                 composite_backend: Optional[str] = None, io_threads: int = 4,
+                 memory_ceiling: Optional[int] = None, collect_metrics: bool = False,
+                 trace_allocations: bool = False, config_path: Optional[str] = None,
+                 profile_dir: Optional[str] = None, profile_every: int = 1) -> None:
+    """Set up per-process state shared by every task the worker runs."""
+    global _cache, _writer
+    if config_path:
+        config_manager.load_config(config_path)
+    if memory_ceiling:
+        bounded_loading.MEMORY_CEILING = memory_ceiling
+    if collect_metrics:
+        metrics.enable(trace_allocations)
+    if profile_dir:
+        profiling.enable(profile_dir, profile_every)
+    _cache = OutputCache(cache_dir, cache_max_bytes) if cache_dir else None
+    _writer = OutputWriter(max_workers=io_threads)
+    if composite_backend:
+        compositing.set_backend(composite_backend)
+
+@log_operation(logger)
+def process_file(source: str, output_dir: str, formats: Optional[Mapping[str, OutputFormat]] = None) -> BatchResult:
+    """Render every format for one source. Runs inside a worker process.
+
+    Without ``formats`` the current config snapshot is used, after reloading
+    the config file if it changed; the whole source renders with that snapshot.
+    """
+    if formats is None:
+        config_manager.reload_if_changed()
+        formats = config_manager.snapshot().formats
+    hits, misses = (_cache.hits, _cache.misses) if _cache else (0, 0)
+    try:
+        try:
+            with FanOutProcessor.from_file(source, _cache, formats.values(), _writer) as renderer:
+                outputs = renderer.process_all(formats, output_dir)
+        finally:
+            # Writes overlap with rendering; a source only counts as done once on disk
+            _writer.flush()
+        result = BatchResult(source, output_dir, outputs=len(outputs))
+    except Exception as e:
+        result = BatchResult(source, output_dir, error=str(e))
+    if _cache:
+        result.cache_hits = _cache.hits - hits
+        result.cache_misses = _cache.misses - misses
+    if metrics.recorder is not None:
+        # Ship this source's stage totals back to the parent with the result
+        result.metrics = metrics.recorder.drain()
+    return result
+
+def run_batch(plan: Dict[str, str], formats: Dict[str, OutputFormat] = default_formats,
+              workers: Optional[int] = None, cache_dir: Optional[str] = None,
+              cache_max_bytes: int = 512 * 1024 * 1024,
+              composite_backend: Optional[str] = None, io_threads: int = 4,
+              memory_ceiling: Optional[int] = None, collect_metrics: bool = False,
+              trace_allocations: bool = False, config_path: Optional[str] = None,
+              profile_dir: Optional[str] = None, profile_every: int = 1) -> BatchSummary:
+    """Convert every source in ``plan`` using a pool of ``workers`` processes.
+
+    With ``cache_dir``, outputs whose source bytes and format spec are
+    unchanged since a previous run are copied from the cache.
+    ``composite_backend`` selects the alpha flattening backend in every worker.
+    Each worker writes outputs on ``io_threads`` background threads, through
+    temporary files that are atomically renamed into place. ``memory_ceiling``
+    bounds the memory each worker may use to load one source.
+
+    With ``collect_metrics`` every worker records per-stage metrics, which
+    are merged into ``summary.metrics``; ``trace_allocations`` adds
+    tracemalloc peaks at a noticeable cost in speed.
+
+    With ``config_path`` the formats are read from that config file instead
+    of ``formats``. Workers reload it when it changes, so sources started
+    afterwards use the new formats; unchanged formats keep their cache keys.
+
+    With ``profile_dir`` every ``profile_every``-th source of each worker is
+    processed under cProfile and tracemalloc, see ``profiling``; the
+    ``.pstats`` files and memory snapshots are written to ``profile_dir``.
+    """
+    workers = workers or os.cpu_count() or 1
+    summary = BatchSummary(workers=workers)
+    start = time.perf_counter()
+    initargs = (cache_dir, cache_max_bytes, composite_backend, io_threads, memory_ceiling,
+                collect_metrics, trace_allocations, config_path, profile_dir, profile_every)
+    if config_path:
+        # Fail here on a broken config rather than in every worker
+        config_manager.load_config(config_path)
+        formats = None
+
+    if workers == 1:
+        previous_ceiling = bounded_loading.MEMORY_CEILING
+        _init_worker(*initargs)
+        try:
+            for source, output_dir in plan.items():
+                summary.results.append(process_file(source, output_dir, formats))
+        finally:
+            _writer.close()
+            if collect_metrics:
+                metrics.disable()
+            if profile_dir:
+                profiling.disable()
+            bounded_loading.MEMORY_CEILING = previous_ceiling
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=initargs) as executor:
+            futures = [
+                executor.submit(process_file, source, output_dir, formats)
+                for source, output_dir in plan.items()
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                if result.error:
+                    logger.error(f"Failed to process {result.source}: {result.error}")
+                summary.results.append(result)
+
+    summary.elapsed = time.perf_counter() - start
+    if collect_metrics:
+        summary.metrics = MetricsRecorder()
+        for result in summary.results:
+            summary.metrics.merge(result.metrics)
+    return summary
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='python -m src.batch',
+        description='Convert a directory tree or file list of logos into every output format.'
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('input_dir', nargs='?', help='Directory to search recursively for images')
+    source.add_argument('--file-list', help='Text file with one image path per line')
+    parser.add_argument('-o', '--output', required=True, help='Root directory for output folders')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='Number of worker processes (default: CPU count)')
+    parser.add_argument('-f', '--formats', nargs='+', choices=sorted(default_formats),
+                        help='Subset of output formats to generate (default: all)')
+    parser.add_argument('--config', metavar='PATH',
+                        help='Read output formats from this JSON config file, reloading it when it changes')
+    parser.add_argument('--cache-dir', help='Reuse unchanged outputs from this content-addressed cache')
+    parser.add_argument('--cache-size-mb', type=int, default=512,
+                        help='Cache size cap before least recently used entries are evicted (default: 512)')
+    parser.add_argument('--png-profile', choices=sorted(PNG_PROFILES),
+                        help='PNG encode profile for every PNG format (default: per format, balanced)')
+    parser.add_argument('--io-threads', type=int, default=4,
+                        help='Background threads writing outputs in each worker (default: 4)')
+    parser.add_argument('--memory-ceiling-mb', type=int, default=None,
+                        help='Memory each worker may use to load one source; larger sources are '
+                             f'reduced while decoding or rejected (default: {DEFAULT_MEMORY_CEILING_MB})')
+    parser.add_argument('--composite-backend', choices=compositing.available_backends(),
+                        help='Alpha flattening backend (default: pillow)')
+    parser.add_argument('--metrics', metavar='PATH',
+                        help='Write per-stage, per-format metrics to PATH: Prometheus text for .prom, '
+                             'JSON lines otherwise')
+    parser.add_argument('--trace-allocations', action='store_true',
+                        help='Include tracemalloc peak allocations in --metrics (slower)')
+    parser.add_argument('--profile', metavar='DIR',
+                        help='Profile sources with cProfile and tracemalloc, writing .pstats files, memory '
+                             'snapshots and a hot-function summary to DIR')
+    parser.add_argument('--profile-every', type=int, default=1, metavar='N',
+                        help='Profile every Nth source of each worker (default: 1, every source)')
+    parser.add_argument('--profile-top', type=int, default=profiling.SUMMARY_TOP, metavar='N',
+                        help=f'Functions listed in the hot-function summary (default: {profiling.SUMMARY_TOP})')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Log per-image progress')
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.io_threads < 1:
+        parser.error('--io-threads must be at least 1')
+    if args.trace_allocations and not args.metrics:
+        parser.error('--trace-allocations requires --metrics')
+    if args.profile_every < 1:
+        parser.error('--profile-every must be at least 1')
+    if args.config and (args.formats or args.png_profile):
+        parser.error('--formats and --png-profile apply to the built-in formats, not to --config')
+    return args
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point."""
+    args = _parse_args(argv)
+    logging.basicConfig()
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    try:
+        if args.file_list:
+            sources = read_file_list(args.file_list)
+            plan = plan_output_dirs(sources, args.output)
+        else:
+            sources = find_images(args.input_dir)
+            plan = plan_output_dirs(sources, args.output, args.input_dir)
+    except ConfigurationError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    if not plan:
+        print("No images found")
+        return 1
+
+    formats = {key: default_formats[key] for key in args.formats} if args.formats else default_formats
+    # --profile, or LOGOCRAFT_PROFILE_DIR, which every worker reads when it starts
+    profile_dir = args.profile or (profiling.current().directory if profiling.current() else None)
+    if args.png_profile:
+        formats = {
+            key: replace(spec, encode_profile=args.png_profile) if spec.format == 'PNG' else spec
+            for key, spec in formats.items()
+        }
+    memory_ceiling = (args.memory_ceiling_mb * 1024 * 1024 if args.memory_ceiling_mb
+                      else bounded_loading.MEMORY_CEILING or DEFAULT_MEMORY_CEILING_MB * 1024 * 1024)
+    summary = run_batch(plan, formats, args.workers, args.cache_dir, args.cache_size_mb * 1024 * 1024,
+                        args.composite_backend, args.io_threads,
+                        memory_ceiling,
+                        bool(args.metrics), args.trace_allocations, args.config,
+                        args.profile, args.profile_every)
+
+    print(
+        f"Processed {len(summary.results)} images ({len(summary.failed)} failed) "
+        f"in {summary.elapsed:.2f}s with {summary.workers} workers: "
+        f"{summary.images_per_second:.1f} images/sec"
+    )
+    if args.cache_dir:
+        print(f"Cache: {summary.cache_hits} hits, {summary.cache_misses} misses")
+    if args.metrics:
+        summary.metrics.write(args.metrics)
+        print(f"Stage metrics written to {args.metrics}; wall time by output:")
+        for format_label, seconds in summary.metrics.wall_seconds_by_format().items():
+            print(f"  {format_label:<16} {seconds:.3f}s")
+    if profile_dir:
+        print(f"Profiles written to {profile_dir}")
+        print(profiling.write_summary(profile_dir, args.profile_top), end='')
+    for result in summary.failed:
+        print(f"  FAILED {result.source}: {result.error}", file=sys.stderr)
+    return 1 if summary.failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
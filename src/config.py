@@ -9,8 +9,13 @@ def _to_format_config(fmt: OutputFormat) -> FormatConfig:
         mode=fmt.mode,
         format=fmt.format,
         colors=fmt.colors,
+        quantizer=fmt.quantizer,
         background=fmt.background,
-        is_thermal_printer=fmt.is_thermal_printer
+        is_thermal_printer=fmt.is_thermal_printer,
+        encode_profile=fmt.encode_profile,
+        dither=fmt.dither,
+        print_width=fmt.print_width,
+        band_height=fmt.band_height
     )
 
 # Define default formats using OutputFormat
@@ -44,8 +49,8 @@ default_formats = {
     )
 }
 
-# Initialize config manager with FormatConfig versions of the formats
+# Initialize config manager with FormatConfig versions of the formats, compiled on first use
 config_manager = ConfigManager()
-config_manager.config.formats = {
+config_manager.defer_formats(lambda: {
     key: _to_format_config(fmt) for key, fmt in default_formats.items()
-}
+})
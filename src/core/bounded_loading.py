@@ -0,0 +1,195 @@
+"""
+Memory-bounded loading for very large sources.
+Decodes uncompressed sources band by band and reduces each band on the fly,
+so the downscaled working image is built without holding the full-resolution
+pixels. Sources that cannot be decoded in parts are refused when a full
+decode would exceed the memory ceiling.
+"""
+import importlib
+import os
+import struct
+from typing import Iterable, List, Optional, Tuple
+from PIL import Image, UnidentifiedImageError
+from . import resampling
+from .error_handler import ImageProcessingError
+
+# Upper bound for the memory a single source may take while loading, from
+# LOGOCRAFT_MEMORY_CEILING_MB. None (the default; the batch CLI sets its own)
+# keeps Pillow's decompression-bomb limit instead. Read at call time, like
+# resampling.REDUCING_GAP.
+_env_ceiling = os.environ.get('LOGOCRAFT_MEMORY_CEILING_MB')
+MEMORY_CEILING: Optional[int] = int(_env_ceiling) * 1024 * 1024 if _env_ceiling else None
+
+# Share of the ceiling a single decoded band (plus its converted copy) may use
+BAND_SHARE = 0.25
+
+# Raw layouts whose stride is one byte per letter, so row ranges can be located
+_BYTE_RAWMODES = ('L', 'LA', 'P', 'PA', 'RGB', 'RGBA', 'RGBX', 'BGR', 'BGRA', 'BGRX', 'CMYK')
+_ALPHA_MODES = ('RGBA', 'LA', 'PA')
+
+# Pillow format and plugin module per source extension. Opening a TIFF or WebP
+# file otherwise makes Pillow import every plugin it has, which costs more
+# than decoding a logo.
+PLUGINS = {
+    '.png': ('PNG', 'PngImagePlugin'),
+    '.jpg': ('JPEG', 'JpegImagePlugin'),
+    '.jpeg': ('JPEG', 'JpegImagePlugin'),
+    '.bmp': ('BMP', 'BmpImagePlugin'),
+    '.gif': ('GIF', 'GifImagePlugin'),
+    '.tif': ('TIFF', 'TiffImagePlugin'),
+    '.tiff': ('TIFF', 'TiffImagePlugin'),
+    '.webp': ('WEBP', 'WebPImagePlugin'),
+}
+
+def _working_bytes_per_pixel(image: Image.Image) -> int:
+    """Native pixel size plus the two RGBA copies made for the working image."""
+    return len(image.getbands()) + 8
+
+def estimate_load_bytes(image: Image.Image) -> int:
+    """Approximate peak memory of decoding ``image`` and converting it to RGBA."""
+    return image.width * image.height * _working_bytes_per_pixel(image)
+
+def _raw_layout(image: Image.Image) -> Optional[List[Tuple[Tuple[int, int, int, int], int, str, int, int]]]:
+    """(extents, offset, rawmode, stride, orientation) of every tile, if all of them are raw.
+
+    Covers single-strip files as well as TIFFs stored in many strips or tiles.
+    """
+    layout = []
+    for decoder, extents, offset, args in image.tile or ():
+        if decoder != 'raw':
+            return None
+        if isinstance(args, str):
+            args = (args, 0, 1)
+        rawmode, stride, orientation = (tuple(args) + (0, 1))[:3]
+        if rawmode not in _BYTE_RAWMODES:
+            return None
+        x0, y0, x1, y1 = extents
+        layout.append(((x0, y0, x1, y1), offset, rawmode, int(stride) or (x1 - x0) * len(rawmode), orientation or 1))
+    if sum((x1 - x0) * (y1 - y0) for (x0, y0, x1, y1), *_ in layout) != image.width * image.height:
+        return None
+    return layout
+
+def can_stream(image: Image.Image) -> bool:
+    """Whether ``image`` can be decoded a band of rows at a time."""
+    return bool(getattr(image, 'filename', None)) and getattr(image, 'im', None) is None \
+        and _raw_layout(image) is not None
+
+def open_file(file_path: str) -> Image.Image:
+    """``Image.open``, importing only the Pillow plugin its extension names.
+
+    Files whose contents do not match their extension fall back to every plugin.
+    """
+    plugin = PLUGINS.get(os.path.splitext(file_path)[1].lower())
+    if plugin is not None:
+        image_format, module = plugin
+        try:
+            importlib.import_module(f'PIL.{module}')
+            return Image.open(file_path, formats=[image_format])
+        except (ImportError, UnidentifiedImageError):
+            pass
+    return Image.open(file_path)
+
+def _open_unchecked(file_path: str) -> Image.Image:
+    """``open_file`` without Pillow's decompression-bomb check.
+
+    The check reads the process-wide ``Image.MAX_IMAGE_PIXELS``, so instead of
+    lifting that for every thread the format plugin is called directly, as
+    ``Image.open`` would; the memory ceiling takes the check's place.
+    """
+    plugin = PLUGINS.get(os.path.splitext(file_path)[1].lower())
+    formats = []
+    if plugin is not None:
+        try:
+            importlib.import_module(f'PIL.{plugin[1]}')
+            formats.append(plugin[0])
+        except ImportError:
+            pass
+    Image.init()
+    formats += [image_format for image_format in Image.ID if image_format not in formats]
+
+    with open(file_path, 'rb') as f:
+        prefix = f.read(16)
+    for image_format in formats:
+        factory, accept = Image.OPEN[image_format]
+        accepted = not accept or accept(prefix)
+        if not accepted or isinstance(accepted, (str, bytes)):
+            continue
+        try:
+            return factory(file_path)
+        except (SyntaxError, IndexError, TypeError, struct.error):
+            continue
+    raise UnidentifiedImageError(f"cannot identify image file {file_path!r}")
+
+def open_image(file_path: str, memory_ceiling: Optional[int] = None) -> Image.Image:
+    """Open ``file_path`` lazily; with a ceiling it replaces Pillow's pixel-count limit."""
+    if (memory_ceiling or MEMORY_CEILING) is None:
+        return open_file(file_path)
+    return _open_unchecked(file_path)
+
+def _read_band(image: Image.Image, top: int, bottom: int) -> Image.Image:
+    """Decode rows ``top`` to ``bottom`` of a raw source without touching the others."""
+    band = _open_unchecked(image.filename)
+    # Narrow the lazily opened file to the band; Pillow then decodes only the
+    # rows of each strip or tile that fall inside it
+    band._size = (image.width, bottom - top)
+    band.tile = []
+    for (x0, y0, x1, y1), offset, rawmode, stride, orientation in _raw_layout(image):
+        first, last = max(top, y0), min(bottom, y1)
+        if first >= last:
+            continue
+        # Bottom-up tiles (orientation -1) store their last row first
+        row = first - y0 if orientation > 0 else y1 - last
+        band.tile.append(('raw', (x0, first - top, x1, last - top), offset + row * stride,
+                          (rawmode, stride, orientation)))
+    band.load()
+    return band
+
+def load_bounded(image: Image.Image, target_sizes: Iterable[Tuple[int, int]],
+                 memory_ceiling: Optional[int] = None) -> Image.Image:
+    """Return ``image``, or a reduced copy of it built within ``memory_ceiling``.
+
+    Sources that fit the ceiling are returned unchanged. Larger raw sources
+    (uncompressed TIFF, in one strip or in many strips or tiles, BMP, ...)
+    are decoded in bands of rows and box-reduced band by band, by the same
+    factor ``resampling.reduce_for_target`` would use for the largest target.
+    Anything else over the ceiling, such as PNG, WebP or compressed TIFF,
+    raises ImageProcessingError instead of exhausting the host.
+    """
+    memory_ceiling = memory_ceiling or MEMORY_CEILING
+    target_sizes = list(target_sizes)
+    if memory_ceiling is None or not target_sizes or estimate_load_bytes(image) <= memory_ceiling:
+        return image
+
+    megabytes = estimate_load_bytes(image) // (1024 * 1024)
+    if not can_stream(image):
+        raise ImageProcessingError(
+            f"{image.width}x{image.height} {image.format} source needs about {megabytes} MB to decode, "
+            f"over the {memory_ceiling // (1024 * 1024)} MB memory ceiling"
+        )
+
+    largest = (max(size[0] for size in target_sizes), max(size[1] for size in target_sizes))
+    factor_x, factor_y = resampling.reduction_factor(image.size, largest)
+    mode = 'RGBA' if image.mode in _ALPHA_MODES or 'transparency' in image.info else 'RGB'
+    reduced_size = (-(-image.width // factor_x), -(-image.height // factor_y))
+    if reduced_size[0] * reduced_size[1] * 4 > memory_ceiling // 2:
+        raise ImageProcessingError(
+            f"Reduced {reduced_size[0]}x{reduced_size[1]} working image does not fit the memory ceiling"
+        )
+
+    # Whole reduction blocks per band, so band edges never split a block
+    band_budget = int(memory_ceiling * BAND_SHARE)
+    rows = band_budget // (image.width * _working_bytes_per_pixel(image))
+    rows = max(factor_y, rows // factor_y * factor_y)
+
+    reduced = Image.new(mode, reduced_size)
+    for top in range(0, image.height, rows):
+        bottom = min(image.height, top + rows)
+        band = _read_band(image, top, bottom).convert(mode)
+        if mode == 'RGBA':
+            # Reduce premultiplied, as reduce_for_target does, so transparent pixels do not bleed
+            band = band.convert('RGBa').reduce((factor_x, factor_y)).convert('RGBA')
+        else:
+            band = band.reduce((factor_x, factor_y))
+        reduced.paste(band, (0, top // factor_y))
+    image.close()
+    return reduced
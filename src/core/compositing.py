@@ -0,0 +1,143 @@
+"""
+Alpha flattening and canvas compositing.
+Composites images over a solid color directly into the final canvas, with a
+Pillow backend and an optional NumPy backend.
+"""
+import logging
+import os
+from typing import Optional, Tuple
+from PIL import Image, ImageChops
+from .error_handler import ConfigurationError
+from .lazy_import import optional_module
+
+logger = logging.getLogger(__name__)
+
+# NumPy is optional, and only imported once first used
+np = optional_module('numpy')
+
+BACKENDS = ('pillow', 'numpy')
+WHITE = (255, 255, 255)
+
+# Rows composited per NumPy chunk; bounds the temporary arrays to a few MB
+CHUNK_ROWS = 256
+
+# Active backend; None until first use, when LOGOCRAFT_COMPOSITE_BACKEND is read
+_backend: Optional[str] = None
+
+def available_backends() -> Tuple[str, ...]:
+    """Backends usable in this environment."""
+    return BACKENDS if np is not None else ('pillow',)
+
+def get_backend() -> str:
+    """Name of the active compositing backend.
+
+    Until ``set_backend`` is called this is the backend named by
+    ``LOGOCRAFT_COMPOSITE_BACKEND``, read on first use; unknown or unavailable
+    names are logged and fall back to ``pillow``.
+    """
+    global _backend
+    if _backend is None:
+        name = os.environ.get('LOGOCRAFT_COMPOSITE_BACKEND') or 'pillow'
+        if name not in available_backends():
+            logger.warning(f"Ignoring LOGOCRAFT_COMPOSITE_BACKEND={name!r}, expected one of "
+                           f"{available_backends()}; using pillow")
+            name = 'pillow'
+        _backend = name
+    return _backend
+
+def set_backend(name: str) -> None:
+    """Select the compositing backend used by every processing path."""
+    global _backend
+    if name not in BACKENDS:
+        raise ConfigurationError(f"Unknown compositing backend '{name}', expected one of {BACKENDS}")
+    if name not in available_backends():
+        raise ConfigurationError(f"Compositing backend '{name}' requires NumPy, which is not installed")
+    _backend = name
+
+def _centered_offset(size: Tuple[int, int], canvas_size: Tuple[int, int]) -> Tuple[int, int]:
+    return (canvas_size[0] - size[0]) // 2, (canvas_size[1] - size[1]) // 2
+
+def _div255(value):
+    """Pillow's rounding division by 255, valid for ints and uint16 arrays up to 65025."""
+    value = value + 128
+    return (value + (value >> 8)) >> 8
+
+def _fits(size: Tuple[int, int], canvas_size: Tuple[int, int]) -> bool:
+    return size[0] <= canvas_size[0] and size[1] <= canvas_size[1]
+
+def composite_over_color(image: Image.Image, color: Tuple[int, ...] = WHITE,
+                         canvas_size: Optional[Tuple[int, int]] = None, mode: str = 'RGB') -> Image.Image:
+    """Composite ``image`` over a solid ``color`` canvas, centered.
+
+    Equivalent to creating a ``mode`` canvas of ``canvas_size`` (the image
+    size by default) and pasting the image with its own alpha as mask, which
+    for an RGB canvas is the same as alpha-compositing onto an opaque
+    background. No full-size background layer is allocated.
+    """
+    canvas_size = tuple(canvas_size or image.size)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    if get_backend() == 'numpy' and image.mode == 'RGBA' and _fits(image.size, canvas_size):
+        return _composite_numpy(image, color, canvas_size, mode)
+
+    canvas = Image.new(mode, canvas_size, color)
+    canvas.paste(image, _centered_offset(image.size, canvas_size), image if image.mode == 'RGBA' else None)
+    return canvas
+
+def flatten_premultiplied(image: Image.Image, color: Tuple[int, int, int] = WHITE,
+                          canvas_size: Optional[Tuple[int, int]] = None) -> Image.Image:
+    """Flatten a premultiplied RGBa image over ``color`` into a centered RGB canvas."""
+    canvas_size = tuple(canvas_size or image.size)
+    if get_backend() == 'numpy' and _fits(image.size, canvas_size):
+        return _flatten_premultiplied_numpy(image, color, canvas_size)
+
+    red, green, blue, alpha = image.split()
+    uncovered = ImageChops.invert(alpha)
+    bands = []
+    for band, value in zip((red, green, blue), color):
+        exposed = uncovered if value == 255 else uncovered.point([_div255(v * value) for v in range(256)])
+        bands.append(ImageChops.add(band, exposed))
+    flat = Image.merge('RGB', bands)
+    if canvas_size == flat.size:
+        return flat
+    canvas = Image.new('RGB', canvas_size, color)
+    canvas.paste(flat, _centered_offset(flat.size, canvas_size))
+    return canvas
+
+def _new_canvas_array(canvas_size: Tuple[int, int], color: Tuple[int, ...], channels: int):
+    canvas = np.empty((canvas_size[1], canvas_size[0], channels), dtype=np.uint8)
+    canvas[...] = (tuple(color) + (255,))[:channels]
+    return canvas
+
+def _composite_numpy(image: Image.Image, color: Tuple[int, ...], canvas_size: Tuple[int, int],
+                     mode: str) -> Image.Image:
+    """Blend row chunks of ``image`` straight into the canvas array."""
+    channels = len(mode)
+    canvas = _new_canvas_array(canvas_size, color, channels)
+    x_offset, y_offset = _centered_offset(image.size, canvas_size)
+    width, height = image.size
+    for top in range(0, height, CHUNK_ROWS):
+        block = np.asarray(image.crop((0, top, width, min(height, top + CHUNK_ROWS))))
+        alpha = block[..., 3].astype(np.uint16)
+        covered = 255 - alpha
+        target = canvas[y_offset + top:y_offset + top + block.shape[0], x_offset:x_offset + width]
+        for channel in range(channels):
+            # Same blend as Pillow's paste: DIV255(dst * (255 - a) + src * a)
+            blended = _div255(target[..., channel] * covered + block[..., channel] * alpha)
+            target[..., channel] = blended
+    return Image.fromarray(canvas, mode)
+
+def _flatten_premultiplied_numpy(image: Image.Image, color: Tuple[int, int, int],
+                                 canvas_size: Tuple[int, int]) -> Image.Image:
+    """Add the uncovered share of ``color`` to premultiplied channels, in the canvas array."""
+    canvas = _new_canvas_array(canvas_size, color, 3)
+    x_offset, y_offset = _centered_offset(image.size, canvas_size)
+    width, height = image.size
+    # Premultiplied raw values, read without Pillow unpremultiplying them
+    block = np.frombuffer(image.tobytes(), dtype=np.uint8).reshape(height, width, 4)
+    uncovered = 255 - block[..., 3].astype(np.uint16)
+    target = canvas[y_offset:y_offset + height, x_offset:x_offset + width]
+    for channel, value in enumerate(color):
+        exposed = uncovered if value == 255 else _div255(uncovered * value)
+        target[..., channel] = np.minimum(block[..., channel] + exposed, 255)
+    return Image.fromarray(canvas, 'RGB')
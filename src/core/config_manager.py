@@ -1,85 +1,295 @@
-"""Configuration management system for LogoCraft."""
-from dataclasses import dataclass, field
-from typing import Dict, Any, Optional
+"""Configuration management system for LogoCraft.
+
+Configuration is published as immutable, versioned ``ConfigSnapshot``s.
+Readers take the current snapshot once and use it without locks; loading
+or updating builds a new snapshot and swaps it in atomically. A loaded
+config file can be watched and is reloaded when it changes, recompiling
+only the formats whose specification changed.
+"""
+from dataclasses import asdict, dataclass, field, fields, replace
+from types import MappingProxyType
+from typing import Any, Callable, Mapping, Optional
 import json
 import os
 import logging
+import threading
 from pathlib import Path
+from . import encoding
+from .error_handler import ConfigurationError
+from .pipeline import compile_plan
 
-@dataclass
+@dataclass(frozen=True)
 class FormatConfig:
     dimensions: tuple[int, int]
     mode: str
     format: str
     colors: Optional[int] = None
+    quantizer: Optional[str] = None
     background: Optional[tuple[int, int, int]] = None
     is_thermal_printer: bool = False
+    encode_profile: Optional[str] = None
+    dither: Optional[str] = None
+    print_width: Optional[int] = None
+    band_height: Optional[int] = None
+
+    def __post_init__(self):
+        # JSON gives lists; tuples keep the config hashable and comparable with OutputFormat
+        object.__setattr__(self, 'dimensions', tuple(self.dimensions))
+        if self.background is not None:
+            object.__setattr__(self, 'background', tuple(self.background))
+
+class CompiledFormat(FormatConfig):
+    """A FormatConfig with its pipeline plans and save parameters computed once.
+
+    ``plan`` runs the whole standard pipeline, ``finish_plan`` everything
+    after the resize; ``save_kwargs`` is a read-only mapping for ``Image.save``.
+    They are not dataclass fields, so ``asdict`` and cache keys see a plain
+    FormatConfig, and a compiled format equals the FormatConfig it came from.
+    """
+    def __post_init__(self):
+        super().__post_init__()
+        object.__setattr__(self, 'plan', None if self.is_thermal_printer else compile_plan(self))
+        object.__setattr__(self, 'finish_plan', None if self.is_thermal_printer else compile_plan(self, resize=False))
+        object.__setattr__(self, 'save_kwargs', MappingProxyType(encoding.save_kwargs(self)))
+
+    def __eq__(self, other):
+        if not isinstance(other, FormatConfig):
+            return NotImplemented
+        return self.spec_values(self) == self.spec_values(other)
+
+    def __hash__(self):
+        return hash(self.spec_values(self))
+
+    def __reduce__(self):
+        # Read-only mappings do not pickle; worker processes recompile on arrival
+        return (type(self), self.spec_values(self))
 
-@dataclass
+    @staticmethod
+    def spec_values(format_spec: Any) -> tuple:
+        """Field values of an OutputFormat or FormatConfig, for comparing specs of either type."""
+        return tuple(getattr(format_spec, spec_field.name) for spec_field in fields(FormatConfig))
+
+    @classmethod
+    def compile(cls, format_spec: Any) -> 'CompiledFormat':
+        """Compile any OutputFormat or FormatConfig."""
+        if isinstance(format_spec, cls):
+            return format_spec
+        return cls(*cls.spec_values(format_spec))
+
+@dataclass(frozen=True)
 class AppConfig:
-    formats: Dict[str, FormatConfig] = field(default_factory=dict)
+    formats: Mapping[str, FormatConfig] = field(default_factory=dict)
     supported_formats: tuple[str, ...] = ('.png', '.jpeg', '.jpg', '.bmp', '.gif', '.tiff', '.webp')
     preview_size: int = 250
     default_output_dir: str = field(default_factory=lambda: str(Path.home() / "Desktop"))
-    
+
+    def __post_init__(self):
+        object.__setattr__(self, 'formats', MappingProxyType(dict(self.formats)))
+        object.__setattr__(self, 'supported_formats', tuple(self.supported_formats))
+
+    def __reduce__(self):
+        return (type(self), (dict(self.formats), self.supported_formats, self.preview_size, self.default_output_dir))
+
     def to_dict(self) -> dict:
         return {
-            "formats": {k: vars(v) for k, v in self.formats.items()},
+            "formats": {k: asdict(v) for k, v in self.formats.items()},
             "supported_formats": self.supported_formats,
             "preview_size": self.preview_size,
             "default_output_dir": self.default_output_dir
         }
 
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """One published configuration, with every format compiled.
+
+    Safe to share between threads and to send to worker processes.
+    """
+    version: int
+    config: AppConfig
+
+    def __post_init__(self):
+        compiled = {key: CompiledFormat.compile(spec) for key, spec in self.config.formats.items()}
+        object.__setattr__(self, 'config', replace(self.config, formats=compiled))
+
+    @property
+    def formats(self) -> Mapping[str, CompiledFormat]:
+        return self.config.formats
+
+    def get_format(self, key: str) -> Optional[CompiledFormat]:
+        return self.config.formats.get(key)
+
 class ConfigManager:
     _instance = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
-    
+
     def __init__(self):
         if not hasattr(self, 'initialized'):
             self.logger = logging.getLogger(__name__)
-            self.config = AppConfig()
+            # Serializes publishers only; readers never take it
+            self._publish_lock = threading.Lock()
+            self._snapshot = ConfigSnapshot(0, AppConfig())
+            # Default formats published on first use, see defer_formats
+            self._deferred_formats: Optional[Callable[[], Mapping[str, Any]]] = None
+            # Loaded file, its (mtime, size) when last read and the polling thread, if watching
+            self._config_path: Optional[str] = None
+            self._config_stamp: Optional[tuple[int, int]] = None
+            self._watch_stop: Optional[threading.Event] = None
             self.initialized = True
-    
+
+    def snapshot(self) -> ConfigSnapshot:
+        """The current snapshot; hold on to it for a consistent view across calls."""
+        if self._deferred_formats is not None:
+            with self._publish_lock:
+                self._publish_deferred()
+        return self._snapshot
+
+    @property
+    def config(self) -> AppConfig:
+        return self.snapshot().config
+
+    def defer_formats(self, formats: Callable[[], Mapping[str, Any]]) -> None:
+        """Publish the formats returned by ``formats`` when the config is first read.
+
+        Keeps importing the config cheap: nothing is built or compiled until
+        a caller needs it. Publishing or loading a config first replaces them.
+        """
+        with self._publish_lock:
+            self._deferred_formats = formats
+
+    def _publish_deferred(self) -> None:
+        formats, self._deferred_formats = self._deferred_formats, None
+        if formats is not None:
+            self._publish(replace(self._snapshot.config, formats=formats()))
+
+    def publish(self, config: AppConfig) -> ConfigSnapshot:
+        """Compile ``config`` and make it the current snapshot.
+
+        Formats whose specification is unchanged keep their compiled form
+        from the current snapshot; only new and changed ones are compiled.
+        """
+        with self._publish_lock:
+            self._deferred_formats = None
+            return self._publish(config)
+
+    def update_formats(self, formats: Mapping[str, Any]) -> ConfigSnapshot:
+        """Publish the current configuration with ``formats`` replaced."""
+        with self._publish_lock:
+            self._publish_deferred()
+            return self._publish(replace(self._snapshot.config, formats=formats))
+
+    def _publish(self, config: AppConfig) -> ConfigSnapshot:
+        current = self._snapshot.formats
+        formats = {}
+        for key, spec in config.formats.items():
+            compiled = current.get(key)
+            unchanged = compiled is not None and CompiledFormat.spec_values(compiled) == CompiledFormat.spec_values(spec)
+            formats[key] = compiled if unchanged else spec
+        changed = sorted(key for key, spec in formats.items() if spec is not current.get(key))
+        snapshot = ConfigSnapshot(self._snapshot.version + 1, replace(config, formats=formats))
+        # A single reference swap, so readers see the old snapshot or the new one
+        self._snapshot = snapshot
+        self.logger.debug(f"Published config version {snapshot.version}, compiled {changed or 'no formats'}")
+        return snapshot
+
     def load_config(self, config_path: str) -> None:
         try:
+            stamp = self._stamp(config_path)
             with open(config_path) as f:
                 data = json.load(f)
-                self.config = self._parse_config(data)
-                self.logger.info("Configuration loaded successfully")
+            self.publish(self._parse_config(data))
+            self._config_path, self._config_stamp = config_path, stamp
+            self.logger.info("Configuration loaded successfully")
         except Exception as e:
             self.logger.error(f"Error loading config: {e}")
             raise
-    
+
+    @staticmethod
+    def _stamp(config_path: str) -> tuple[int, int]:
+        stat = os.stat(config_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload_if_changed(self) -> Optional[ConfigSnapshot]:
+        """Reload the loaded config file if it changed since it was last read.
+
+        Returns the new snapshot, or None when the file is unchanged or the
+        new contents are invalid, in which case the current snapshot stays
+        published. Jobs holding an earlier snapshot keep using it.
+        """
+        config_path = self._config_path
+        if config_path is None:
+            return None
+        try:
+            stamp = self._stamp(config_path)
+        except OSError as e:
+            self.logger.warning(f"Cannot check config file {config_path}: {e}")
+            return None
+        if stamp == self._config_stamp:
+            return None
+        self._config_stamp = stamp
+        try:
+            with open(config_path) as f:
+                snapshot = self.publish(self._parse_config(json.load(f)))
+        except (OSError, ValueError, TypeError, ConfigurationError) as e:
+            # Possibly caught mid-write; the next change to the file is picked up again
+            self.logger.error(f"Keeping config version {self._snapshot.version}, cannot reload {config_path}: {e}")
+            return None
+        self.logger.info(f"Reloaded {config_path} as config version {snapshot.version}")
+        return snapshot
+
+    def watch(self, config_path: Optional[str] = None, interval: float = 1.0) -> None:
+        """Poll the config file every ``interval`` seconds on a daemon thread and reload it on change.
+
+        ``config_path`` is loaded first unless it is already the loaded file.
+        """
+        if config_path is not None and config_path != self._config_path:
+            self.load_config(config_path)
+        if self._config_path is None:
+            raise ConfigurationError("No config file loaded to watch")
+        self.stop_watching()
+        stop = self._watch_stop = threading.Event()
+
+        def poll():
+            while not stop.wait(interval):
+                self.reload_if_changed()
+
+        threading.Thread(target=poll, name='config-watcher', daemon=True).start()
+
+    def stop_watching(self) -> None:
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+            self._watch_stop = None
+
     def save_config(self, config_path: str) -> None:
         try:
             config_dir = os.path.dirname(config_path)
             os.makedirs(config_dir, exist_ok=True)
-            
+
             with open(config_path, 'w') as f:
                 json.dump(self.config.to_dict(), f, indent=2)
                 self.logger.info("Configuration saved successfully")
         except Exception as e:
             self.logger.error(f"Error saving config: {e}")
             raise
-    
+
     def _parse_config(self, data: dict) -> AppConfig:
         formats = {}
         for key, fmt_data in data.get('formats', {}).items():
             formats[key] = FormatConfig(**fmt_data)
-        
+
+        current = self.config
         return AppConfig(
             formats=formats,
-            supported_formats=tuple(data.get('supported_formats', self.config.supported_formats)),
-            preview_size=data.get('preview_size', self.config.preview_size),
-            default_output_dir=data.get('default_output_dir', self.config.default_output_dir)
+            supported_formats=tuple(data.get('supported_formats', current.supported_formats)),
+            preview_size=data.get('preview_size', current.preview_size),
+            default_output_dir=data.get('default_output_dir', current.default_output_dir)
         )
-    
+
     def get_format(self, key: str) -> Optional[FormatConfig]:
-        return self.config.formats.get(key)
-    
+        return self.snapshot().get_format(key)
+
     def validate_format(self, format_key: str) -> bool:
-        return format_key in self.config.formats
\ No newline at end of file
+        return format_key in self.snapshot().formats
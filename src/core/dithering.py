@@ -0,0 +1,61 @@
+"""
+1-bit conversion for thermal printer output.
+Reduces an image to black and white with a selectable dithering method.
+"""
+from functools import lru_cache
+from typing import Tuple
+from PIL import Image, ImageChops
+from .error_handler import ConfigurationError
+
+DITHER_METHODS = ('threshold', 'bayer', 'floyd-steinberg')
+
+# Gray level at or above which a pixel stays white in 'threshold' mode
+THRESHOLD = 128
+
+_BAYER_SIZE = 8
+
+def _bayer_matrix(size: int) -> list:
+    """Recursive Bayer index matrix of ``size`` x ``size`` (a power of two)."""
+    if size == 1:
+        return [[0]]
+    half = _bayer_matrix(size // 2)
+    quads = [[4 * v for v in row] for row in half]
+    top = [row + [v + 2 for v in row] for row in quads]
+    bottom = [[v + 3 for v in row] + [v + 1 for v in row] for row in quads]
+    return top + bottom
+
+@lru_cache(maxsize=8)
+def _bayer_thresholds(size: Tuple[int, int]) -> Image.Image:
+    """Ordered-dither threshold map covering ``size``, tiled by repeated doubling."""
+    cells = _BAYER_SIZE * _BAYER_SIZE
+    tile = Image.new('L', (_BAYER_SIZE, _BAYER_SIZE))
+    tile.putdata([
+        (index * 256 + 128) // cells
+        for row in _bayer_matrix(_BAYER_SIZE) for index in row
+    ])
+    while tile.width < size[0] or tile.height < size[1]:
+        doubled = Image.new('L', (tile.width * (2 if tile.width < size[0] else 1),
+                                  tile.height * (2 if tile.height < size[1] else 1)))
+        for x in range(0, doubled.width, tile.width):
+            for y in range(0, doubled.height, tile.height):
+                doubled.paste(tile, (x, y))
+        tile = doubled
+    return tile.crop((0, 0) + tuple(size))
+
+def dither(image: Image.Image, method: str = 'floyd-steinberg', threshold: int = THRESHOLD) -> Image.Image:
+    """Convert ``image`` to a 1-bit ('1' mode) image using ``method``.
+
+    'threshold' cuts at ``threshold``, 'bayer' applies an 8x8 ordered
+    dither and 'floyd-steinberg' diffuses the error to neighbouring pixels.
+    Transparent areas should be flattened beforehand.
+    """
+    if method not in DITHER_METHODS:
+        raise ConfigurationError(f"Unknown dither method '{method}', expected one of {DITHER_METHODS}")
+    gray = image.convert('L')
+    if method == 'floyd-steinberg':
+        return gray.convert('1', dither=Image.Dither.FLOYDSTEINBERG)
+    if method == 'bayer':
+        # Positive wherever the pixel is brighter than its cell's threshold
+        gray = ImageChops.subtract(gray, _bayer_thresholds(gray.size))
+        threshold = 1
+    return gray.point([0] * threshold + [255] * (256 - threshold), '1')
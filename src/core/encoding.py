@@ -0,0 +1,37 @@
+"""
+Encoder settings for saved outputs.
+Named PNG profiles trade encode time against file size.
+"""
+import zlib
+from typing import Any, Dict, Optional
+from .error_handler import ConfigurationError
+
+# JPEG outputs are rare and small, so they keep the exhaustive Huffman pass
+JPEG_SAVE_KWARGS = {'quality': 95, 'optimize': True}
+BMP_DPI = (203, 203)
+
+# compress_type is the zlib strategy; Z_RLE suits the flat areas of logos
+PNG_PROFILES: Dict[str, Dict[str, Any]] = {
+    'fast': {'compress_level': 1, 'compress_type': zlib.Z_RLE},
+    'balanced': {'compress_level': 6},
+    'smallest': {'optimize': True},
+}
+DEFAULT_PNG_PROFILE = 'balanced'
+
+def png_save_kwargs(profile: Optional[str] = None) -> Dict[str, Any]:
+    """Pillow PNG save parameters for a named encode profile."""
+    profile = profile or DEFAULT_PNG_PROFILE
+    if profile not in PNG_PROFILES:
+        raise ConfigurationError(f"Unknown PNG encode profile '{profile}', expected one of {tuple(PNG_PROFILES)}")
+    return dict(PNG_PROFILES[profile])
+
+def save_kwargs(format_spec: Any) -> Dict[str, Any]:
+    """Pillow save parameters for an OutputFormat or FormatConfig."""
+    kwargs: Dict[str, Any] = {'format': format_spec.format}
+    if format_spec.format == 'JPEG':
+        kwargs.update(JPEG_SAVE_KWARGS)
+    elif format_spec.format == 'BMP':
+        kwargs['dpi'] = BMP_DPI
+    elif format_spec.format == 'PNG':
+        kwargs.update(png_save_kwargs(format_spec.encode_profile))
+    return kwargs
@@ -5,6 +5,7 @@ Provides standardized error handling and logging functionality.
 from typing import Type, Callable
 import logging
 from functools import wraps
+from . import profiling
 
 class ImageProcessingError(Exception):
     """Base exception for image processing related errors"""
@@ -21,6 +22,7 @@ class ValidationError(Exception):
 def handle_errors(logger: logging.Logger = None, error_type: Type[Exception] = ImageProcessingError) -> Callable:
     """
     Decorator for standardized error handling and logging.
+    Calls are profiled when ``profiling`` is enabled.
     
     Args:
         logger: Logger instance to use. If None, creates a new logger.
@@ -36,7 +38,7 @@ def handle_errors(logger: logging.Logger = None, error_type: Type[Exception] = I
         @wraps(func)
         def wrapper(*args, **kwargs):
             try:
-                return func(*args, **kwargs)
+                return profiling.call(func, *args, **kwargs)
             except Exception as e:
                 error_msg = f"Error in {func.__name__}: {str(e)}"
                 logger.error(error_msg, exc_info=True)
@@ -47,6 +49,7 @@ def handle_errors(logger: logging.Logger = None, error_type: Type[Exception] = I
 def log_operation(logger: logging.Logger = None) -> Callable:
     """
     Decorator for logging function entry and exit.
+    Calls are profiled when ``profiling`` is enabled.
     
     Args:
         logger: Logger instance to use. If None, creates a new logger.
@@ -62,7 +65,7 @@ def log_operation(logger: logging.Logger = None) -> Callable:
         def wrapper(*args, **kwargs):
             logger.debug(f"Entering {func.__name__}")
             try:
-                result = func(*args, **kwargs)
+                result = profiling.call(func, *args, **kwargs)
                 logger.debug(f"Exiting {func.__name__}")
                 return result
             except Exception as e:
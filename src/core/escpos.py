@@ -0,0 +1,96 @@
+"""
+ESC/POS raster output for thermal printers.
+Encodes 1-bit images as ready-to-send GS v 0 raster bit image commands.
+"""
+from typing import Optional
+from PIL import Image, ImageChops
+from .dithering import dither
+from .error_handler import ConfigurationError
+from .lazy_import import optional_module
+
+# NumPy is optional, and only imported once first used
+np = optional_module('numpy')
+
+GS_V_0 = b'\x1dv0'
+
+# Dithering used when a raster format does not choose one
+DEFAULT_DITHER = 'floyd-steinberg'
+
+# Largest band a single GS v 0 command can describe (two-byte yL/yH row count)
+MAX_BAND_HEIGHT = 0xFFFF
+
+def fit_to_width(image: Image.Image, print_width: int) -> Image.Image:
+    """Center ``image`` on a white strip ``print_width`` dots wide.
+
+    Narrower widths crop the side margins equally, so the PRINTLOGO canvas
+    keeps its 203 DPI scale; its logo is at most 256 dots wide.
+    """
+    if print_width < 1:
+        raise ConfigurationError(f"Print width must be positive, got {print_width}")
+    if print_width == image.width:
+        return image
+    canvas = Image.new(image.mode, (print_width, image.height), 255 if image.mode in ('1', 'L') else (255, 255, 255))
+    canvas.paste(image, ((print_width - image.width) // 2, 0))
+    return canvas
+
+def pack_rows(image: Image.Image) -> bytes:
+    """Pack a 1-bit image MSB first, one byte per 8 dots, where 1 prints black."""
+    if np is not None:
+        dots = np.asarray(image.convert('L')) < 128
+        return np.packbits(dots, axis=1).tobytes()
+    # Pillow already stores '1' images row-packed with 1 meaning white
+    return ImageChops.invert(image.convert('L')).convert('1', dither=Image.Dither.NONE).tobytes()
+
+def encode_raster(image: Image.Image, print_width: Optional[int] = None,
+                  band_height: Optional[int] = None, dither_method: str = DEFAULT_DITHER) -> bytes:
+    """Encode ``image`` as GS v 0 raster commands.
+
+    Non 1-bit images are dithered first with ``dither_method``. The image is
+    split into bands of at most ``band_height`` rows, each sent as its own
+    command, for printers with a small receive buffer.
+    """
+    if image.mode != '1':
+        image = dither(image, dither_method)
+    if print_width is not None:
+        image = fit_to_width(image, print_width)
+    if band_height is None:
+        band_height = image.height
+    if not 1 <= band_height <= MAX_BAND_HEIGHT:
+        raise ConfigurationError(f"Band height must be between 1 and {MAX_BAND_HEIGHT}, got {band_height}")
+
+    width_bytes = (image.width + 7) // 8
+    packed = pack_rows(image)
+    stream = bytearray()
+    for top in range(0, image.height, band_height):
+        rows = min(band_height, image.height - top)
+        stream += GS_V_0 + bytes((0, width_bytes & 0xFF, width_bytes >> 8, rows & 0xFF, rows >> 8))
+        stream += packed[top * width_bytes:(top + rows) * width_bytes]
+    return bytes(stream)
+
+def decode_raster(data: bytes) -> Image.Image:
+    """Decode a stream of GS v 0 commands back into a 1-bit image.
+
+    Bands are stacked top to bottom; all must share the same width.
+    """
+    bands = []
+    offset = 0
+    while offset < len(data):
+        if data[offset:offset + 3] != GS_V_0:
+            raise ValueError(f"Expected GS v 0 command at byte {offset}")
+        width_bytes = data[offset + 4] | data[offset + 5] << 8
+        rows = data[offset + 6] | data[offset + 7] << 8
+        offset += 8
+        # Raw bits have 1 for black; Pillow's '1' mode uses 1 for white
+        band = Image.frombytes('1', (width_bytes * 8, rows), data[offset:offset + width_bytes * rows])
+        bands.append(ImageChops.invert(band.convert('L')).convert('1', dither=Image.Dither.NONE))
+        offset += width_bytes * rows
+    if not bands:
+        raise ValueError("Raster stream is empty")
+    if len({band.width for band in bands}) > 1:
+        raise ValueError("Raster bands have different widths")
+    image = Image.new('1', (bands[0].width, sum(band.height for band in bands)))
+    top = 0
+    for band in bands:
+        image.paste(band, (0, top))
+        top += band.height
+    return image
@@ -11,84 +11,55 @@ class OutputFormat:
     mode: str
     format: str
     colors: Optional[int] = None
+    quantizer: Optional[str] = None  # Palette method when colors is set, see quantization.QUANTIZERS
     background: Optional[Tuple[int, int, int]] = None
     is_thermal_printer: bool = False
+    encode_profile: Optional[str] = None  # PNG only: 'fast', 'balanced' or 'smallest', see encoding.PNG_PROFILES
+    dither: Optional[str] = None  # Thermal only: write a 1-bit BMP using this dithering method
+    print_width: Optional[int] = None  # ESCPOS only: raster width in printer dots
+    band_height: Optional[int] = None  # ESCPOS only: rows per GS v 0 command
 import logging
+from .compositing import WHITE, composite_over_color
+from . import escpos
+from .dithering import dither
+from . import encoding
+from .output_writer import OutputWriter
+from .pipeline import compile_plan
+from .resampling import reduce_for_target, resize_lanczos
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class ImageFormat:
-    """Base class for image format handling"""
-    def __init__(self, format_spec: OutputFormat):
+    """Base class for image format handling
+
+    The standard pipeline (resize, color mode, background, palette) is
+    compiled once per format, see ``pipeline.compile_plan``. With an
+    ``OutputWriter``, ``save`` encodes in memory and leaves the
+    write to the writer's I/O threads.
+    """
+    def __init__(self, format_spec: OutputFormat, writer: Optional[OutputWriter] = None):
         self.format_spec = format_spec
+        self.writer = writer
+        self.plan = compile_plan(format_spec)
         self.logger = logging.getLogger(self.__class__.__name__)
     
     def process(self, image: Image.Image) -> Image.Image:
         """Common processing pipeline"""
         try:
             self.logger.info(f"Processing image with format: {self.format_spec.format}")
-            processed = self._resize(image)
-            processed = self._convert_color_mode(processed)
-            processed = self._apply_background(processed)
-            processed = self._optimize_colors(processed)
-            return processed
+            return self.plan.run(image)
         except Exception as e:
             self.logger.error(f"Error in processing pipeline: {str(e)}")
             raise
     
-    def _resize(self, image: Image.Image) -> Image.Image:
-        """Resize image according to format specifications"""
-        try:
-            return image.resize(self.format_spec.dimensions, Image.Resampling.LANCZOS)
-        except Exception as e:
-            self.logger.error(f"Error resizing image: {str(e)}")
-            raise
-    
-    def _convert_color_mode(self, image: Image.Image) -> Image.Image:
-        """Convert image to specified color mode"""
-        try:
-            return image.convert(self.format_spec.mode)
-        except Exception as e:
-            self.logger.error(f"Error converting color mode: {str(e)}")
-            raise
-    
-    def _apply_background(self, image: Image.Image) -> Image.Image:
-        """Apply background if specified in format"""
-        if not self.format_spec.background:
-            return image
-            
-        try:
-            background = Image.new(
-                self.format_spec.mode, 
-                self.format_spec.dimensions, 
-                self.format_spec.background
-            )
-            background.paste(
-                image, 
-                (0, 0), 
-                image if self.format_spec.mode == 'RGBA' else None
-            )
-            return background
-        except Exception as e:
-            self.logger.error(f"Error applying background: {str(e)}")
-            raise
-    
-    def _optimize_colors(self, image: Image.Image) -> Image.Image:
-        """Optimize colors if specified in format"""
-        if not self.format_spec.colors:
-            return image
-            
-        try:
-            return image.convert('P', palette=Image.ADAPTIVE, colors=self.format_spec.colors)
-        except Exception as e:
-            self.logger.error(f"Error optimizing colors: {str(e)}")
-            raise
-    
     def save(self, image: Image.Image, output_path: str) -> None:
         """Save image with format-specific optimizations"""
         try:
             save_kwargs = self._get_save_kwargs()
+            if self.writer is not None:
+                self.writer.save(image, output_path, **save_kwargs)
+                self.logger.info(f"Image queued for writing to: {output_path}")
+                return
             image.save(output_path, **save_kwargs)
             self.logger.info(f"Image saved successfully to: {output_path}")
         except Exception as e:
@@ -97,14 +68,7 @@ class ImageFormat:
     
     def _get_save_kwargs(self) -> Dict[str, Any]:
         """Get format-specific save parameters"""
-        kwargs = {'format': self.format_spec.format}
-        
-        if self.format_spec.format == 'JPEG':
-            kwargs['quality'] = 95
-        if self.format_spec.format in ['PNG', 'JPEG']:
-            kwargs['optimize'] = True
-            
-        return kwargs
+        return encoding.save_kwargs(self.format_spec)
 
 class ThermalPrinterFormat(ImageFormat):
     """Specialized handling for thermal printer format"""
@@ -112,31 +76,43 @@ class ThermalPrinterFormat(ImageFormat):
         """Process image for thermal printer output"""
         try:
             self.logger.info("Processing image for thermal printer format")
-            img = self._prepare_rgba_image(image)
-            return self._create_thermal_layout(img)
+            dimensions = self._thermal_dimensions(image.size)
+            reduced, box = reduce_for_target(image, dimensions)
+            img = self._flatten_on_white(reduced)
+            img = self._create_thermal_layout(img, dimensions, box)
+            if self.format_spec.dither:
+                img = dither(img, self.format_spec.dither)
+            return img
         except Exception as e:
             self.logger.error(f"Error in thermal printer processing: {str(e)}")
             raise
     
-    def _prepare_rgba_image(self, image: Image.Image) -> Image.Image:
+    def _flatten_on_white(self, image: Image.Image) -> Image.Image:
         """Prepare image with white background"""
         try:
-            img = image.convert('RGBA')
-            background = Image.new('RGBA', img.size, (255, 255, 255, 255))
-            return Image.alpha_composite(background, img)
+            return composite_over_color(image, WHITE)
         except Exception as e:
-            self.logger.error(f"Error preparing RGBA image: {str(e)}")
+            self.logger.error(f"Error flattening image: {str(e)}")
             raise
     
-    def _create_thermal_layout(self, image: Image.Image) -> Image.Image:
+    def _thermal_dimensions(self, source_size: Tuple[int, int]) -> Tuple[int, int]:
+        """Fit the source within the 256px printable height, keeping its aspect ratio"""
+        max_size = 256
+        aspect_ratio = source_size[0] / source_size[1]
+        new_width = max_size if aspect_ratio > 1 else int(max_size * aspect_ratio)
+        new_height = int(max_size / aspect_ratio) if aspect_ratio > 1 else max_size
+        return new_width, new_height
+
+    def _create_thermal_layout(self, image: Image.Image,
+                               dimensions: Optional[Tuple[int, int]] = None,
+                               box: Optional[Tuple[float, float, float, float]] = None) -> Image.Image:
         """Create layout optimized for thermal printer"""
         try:
-            max_size = 256
-            aspect_ratio = image.width / image.height
-            new_width = max_size if aspect_ratio > 1 else int(max_size * aspect_ratio)
-            new_height = int(max_size / aspect_ratio) if aspect_ratio > 1 else max_size
-            
-            img = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            new_width, new_height = dimensions or self._thermal_dimensions(image.size)
+            if box is None:
+                img = resize_lanczos(image, (new_width, new_height))
+            else:
+                img = image.resize((new_width, new_height), Image.Resampling.LANCZOS, box=box)
             final_image = Image.new('RGB', (600, 256), (255, 255, 255))
             
             x_offset = 300 - (new_width // 2)
@@ -150,9 +126,34 @@ class ThermalPrinterFormat(ImageFormat):
     
     def save(self, image: Image.Image, output_path: str) -> None:
         """Save image with thermal printer specifications"""
+        if self.format_spec.format == 'ESCPOS':
+            self.save_raster(image, output_path)
+            return
         try:
-            image.save(output_path, 'BMP', dpi=(203, 203))
+            if self.writer is not None:
+                self.writer.save(image, output_path, 'BMP', dpi=(203, 203))
+            else:
+                image.save(output_path, 'BMP', dpi=(203, 203))
             self.logger.info(f"Thermal printer image saved to: {output_path}")
         except Exception as e:
             self.logger.error(f"Error saving thermal printer image: {str(e)}")
             raise
+
+    def save_raster(self, image: Image.Image, output_path: str) -> None:
+        """Save image as a ready-to-send ESC/POS raster stream, e.g. next to the BMP"""
+        try:
+            data = escpos.encode_raster(
+                image,
+                self.format_spec.print_width,
+                self.format_spec.band_height,
+                self.format_spec.dither or escpos.DEFAULT_DITHER
+            )
+            if self.writer is not None:
+                self.writer.write(data, output_path)
+            else:
+                with open(output_path, 'wb') as f:
+                    f.write(data)
+            self.logger.info(f"ESC/POS raster stream saved to: {output_path}")
+        except Exception as e:
+            self.logger.error(f"Error saving ESC/POS raster stream: {str(e)}")
+            raise
@@ -0,0 +1,37 @@
+"""
+Deferred imports for heavy optional dependencies.
+Keeps ``import src.processors`` cheap: modules such as NumPy are located at
+import time but only loaded when first used.
+"""
+import importlib
+import importlib.util
+import sys
+from types import ModuleType
+from typing import Optional
+
+class _LazyModule:
+    """Stand-in that imports the real module on first attribute access."""
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def __getattr__(self, attribute: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+    def __repr__(self) -> str:
+        return f"<lazy module '{self._name}'>"
+
+def optional_module(name: str):
+    """``name`` if it is installed, else None, without importing it yet.
+
+    Modules imported already are returned as they are.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    try:
+        spec = importlib.util.find_spec(name)
+    except ValueError:
+        spec = None
+    return _LazyModule(name) if spec is not None else None
@@ -0,0 +1,201 @@
+"""
+Per-stage metrics for the processing pipeline.
+Records wall time, CPU time, pixels, bytes written and peak traced
+allocation for every (output format, stage) pair, and exports them as JSON
+lines or Prometheus text. Recording is off unless ``enable`` is called.
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Format label for work shared by every output of a source, such as decoding
+SOURCE = 'source'
+UNLABELLED = 'unlabelled'
+
+@dataclass
+class StageMetrics:
+    """Totals for one stage of one output format."""
+    format: str
+    stage: str
+    calls: int = 0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    pixels: int = 0
+    bytes_written: int = 0
+    peak_alloc_bytes: int = 0  # Largest single call, only with allocation tracing
+
+    def add(self, other: 'StageMetrics') -> None:
+        self.calls += other.calls
+        self.wall_seconds += other.wall_seconds
+        self.cpu_seconds += other.cpu_seconds
+        self.pixels += other.pixels
+        self.bytes_written += other.bytes_written
+        self.peak_alloc_bytes = max(self.peak_alloc_bytes, other.peak_alloc_bytes)
+
+@dataclass
+class Sample:
+    """Measurement of a single stage call; set ``pixels`` or ``bytes_written`` inside the block."""
+    pixels: int = 0
+    bytes_written: int = 0
+    start_traced: int = 0
+    max_traced: int = 0
+
+# Prometheus metric name, help text, type and StageMetrics field
+_PROMETHEUS_METRICS = (
+    ('logocraft_stage_calls_total', 'Calls of each pipeline stage.', 'counter', 'calls'),
+    ('logocraft_stage_wall_seconds_total', 'Wall time spent in each pipeline stage.', 'counter', 'wall_seconds'),
+    ('logocraft_stage_cpu_seconds_total', 'CPU time of the thread running each pipeline stage.', 'counter',
+     'cpu_seconds'),
+    ('logocraft_stage_pixels_total', 'Pixels read by each pipeline stage.', 'counter', 'pixels'),
+    ('logocraft_stage_bytes_written_total', 'Output bytes produced by each pipeline stage.', 'counter',
+     'bytes_written'),
+    ('logocraft_stage_peak_alloc_bytes', 'Largest traced allocation peak of a single stage call.', 'gauge',
+     'peak_alloc_bytes'),
+)
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class MetricsRecorder:
+    """Thread-safe accumulator of ``StageMetrics``.
+
+    With ``trace_allocations`` each stage also records its tracemalloc peak
+    above the memory in use when it started. tracemalloc sees Python objects
+    (encoded buffers, palettes) and NumPy arrays, but not the pixel storage
+    Pillow allocates itself. The peak is process-wide, so stages running at
+    the same time on other threads (background writes) count towards it.
+    """
+    def __init__(self, trace_allocations: bool = False):
+        self.trace_allocations = trace_allocations
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._metrics: Dict[Tuple[str, str], StageMetrics] = {}
+        self._open_samples: List[Sample] = []
+        self._started_tracing = trace_allocations and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+
+    @contextmanager
+    def output(self, format_label: str) -> Iterator[None]:
+        """Attribute stages run by this thread inside the block to ``format_label``."""
+        previous = getattr(self._local, 'format', None)
+        self._local.format = format_label
+        try:
+            yield
+        finally:
+            self._local.format = previous
+
+    @contextmanager
+    def stage(self, stage: str, pixels: int = 0, format_label: Optional[str] = None) -> Iterator[Sample]:
+        """Time the block as ``stage`` of the current output format."""
+        format_label = format_label or getattr(self._local, 'format', None) or UNLABELLED
+        sample = Sample(pixels=pixels)
+        if self.trace_allocations:
+            self._open_trace(sample)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield sample
+        finally:
+            record = StageMetrics(format_label, stage, 1, time.perf_counter() - wall, time.thread_time() - cpu,
+                                  sample.pixels, sample.bytes_written)
+            if self.trace_allocations:
+                record.peak_alloc_bytes = self._close_trace(sample)
+            self.merge([record])
+
+    def _open_trace(self, sample: Sample) -> None:
+        with self._lock:
+            # Resetting the peak would lose it for stages already open, so hand it to them first
+            peak = tracemalloc.get_traced_memory()[1]
+            for open_sample in self._open_samples:
+                open_sample.max_traced = max(open_sample.max_traced, peak)
+            tracemalloc.reset_peak()
+            sample.start_traced = sample.max_traced = tracemalloc.get_traced_memory()[0]
+            self._open_samples.append(sample)
+
+    def _close_trace(self, sample: Sample) -> int:
+        with self._lock:
+            self._open_samples.remove(sample)
+            peak = max(sample.max_traced, tracemalloc.get_traced_memory()[1])
+        return peak - sample.start_traced
+
+    def merge(self, records: Iterable[StageMetrics]) -> None:
+        """Add ``records``, e.g. from a worker process, to the totals."""
+        with self._lock:
+            for record in records:
+                key = (record.format, record.stage)
+                if key not in self._metrics:
+                    self._metrics[key] = StageMetrics(record.format, record.stage)
+                self._metrics[key].add(record)
+
+    def records(self) -> List[StageMetrics]:
+        """Copies of the current totals, sorted by format and stage."""
+        with self._lock:
+            return [StageMetrics(**asdict(record)) for _, record in sorted(self._metrics.items())]
+
+    def drain(self) -> List[StageMetrics]:
+        """Return the current totals and start over."""
+        with self._lock:
+            records = [record for _, record in sorted(self._metrics.items())]
+            self._metrics = {}
+        return records
+
+    def wall_seconds_by_format(self) -> Dict[str, float]:
+        """Total wall time per output format, slowest first."""
+        totals: Dict[str, float] = {}
+        for record in self.records():
+            totals[record.format] = totals.get(record.format, 0.0) + record.wall_seconds
+        return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+    def to_json_lines(self) -> str:
+        """One JSON object per (format, stage)."""
+        return ''.join(json.dumps(asdict(record)) + '\n' for record in self.records())
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format."""
+        records = self.records()
+        lines = []
+        for name, help_text, metric_type, field in _PROMETHEUS_METRICS:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for record in records:
+                lines.append(f'{name}{{format="{_label(record.format)}",stage="{_label(record.stage)}"}} '
+                             f'{getattr(record, field)}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str) -> None:
+        """Write the totals to ``path``: Prometheus text for ``.prom`` files, JSON lines otherwise."""
+        with open(path, 'w') as f:
+            f.write(self.to_prometheus() if os.path.splitext(path)[1] == '.prom' else self.to_json_lines())
+
+# Recorder used by the pipeline; None (the default) disables recording
+recorder: Optional[MetricsRecorder] = None
+
+def enable(trace_allocations: bool = False) -> MetricsRecorder:
+    """Start recording into a fresh recorder and return it."""
+    global recorder
+    recorder = MetricsRecorder(trace_allocations)
+    return recorder
+
+def disable() -> None:
+    """Stop recording, and tracing allocations if the recorder started it."""
+    global recorder
+    if recorder is not None and recorder._started_tracing:
+        tracemalloc.stop()
+    recorder = None
+
+def stage(name: str, pixels: int = 0, format_label: Optional[str] = None):
+    """``MetricsRecorder.stage`` on the active recorder; a no-op yielding a throwaway Sample when disabled."""
+    if recorder is None:
+        return nullcontext(Sample())
+    return recorder.stage(name, pixels, format_label)
+
+def output(format_label: str):
+    """``MetricsRecorder.output`` on the active recorder; a no-op when disabled."""
+    if recorder is None:
+        return nullcontext()
+    return recorder.output(format_label)
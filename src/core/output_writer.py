@@ -0,0 +1,139 @@
+"""Background output writer with atomic renames."""
+import io
+import logging
+import os
+import secrets
+import stat
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from PIL import Image
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+def _create_temp(output_path: str) -> Tuple[int, str]:
+    """Create and open a new temporary file next to ``output_path``.
+
+    ``tempfile.mkstemp`` always creates files 0600, which the rename would
+    carry over to the output. This one gets the permissions ``open`` would
+    give the output (0666 less the umask), or those of the file it replaces.
+    """
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+    while True:
+        temp_path = os.path.join(output_dir, f".{os.path.basename(output_path)}.{secrets.token_hex(4)}.tmp")
+        try:
+            fd = os.open(temp_path, flags, 0o666)
+            break
+        except FileExistsError:
+            continue
+    try:
+        os.chmod(temp_path, stat.S_IMODE(os.stat(output_path).st_mode))
+    except OSError:
+        pass  # New output, or the existing one cannot be read: keep the umask default
+    return fd, temp_path
+
+def atomic_write(output_path: str, data: bytes, fsync: bool = False) -> None:
+    """Write ``data`` to a temporary file next to ``output_path`` and rename it into place.
+
+    Readers only ever see the old file or the complete new one. ``fsync``
+    also flushes the data to disk before the rename, for power-loss safety.
+    """
+    fd, temp_path = _create_temp(output_path)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+@dataclass
+class PendingWrite:
+    """An encoded output queued for writing."""
+    path: str
+    data: bytes
+    future: Future
+
+    def result(self, timeout: Optional[float] = None) -> str:
+        """Wait for the write to finish and return the output path."""
+        self.future.result(timeout)
+        return self.path
+
+class OutputWriter:
+    """Encodes outputs in memory and writes them from a bounded pool of I/O threads.
+
+    ``save`` encodes on the calling thread, so the caller can render the next
+    format while earlier ones are still being written. At most ``max_pending``
+    encoded outputs are held in memory; further calls block until a write
+    finishes. Every file is written under a temporary name and atomically
+    renamed, so an interrupted run never leaves a half-written output.
+
+    Call ``flush`` (or leave the ``with`` block) to wait for all writes and
+    surface the first error.
+    """
+    def __init__(self, max_workers: int = 4, max_pending: int = 16, fsync: bool = False):
+        self.fsync = fsync
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='output-writer')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending: List[Future] = []
+
+    def save(self, image: Image.Image, output_path: str, *args, **kwargs) -> PendingWrite:
+        """Encode ``image`` like ``Image.save`` and queue the bytes for ``output_path``.
+
+        The format must be given, since it cannot be inferred from a buffer.
+        """
+        buffer = io.BytesIO()
+        with metrics.stage('encode', image.width * image.height):
+            image.save(buffer, *args, **kwargs)
+        return self.write(buffer.getvalue(), output_path)
+
+    def write(self, data: bytes, output_path: str) -> PendingWrite:
+        """Queue already encoded ``data`` for ``output_path``."""
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._write, output_path, data)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        with self._lock:
+            self._pending.append(future)
+        return PendingWrite(output_path, data, future)
+
+    def _write(self, output_path: str, data: bytes) -> None:
+        # Runs on an I/O thread, which has no current format; the file name is the format key
+        with metrics.stage('write', format_label=os.path.basename(output_path)) as sample:
+            atomic_write(output_path, data, self.fsync)
+            sample.bytes_written = len(data)
+
+    def flush(self) -> None:
+        """Wait for every queued write; re-raise the first failure."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        wait(pending)
+        for future in pending:
+            error = future.exception()
+            if error is not None:
+                logger.error(f"Error writing output: {error}")
+                raise error
+
+    def close(self) -> None:
+        """Flush outstanding writes and stop the I/O threads."""
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> 'OutputWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
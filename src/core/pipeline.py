@@ -0,0 +1,87 @@
+"""
+Compiled processing plans for standard output formats.
+Each format is compiled once into the shortest list of stages that produces
+its output: steps that cannot change the image are left out, and the color
+conversion is folded into compositing when a background is applied.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Optional, Tuple
+from PIL import Image
+from . import metrics
+from .compositing import composite_over_color
+from .quantization import Palette, quantize
+from .resampling import resize_lanczos
+
+if TYPE_CHECKING:
+    from .image_format import OutputFormat
+
+@dataclass(frozen=True)
+class Stage:
+    """One step of a plan; ``apply`` takes the image, the format and an optional shared palette."""
+    name: str
+    apply: Callable[[Image.Image, 'OutputFormat', Optional[Palette]], Image.Image]
+
+def _resize(image: Image.Image, format_spec: 'OutputFormat', palette: Optional[Palette]) -> Image.Image:
+    if image.size == tuple(format_spec.dimensions):
+        return image
+    return resize_lanczos(image, format_spec.dimensions)
+
+def _convert(image: Image.Image, format_spec: 'OutputFormat', palette: Optional[Palette]) -> Image.Image:
+    if image.mode == format_spec.mode:
+        return image
+    return image.convert(format_spec.mode)
+
+def _composite(image: Image.Image, format_spec: 'OutputFormat', palette: Optional[Palette]) -> Image.Image:
+    # composite_over_color pastes straight into a canvas of the output mode,
+    # which covers the conversion the unplanned pipeline did beforehand
+    return composite_over_color(image, format_spec.background, format_spec.dimensions, format_spec.mode)
+
+def _quantize(image: Image.Image, format_spec: 'OutputFormat', palette: Optional[Palette]) -> Image.Image:
+    return quantize(image, format_spec.colors, format_spec.quantizer, palette)
+
+RESIZE = Stage('resize', _resize)
+CONVERT = Stage('convert', _convert)
+COMPOSITE = Stage('composite', _composite)
+QUANTIZE = Stage('quantize', _quantize)
+
+@lru_cache(maxsize=None)
+def _stages(resize: bool, composite: bool, quantized: bool) -> Tuple[Stage, ...]:
+    stages = [RESIZE] if resize else []
+    # Compositing always follows the resize, so it only touches output-sized pixels
+    stages.append(COMPOSITE if composite else CONVERT)
+    if quantized:
+        stages.append(QUANTIZE)
+    return tuple(stages)
+
+@dataclass(frozen=True)
+class Plan:
+    """Stages that turn a source (or an already resized image) into ``format_spec`` output."""
+    format_spec: 'OutputFormat'
+    stages: Tuple[Stage, ...]
+
+    @property
+    def stage_names(self) -> Tuple[str, ...]:
+        return tuple(stage.name for stage in self.stages)
+
+    def run(self, image: Image.Image, palette: Optional[Palette] = None) -> Image.Image:
+        """Apply every stage; a precomputed ``palette`` is reused instead of quantizing from scratch."""
+        for stage in self.stages:
+            with metrics.stage(stage.name, image.width * image.height):
+                image = stage.apply(image, self.format_spec, palette)
+        return image
+
+def compile_plan(format_spec: 'OutputFormat', resize: bool = True) -> Plan:
+    """Compile ``format_spec`` into a plan.
+
+    A background is only visible through an alpha channel, so it is dropped
+    unless the output mode is RGBA. With ``resize=False`` the plan expects
+    an image that is already at the output dimensions.
+    """
+    composite = bool(format_spec.background) and format_spec.mode == 'RGBA'
+    return Plan(format_spec, _stages(resize, composite, bool(format_spec.colors)))
+
+def plan_for(format_spec: 'OutputFormat', resize: bool = True) -> Plan:
+    """Plan for ``format_spec``; formats from a config snapshot carry theirs precompiled."""
+    precompiled = getattr(format_spec, 'plan' if resize else 'finish_plan', None)
+    return precompiled if precompiled is not None else compile_plan(format_spec, resize)
@@ -0,0 +1,172 @@
+"""
+Opt-in profiling of decorated entry points.
+Runs sampled calls of functions wrapped by ``log_operation`` or
+``handle_errors`` under cProfile and tracemalloc, and writes a ``.pstats``
+file and a memory snapshot per profiled call. Profiling is off unless
+``enable`` is called or ``LOGOCRAFT_PROFILE_DIR`` is set, optionally with
+``LOGOCRAFT_PROFILE_EVERY=N`` to profile every Nth call only.
+"""
+import itertools
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Stack frames kept per traced allocation in memory snapshots
+TRACE_FRAMES = 10
+
+# Functions listed by the hot-function summary
+SUMMARY_TOP = 20
+
+SUMMARY_FILE = 'summary.txt'
+
+class Profiler:
+    """Profile every ``every``-th call of each decorated function into ``directory``.
+
+    Counts are kept per function and per process, so in a batch every worker
+    samples its own jobs. Only the outermost decorated call on a thread is
+    profiled, and only one call at a time, since cProfile cannot profile
+    overlapping calls; calls that find the profiler busy run unprofiled.
+    Memory snapshots hold Python and NumPy allocations made by any thread
+    during the call, not Pillow's pixel buffers.
+    """
+    def __init__(self, directory: str, every: int = 1, trace_memory: bool = True):
+        if every < 1:
+            from .error_handler import ConfigurationError  # error_handler imports this module
+            raise ConfigurationError(f"Profiling interval must be at least 1, got {every}")
+        self.directory = directory
+        self.every = every
+        self.trace_memory = trace_memory
+        os.makedirs(directory, exist_ok=True)
+        self._counters: Dict[str, itertools.count] = {}
+        self._counters_lock = threading.Lock()
+        self._busy = threading.Lock()
+        self._local = threading.local()
+        # .pstats files written by this process
+        self.profiled: List[str] = []
+
+    def _next_call(self, name: str) -> int:
+        with self._counters_lock:
+            counter = self._counters.setdefault(name, itertools.count(1))
+            return next(counter)
+
+    def call(self, func: Callable, args: Tuple, kwargs: Dict[str, Any]) -> Any:
+        """Call ``func``, profiling it when this call is sampled."""
+        if getattr(self._local, 'active', False):
+            return func(*args, **kwargs)
+        number = self._next_call(func.__qualname__)
+        if number % self.every != 0 or not self._busy.acquire(blocking=False):
+            return func(*args, **kwargs)
+        try:
+            self._local.active = True
+            return self._profile(func, args, kwargs, number)
+        finally:
+            self._local.active = False
+            self._busy.release()
+
+    def _profile(self, func: Callable, args: Tuple, kwargs: Dict[str, Any], number: int) -> Any:
+        import cProfile
+        import tracemalloc
+
+        base = os.path.join(self.directory, f"{func.__qualname__}-{os.getpid()}-{number:05d}")
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(TRACE_FRAMES)
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(func, *args, **kwargs)
+        finally:
+            profile.dump_stats(base + '.pstats')
+            self.profiled.append(base + '.pstats')
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.take_snapshot().dump(base + '.tracemalloc')
+                logger.info(f"Profiled {func.__qualname__} call {number} into {base}.*, "
+                            f"traced memory peak {peak / 1024 / 1024:.1f} MB")
+            else:
+                logger.info(f"Profiled {func.__qualname__} call {number} into {base}.pstats")
+            if started_tracing:
+                tracemalloc.stop()
+
+# Profiler used by the decorators; None (the default) disables profiling
+profiler: Optional[Profiler] = None
+
+# Whether LOGOCRAFT_PROFILE_DIR has been applied. It is read on the first
+# decorated call rather than at import, so a bad value cannot break imports.
+_environment_read = False
+_environment_lock = threading.Lock()
+
+def enable(directory: str, every: int = 1, trace_memory: bool = True) -> Profiler:
+    """Start profiling every ``every``-th call of each decorated function into ``directory``."""
+    global profiler, _environment_read
+    profiler = Profiler(directory, every, trace_memory)
+    _environment_read = True
+    return profiler
+
+def disable() -> None:
+    global profiler, _environment_read
+    profiler = None
+    _environment_read = True
+
+def _enable_from_environment() -> None:
+    """Apply ``LOGOCRAFT_PROFILE_DIR`` and ``LOGOCRAFT_PROFILE_EVERY``; bad values are logged and ignored."""
+    global _environment_read
+    with _environment_lock:
+        if _environment_read:
+            return
+        _environment_read = True
+        directory = os.environ.get('LOGOCRAFT_PROFILE_DIR')
+        if not directory:
+            return
+        every = os.environ.get('LOGOCRAFT_PROFILE_EVERY', '1')
+        if not every.strip().isdigit() or int(every) < 1:
+            logger.warning(f"Ignoring LOGOCRAFT_PROFILE_EVERY={every!r}, expected a whole number of at least 1; "
+                           f"profiling every call")
+            every = '1'
+        try:
+            enable(directory, int(every))
+        except OSError as e:
+            logger.warning(f"Not profiling: cannot use LOGOCRAFT_PROFILE_DIR={directory!r}: {e}")
+
+def current() -> Optional[Profiler]:
+    """The active profiler, applying the environment variables first; None when profiling is off."""
+    if not _environment_read:
+        _enable_from_environment()
+    return profiler
+
+def call(func: Callable, *args, **kwargs) -> Any:
+    """Call ``func`` through the active profiler; a plain call when profiling is off."""
+    if not _environment_read:
+        _enable_from_environment()
+    if profiler is None:
+        return func(*args, **kwargs)
+    return profiler.call(func, args, kwargs)
+
+def hot_functions(directory: str, top: int = SUMMARY_TOP) -> List[Tuple[str, int, float, float]]:
+    """The ``top`` functions by own time across every ``.pstats`` file in ``directory``.
+
+    Each entry is (function, calls, own seconds, cumulative seconds).
+    """
+    import pstats
+
+    paths = sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.pstats'))
+    if not paths:
+        return []
+    stats = pstats.Stats(*paths).stats
+    ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+    return [(pstats.func_std_string(function), calls, own, cumulative)
+            for function, (_, calls, own, cumulative, _) in ranked]
+
+def write_summary(directory: str, top: int = SUMMARY_TOP) -> str:
+    """Write the hot-function summary of ``directory`` to its ``summary.txt`` and return it."""
+    profiles = [name for name in os.listdir(directory) if name.endswith('.pstats')]
+    lines = [f"Top {top} functions by own time across {len(profiles)} profiled calls",
+             f"{'own s':>9} {'cumul. s':>9} {'calls':>9}  function"]
+    for function, calls, own, cumulative in hot_functions(directory, top):
+        lines.append(f"{own:>9.3f} {cumulative:>9.3f} {calls:>9}  {function}")
+    summary = '\n'.join(lines) + '\n'
+    with open(os.path.join(directory, SUMMARY_FILE), 'w') as f:
+        f.write(summary)
+    return summary
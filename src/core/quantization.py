@@ -0,0 +1,151 @@
+"""
+Palette quantization for formats with a ``colors`` limit.
+Builds palettes with a selectable method and maps images onto them, so a
+palette computed once per source can be reused for every output size.
+"""
+from dataclasses import dataclass
+from typing import Optional
+from PIL import Image
+from .error_handler import ConfigurationError
+from .lazy_import import optional_module
+
+# NumPy is optional, and only imported once first used
+np = optional_module('numpy')
+
+QUANTIZERS = ('median-cut', 'octree', 'kmeans')
+DEFAULT_QUANTIZER = 'median-cut'
+
+# Palettes are built from a nearest-neighbour sample of at most this many pixels
+SAMPLE_PIXELS = 256 * 256
+KMEANS_ITERATIONS = 10
+
+# RGB images up to this many pixels, which covers every realistic output size,
+# are quantized directly; larger ones get a palette built from a sample
+DIRECT_PIXELS = 1024 * 1024
+
+# Pixels matched per NumPy chunk when mapping RGBA images onto a palette
+CHUNK_PIXELS = 65536
+
+_ALPHA_MODES = ('RGBA', 'RGBa', 'LA', 'La', 'PA')
+
+@dataclass(frozen=True)
+class Palette:
+    """Quantized colors as packed RGB or RGBA entries."""
+    mode: str
+    entries: bytes
+
+    def __len__(self) -> int:
+        return len(self.entries) // len(self.mode)
+
+def _check_method(method: str) -> None:
+    if method not in QUANTIZERS:
+        raise ConfigurationError(f"Unknown quantizer '{method}', expected one of {QUANTIZERS}")
+    if method == 'kmeans' and np is None:
+        raise ConfigurationError("The 'kmeans' quantizer requires NumPy, which is not installed")
+
+def _normalize(image: Image.Image) -> Image.Image:
+    """RGBA for images with alpha, RGB for everything else."""
+    mode = 'RGBA' if image.mode in _ALPHA_MODES or 'transparency' in image.info else 'RGB'
+    return image if image.mode == mode else image.convert(mode)
+
+def sample(image: Image.Image, max_pixels: int = SAMPLE_PIXELS) -> Image.Image:
+    """Nearest-neighbour subsample with at most ``max_pixels`` pixels.
+
+    Unlike averaging filters this keeps the source's actual colors.
+    """
+    pixels = image.width * image.height
+    if pixels <= max_pixels:
+        return image
+    scale = (max_pixels / pixels) ** 0.5
+    size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+    return image.resize(size, Image.Resampling.NEAREST)
+
+def _pillow_quantize(image: Image.Image, colors: int, method: str) -> Image.Image:
+    if method == 'octree':
+        return image.quantize(colors, Image.Quantize.FASTOCTREE)
+    return image.convert('P', palette=Image.ADAPTIVE, colors=colors)
+
+def _palette_from(quantized: Image.Image, mode: str) -> Palette:
+    """The entries of ``quantized`` that are actually used, in index order."""
+    channels = len(mode)
+    raw = quantized.getpalette(mode) or []
+    used = sorted(index for _, index in quantized.getcolors(256))
+    return Palette(mode, bytes(value for index in used for value in raw[index * channels:(index + 1) * channels]))
+
+def _nearest(pixels, centers):
+    """Index of the closest center for every row of ``pixels`` (squared distance)."""
+    center_norms = (centers * centers).sum(axis=1)
+    indices = np.empty(len(pixels), dtype=np.intp)
+    for start in range(0, len(pixels), CHUNK_PIXELS):
+        chunk = pixels[start:start + CHUNK_PIXELS]
+        # |p - c|^2 without the |p|^2 term, which does not change the argmin
+        indices[start:start + CHUNK_PIXELS] = (center_norms - 2 * chunk @ centers.T).argmin(axis=1)
+    return indices
+
+def _kmeans(image: Image.Image, colors: int) -> Palette:
+    """Lloyd iterations over the sample, seeded with its median-cut palette."""
+    seed = _palette_from(_pillow_quantize(image, colors, 'median-cut'), image.mode)
+    channels = len(image.mode)
+    pixels = np.asarray(image, dtype=np.float32).reshape(-1, channels)
+    centers = np.frombuffer(seed.entries, dtype=np.uint8).reshape(-1, channels).astype(np.float32)
+    for _ in range(KMEANS_ITERATIONS):
+        labels = _nearest(pixels, centers)
+        counts = np.bincount(labels, minlength=len(centers))
+        sums = np.stack([np.bincount(labels, pixels[:, c], len(centers)) for c in range(channels)], axis=1)
+        filled = counts > 0
+        # Empty clusters keep their previous center
+        updated = centers.copy()
+        updated[filled] = sums[filled] / counts[filled, None]
+        if np.abs(updated - centers).max() < 0.5:
+            centers = updated
+            break
+        centers = updated
+    return Palette(image.mode, np.clip(np.rint(centers), 0, 255).astype(np.uint8).tobytes())
+
+def build_palette(image: Image.Image, colors: int, method: str = DEFAULT_QUANTIZER) -> Palette:
+    """Compute a palette of at most ``colors`` entries from a sample of ``image``."""
+    _check_method(method)
+    image = sample(_normalize(image))
+    if method == 'kmeans':
+        return _kmeans(image, colors)
+    return _palette_from(_pillow_quantize(image, colors, method), image.mode)
+
+def apply_palette(image: Image.Image, palette: Palette) -> Image.Image:
+    """Map every pixel of ``image`` to its nearest palette entry, without dithering."""
+    image = _normalize(image)
+    if palette.mode != image.mode:
+        image = image.convert(palette.mode)
+    # Pad with copies of the last entry so unused slots never win a match
+    padded = palette.entries + palette.entries[-len(palette.mode):] * (256 - len(palette))
+    if palette.mode == 'RGB':
+        target = Image.new('P', (1, 1))
+        target.putpalette(padded)
+        return image.quantize(palette=target, dither=Image.Dither.NONE)
+
+    if np is None:
+        raise ConfigurationError("Mapping RGBA images onto a shared palette requires NumPy")
+    centers = np.frombuffer(palette.entries, dtype=np.uint8).reshape(-1, 4).astype(np.float32)
+    pixels = np.asarray(image, dtype=np.float32).reshape(-1, 4)
+    indices = _nearest(pixels, centers).astype(np.uint8).reshape(image.height, image.width)
+    result = Image.fromarray(indices, 'P')
+    result.putpalette(padded, 'RGBA')
+    return result
+
+def quantize(image: Image.Image, colors: int, method: Optional[str] = None,
+             palette: Optional[Palette] = None) -> Image.Image:
+    """Reduce ``image`` to a 'P' image of at most ``colors`` colors.
+
+    With a precomputed ``palette`` the image is only mapped onto it. Otherwise
+    RGB images over ``DIRECT_PIXELS``, such as full-size sources, get a
+    palette built from a sample, which Pillow maps much faster than it
+    quantizes the full image; RGBA and output-sized images are quantized
+    directly. Results are deterministic for a given input.
+    """
+    method = method or DEFAULT_QUANTIZER
+    _check_method(method)
+    image = _normalize(image)
+    if palette is not None and (palette.mode == 'RGB' or np is not None):
+        return apply_palette(image, palette)
+    if method == 'kmeans' or (image.mode == 'RGB' and image.width * image.height > DIRECT_PIXELS):
+        return apply_palette(image, build_palette(image, colors, method))
+    return _pillow_quantize(image, colors, method)
@@ -4,7 +4,7 @@ Provides centralized component creation with consistent styling.
 """
 from PyQt6.QtWidgets import (
     QGroupBox, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
-    QProgressBar, QLineEdit, QCheckBox, QWidget
+    QProgressBar, QLineEdit, QCheckBox, QListWidget, QWidget
 )
 from PyQt6.QtCore import Qt
 from typing import Optional, Tuple, Callable
@@ -68,6 +68,19 @@ class ComponentFactory:
             checkbox.stateChanged.connect(callback)
         return checkbox
 
+    @staticmethod
+    def create_list(
+        max_height: Optional[int] = None,
+        visible: bool = True,
+        parent: Optional[QWidget] = None
+    ) -> QListWidget:
+        """Create a styled list"""
+        list_widget = QListWidget(parent)
+        if max_height:
+            list_widget.setMaximumHeight(max_height)
+        list_widget.setVisible(visible)
+        return list_widget
+
     @staticmethod
     def create_input_field(
         placeholder: str = "",
@@ -92,6 +105,20 @@ class ComponentFactory:
         label.setAlignment(alignment)
         return label
 
+    @staticmethod
+    def create_preview_tile(
+        tooltip: str,
+        size: int,
+        parent: Optional[QWidget] = None
+    ) -> QLabel:
+        """Create a styled tile showing the preview of one output format"""
+        label = QLabel(parent)
+        label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        label.setToolTip(tooltip)
+        label.setMinimumSize(size // 2, size // 2)
+        label.setStyleSheet(StyleConfig.get_preview_tile_style())
+        return label
+
     @staticmethod
     def create_status_label(
         text: str = "Ready",
@@ -1,21 +1,34 @@
 """Main window implementation for LogoCraft app."""
 import os
 import logging
-from typing import Dict, Optional
+from typing import Dict, Iterable, List, Optional, Union
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QFileDialog, QLabel, QCheckBox
+    QFileDialog, QLabel, QCheckBox, QListWidgetItem
 )
-from PyQt6.QtCore import Qt, QPoint
-from PyQt6.QtGui import QPixmap, QMouseEvent, QDragEnterEvent, QDropEvent
+from PyQt6.QtCore import Qt, QPoint, QThreadPool, QTimer
+from PyQt6.QtGui import QPixmap, QImage, QMouseEvent, QDragEnterEvent, QDropEvent, QCloseEvent
+from src.processors.decoded_source import DecodedSource
+from src.processors.format_previews import FormatPreviews
 from src.processors.image_processor import ImageProcessor
 from src.config import config_manager
 from src.core.error_handler import handle_errors
 from .style_config import StyleConfig
 from .component_factory import ComponentFactory
+from .preview_loader import FormatPreviewJob, FormatPreviewSignals, PreviewLoader, to_qimage
+from .processing_worker import ProcessingJob, QueueJob
 
 logger = logging.getLogger(__name__)
 
+# Longest side of the preview thumbnail, in pixels
+PREVIEW_SIZE = 200
+
+# Longest side of each output format preview, in pixels
+FORMAT_PREVIEW_SIZE = 80
+
+# Quiet time after the last format toggle before previews are rendered, in milliseconds
+FORMAT_PREVIEW_DELAY = 150
+
 class DraggableImageLabel(QLabel):
     """Draggable image preview label with drop support"""
     def __init__(self):
@@ -34,21 +47,20 @@ class DraggableImageLabel(QLabel):
         if event.mimeData().hasUrls():
             for url in event.mimeData().urls():
                 file_path = url.toLocalFile()
-                if file_path.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff', '.webp')):
+                if os.path.isdir(file_path) or file_path.lower().endswith(config_manager.config.supported_formats):
                     event.acceptProposedAction()
                     return
         event.ignore()
 
     def dropEvent(self, event: QDropEvent):
         if event.mimeData().hasUrls():
-            for url in event.mimeData().urls():
-                file_path = url.toLocalFile()
-                if file_path.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff', '.webp')):
-                    main_window = self.window()
-                    if isinstance(main_window, ImageProcessorGUI):
-                        main_window.process_selected_file(file_path)
-                    break
+            # Every dropped file and folder; add_files skips anything unsupported
+            paths = [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
+            main_window = self.window()
+            if paths and isinstance(main_window, ImageProcessorGUI):
+                main_window.add_files(paths)
             event.acceptProposedAction()
+            return
         event.ignore()
 
     def mousePressEvent(self, event: QMouseEvent):
@@ -86,8 +98,30 @@ class ImageProcessorGUI(QMainWindow):
     def __init__(self):
         super().__init__()
         self.current_file: Optional[str] = None
+        # Decode of the current file shared by its preview and processing
+        self.source: Optional[DecodedSource] = None
         self.format_checks: Dict[str, QCheckBox] = {}
+        # Files waiting for batch processing; empty while a single file is selected
+        self.queue: List[str] = []
         self.image_processor = ImageProcessor()
+        self.thread_pool = QThreadPool.globalInstance()
+        self._job: Optional[Union[ProcessingJob, QueueJob]] = None
+        self._failed_formats: list[str] = []
+        self._load_failed = False
+        self._queue_failures = 0
+        self.preview_loader = PreviewLoader(PREVIEW_SIZE, thread_pool=self.thread_pool)
+        self.preview_loader.signals.ready.connect(self._show_preview)
+        self.preview_loader.signals.failed.connect(self._show_preview_error)
+        # Output format previews of the current file
+        self.format_previews: Optional[FormatPreviews] = None
+        self.format_preview_tiles: Dict[str, QLabel] = {}
+        self.format_preview_signals = FormatPreviewSignals()
+        self.format_preview_signals.ready.connect(self._show_format_preview)
+        self.format_preview_signals.failed.connect(self._show_format_preview_error)
+        self._format_preview_timer = QTimer(self)
+        self._format_preview_timer.setSingleShot(True)
+        self._format_preview_timer.setInterval(FORMAT_PREVIEW_DELAY)
+        self._format_preview_timer.timeout.connect(self.update_format_previews)
         self._setup_ui()
         logger.info("Application window initialized")
     
@@ -104,7 +138,9 @@ class ImageProcessorGUI(QMainWindow):
         main_layout.setContentsMargins(6, 6, 6, 6)
 
         main_layout.addWidget(self._create_preview_group())
+        main_layout.addWidget(self._create_queue_group())
         main_layout.addWidget(self._create_output_group())
+        main_layout.addWidget(self._create_format_preview_group())
         main_layout.addWidget(self._create_process_group())
         main_layout.addWidget(self._create_formats_group())
 
@@ -119,7 +155,7 @@ class ImageProcessorGUI(QMainWindow):
         controls.setSpacing(4)
 
         self.select_button = ComponentFactory.create_button(
-            "Select Image",
+            "Select Images",
             callback=self.select_files
         )
         controls.addWidget(self.select_button)
@@ -130,6 +166,23 @@ class ImageProcessorGUI(QMainWindow):
         layout.addLayout(controls)
         return group
 
+    def _create_queue_group(self) -> QWidget:
+        """Create the queue section, shown once several files are added"""
+        self.queue_group, layout = ComponentFactory.create_group_box("Queue")
+
+        self.queue_list = ComponentFactory.create_list(max_height=120)
+        self.queue_list.currentRowChanged.connect(self._preview_queued)
+        layout.addWidget(self.queue_list)
+
+        self.clear_queue_button = ComponentFactory.create_button(
+            "Clear Queue",
+            callback=self.clear_queue
+        )
+        layout.addWidget(self.clear_queue_button)
+
+        self.queue_group.setVisible(False)
+        return self.queue_group
+
     def _create_output_group(self) -> QWidget:
         """Create the output options section"""
         group, layout = ComponentFactory.create_group_box("Output Options")
@@ -144,11 +197,24 @@ class ImageProcessorGUI(QMainWindow):
 
         for label, filename in formats:
             checkbox = ComponentFactory.create_checkbox(label, checked=True)
+            checkbox.toggled.connect(self._schedule_format_previews)
             self.format_checks[filename] = checkbox
             layout.addWidget(checkbox)
 
         return group
 
+    def _create_format_preview_group(self) -> QWidget:
+        """Create the strip previewing each checked output format"""
+        self.format_preview_group, layout = ComponentFactory.create_group_box("Output Preview", QHBoxLayout)
+
+        for filename in self.format_checks:
+            tile = ComponentFactory.create_preview_tile(filename, FORMAT_PREVIEW_SIZE)
+            self.format_preview_tiles[filename] = tile
+            layout.addWidget(tile)
+
+        self.format_preview_group.setVisible(False)
+        return self.format_preview_group
+
     def _create_process_group(self) -> QWidget:
         """Create the processing section"""
         group, layout = ComponentFactory.create_group_box("Output & Processing")
@@ -198,44 +264,141 @@ class ImageProcessorGUI(QMainWindow):
 
     @handle_errors(logger)
     def select_files(self, sender=None):
-        file_name, _ = QFileDialog.getOpenFileName(
+        file_names, _ = QFileDialog.getOpenFileNames(
             self,
-            "Select Image File",
+            "Select Image Files",
             "",
             "Image Files (*.png *.jpg *.jpeg *.bmp *.gif *.tiff *.webp);;All Files (*)"
         )
-        if file_name:
-            self.process_selected_file(file_name)
+        if file_names:
+            self.add_files(file_names)
+
+    @staticmethod
+    def _expand_paths(paths: Iterable[str]) -> List[str]:
+        """Supported image files among ``paths``, with folders searched recursively"""
+        from src import batch  # Loads the process pool machinery, only needed for folders
+
+        supported = config_manager.config.supported_formats
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                files.extend(batch.find_images(path, supported))
+            elif path.lower().endswith(supported):
+                files.append(path)
+        return files
+
+    @handle_errors(logger)
+    def add_files(self, paths: Iterable[str]):
+        """Select a single image, or queue several images and folders for batch processing"""
+        if self._job is not None:
+            self.statusBar().showMessage("Wait for processing to finish before adding files")
+            return
+        files = self._expand_paths(paths)
+        if not files:
+            self.statusBar().showMessage("No supported images found")
+            return
+        if len(files) == 1 and not self.queue:
+            self.process_selected_file(files[0])
+            return
+
+        if not self.queue and self.current_file:
+            # A file selected on its own joins the queue as its first entry
+            files.insert(0, self.current_file)
+        for file_path in files:
+            if file_path not in self.queue:
+                self.queue.append(file_path)
+                item = QListWidgetItem(f"{os.path.basename(file_path)} - queued")
+                item.setToolTip(file_path)
+                self.queue_list.addItem(item)
+        self.queue_group.setVisible(True)
+        self.process_button.setText(f"Process {len(self.queue)} Images")
+        self.process_button.setEnabled(True)
+        self.statusBar().showMessage(f"{len(self.queue)} images queued")
+        self.queue_list.setCurrentRow(self.queue.index(files[0]))
+
+    def _preview_queued(self, row: int):
+        if 0 <= row < len(self.queue) and self.queue[row] != self.current_file:
+            self.process_selected_file(self.queue[row])
+
+    @handle_errors(logger)
+    def clear_queue(self, sender=None):
+        if self._job is not None:
+            return
+        self.queue = []
+        self.queue_list.clear()
+        self.queue_group.setVisible(False)
+        self.process_button.setText("Process Image")
+        self.process_button.setEnabled(self.current_file is not None)
 
     @handle_errors(logger)
     def process_selected_file(self, file_name: str):
         self.current_file = file_name
+        # Covers every configured format, so any selection can be rendered from it
+        self.source = DecodedSource(file_name, config_manager.snapshot().formats.values())
         self.file_status_label.setText(os.path.basename(file_name))
         self.process_button.setEnabled(True)
+        self.format_previews = FormatPreviews(self.source, FORMAT_PREVIEW_SIZE)
+        for format_key, tile in self.format_preview_tiles.items():
+            tile.clear()
+            tile.setToolTip(format_key)
         self.update_preview(file_name)
+        self._schedule_format_previews()
 
     @handle_errors(logger)
     def update_preview(self, file_path: str):
-        try:
-            pixmap = QPixmap(file_path)
-            if not pixmap.isNull():
-                max_size = 200  # Increased from 180 to ensure full preview visibility
-                scale_factor = min(
-                    max_size / pixmap.width(),
-                    max_size / pixmap.height()
-                )
-
-                scaled_pixmap = pixmap.scaled(
-                    int(pixmap.width() * scale_factor),
-                    int(pixmap.height() * scale_factor),
-                    Qt.AspectRatioMode.KeepAspectRatio,
-                    Qt.TransformationMode.SmoothTransformation
-                )
-                self.preview_label.setPixmap(scaled_pixmap)
+        """Show the preview of ``file_path`` once its thumbnail is ready; instant when cached"""
+        decode = self.source.image if self.source and self.source.file_path == file_path else None
+        if not self.preview_loader.request(file_path, decode):
+            self.preview_label.setText("Loading preview...")
+
+    def _show_preview(self, file_path: str, thumbnail: QImage):
+        # A slow decode may finish after another file was selected
+        if file_path == self.current_file:
+            self.preview_label.setPixmap(QPixmap.fromImage(thumbnail))
+
+    def _show_preview_error(self, file_path: str, message: str):
+        if file_path == self.current_file:
+            self.preview_label.setText(f"Preview error: {message}")
+
+    def _schedule_format_previews(self, *args):
+        """Render the format previews once the checkboxes have stopped changing"""
+        self._format_preview_timer.start()
+
+    @handle_errors(logger)
+    def update_format_previews(self):
+        """Show a preview of every checked format; already rendered ones appear at once"""
+        self.format_preview_group.setVisible(self.format_previews is not None)
+        if self.format_previews is None:
+            return
+        snapshot = config_manager.snapshot()
+        if not self.source.covers(snapshot.formats.values()):
+            # The config changed since the file was selected
+            self.source = DecodedSource(self.current_file, snapshot.formats.values())
+            self.format_previews = FormatPreviews(self.source, FORMAT_PREVIEW_SIZE)
+        missing = {}
+        for format_key, tile in self.format_preview_tiles.items():
+            format_spec = snapshot.get_format(format_key)
+            tile.setVisible(self.format_checks[format_key].isChecked() and format_spec is not None)
+            if not tile.isVisibleTo(self.format_preview_group):
+                continue
+            preview = self.format_previews.cached(format_spec)
+            if preview is not None:
+                tile.setPixmap(QPixmap.fromImage(to_qimage(preview)))
             else:
-                self.preview_label.setText("Unable to load preview")
-        except Exception as e:
-            self.preview_label.setText(f"Preview error: {str(e)}")
+                tile.setText("Rendering...")
+                missing[format_key] = format_spec
+        if missing:
+            self.thread_pool.start(FormatPreviewJob(self.format_previews, missing, self.format_preview_signals))
+
+    def _show_format_preview(self, file_path: str, format_key: str, preview: QImage):
+        # Drop results for another file or a format unchecked meanwhile
+        if file_path == self.current_file and self.format_checks[format_key].isChecked():
+            self.format_preview_tiles[format_key].setPixmap(QPixmap.fromImage(preview))
+
+    def _show_format_preview_error(self, file_path: str, format_key: str, message: str):
+        if file_path == self.current_file:
+            self.format_preview_tiles[format_key].setText("Error")
+            self.format_preview_tiles[format_key].setToolTip(f"{format_key}: {message}")
 
     @handle_errors(logger)
     def browse_directory(self, sender=None):
@@ -249,39 +412,149 @@ class ImageProcessorGUI(QMainWindow):
 
     @handle_errors(logger)
     def process_images(self, *args):
-        """Process the selected image"""
+        """Process the selected image in the background; while running, cancel it instead"""
+        if self._job is not None:
+            self._job.cancel()
+            self.process_button.setEnabled(False)
+            self.statusBar().showMessage("Cancelling...")
+            return
+        if len(self.queue) > 1:
+            self.process_queue()
+            return
         if not self.current_file:
             return
 
+        # One snapshot for the whole job, so a config reload cannot mix format versions
+        snapshot = config_manager.snapshot()
+        format_specs = self._selected_format_specs(snapshot)
+        if not format_specs:
+            return
+
+        output_dir = self._output_dir()
+        output_paths = {key: os.path.normpath(os.path.join(output_dir, key)) for key in format_specs}
+
+        if self.source is None or not self.source.covers(format_specs.values()):
+            # The config changed since the file was selected
+            self.source = DecodedSource(self.current_file, snapshot.formats.values())
+        self._job = ProcessingJob(self.current_file, format_specs, output_paths, source=self.source)
+        self._job.signals.progress.connect(self._on_progress)
+        self._job.signals.format_finished.connect(self._on_format_finished)
+        self._job.signals.format_failed.connect(self._on_format_failed)
+        self._job.signals.failed.connect(self._on_processing_failed)
+        self._job.signals.finished.connect(self._on_processing_finished)
+        self._failed_formats = []
+        self._load_failed = False
+
+        self._start_job(len(format_specs))
+
+    def _selected_format_specs(self, snapshot) -> Dict[str, object]:
+        """Checked formats that exist in ``snapshot``"""
         selected_formats = [fmt for fmt, cb in self.format_checks.items() if cb.isChecked()]
         if not selected_formats:
             self.statusBar().showMessage("Please select at least one output format")
-            return
-
-        self.progress_bar.setVisible(True)
-        self.progress_bar.setMaximum(len(selected_formats))
+            return {}
+        format_specs = {}
+        for format_key in selected_formats:
+            format_spec = snapshot.get_format(format_key)
+            if not format_spec:
+                logger.warning(f"No format specification found for {format_key}")
+                continue
+            format_specs[format_key] = format_spec
+        return format_specs
+
+    def _output_dir(self) -> str:
+        output_dir = self.dir_path.text()
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+            logger.info(f"Created output directory: {output_dir}")
+        return output_dir
+
+    def _start_job(self, steps: int):
+        self.progress_bar.setMaximum(steps)
         self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.process_button.setText("Cancel")
+        self.select_button.setEnabled(False)
+        self.clear_queue_button.setEnabled(False)
+        self.statusBar().showMessage("Processing...")
+        self.thread_pool.start(self._job)
+
+    def _finish_job(self):
+        self._job = None
+        self.progress_bar.setVisible(False)
+        self.process_button.setText(f"Process {len(self.queue)} Images" if len(self.queue) > 1 else "Process Image")
+        self.process_button.setEnabled(True)
+        self.select_button.setEnabled(True)
+        self.clear_queue_button.setEnabled(True)
 
-        try:
-            image = self.image_processor.load_image(self.current_file)
-            output_dir = self.dir_path.text()
-            
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir)
-                logger.info(f"Created output directory: {output_dir}")
-
-            for i, format_key in enumerate(selected_formats):
-                format_spec = config_manager.get_format(format_key)
-                if not format_spec:
-                    logger.warning(f"No format specification found for {format_key}")
-                    continue
-
-                output_path = os.path.join(output_dir, format_key).replace('/', '\\')
-                self.image_processor.process_image(image, format_spec, output_path)
-                self.progress_bar.setValue(i + 1)
-
+    @handle_errors(logger)
+    def process_queue(self):
+        """Process every queued image on a pool of worker processes, each into its own folder"""
+        format_specs = self._selected_format_specs(config_manager.snapshot())
+        if not format_specs:
+            return
+        from src import batch
+
+        plan = batch.plan_output_dirs(self.queue, self._output_dir())
+        for row in range(self.queue_list.count()):
+            self.queue_list.item(row).setText(f"{os.path.basename(self.queue[row])} - queued")
+        self._queue_failures = 0
+        self._job = QueueJob(plan, format_specs)
+        self._job.signals.file_finished.connect(self._on_queue_file_finished)
+        self._job.signals.progress.connect(self._on_queue_progress)
+        self._job.signals.finished.connect(self._on_queue_finished)
+        self._start_job(len(plan))
+
+    def _on_queue_file_finished(self, source: str, outputs: int, error: str):
+        if source not in self.queue:
+            return
+        if error:
+            self._queue_failures += 1
+        status = f"failed: {error}" if error else f"done ({outputs} outputs)"
+        self.queue_list.item(self.queue.index(source)).setText(f"{os.path.basename(source)} - {status}")
+
+    def _on_queue_progress(self, done: int, total: int, images_per_second: float, eta_seconds: float):
+        self.progress_bar.setValue(done)
+        eta = f", about {eta_seconds:.0f}s left" if eta_seconds >= 0 and done < total else ""
+        self.statusBar().showMessage(f"{done}/{total} images, {images_per_second:.1f} images/sec{eta}")
+
+    def _on_queue_finished(self, cancelled: bool):
+        self._finish_job()
+        done = self.progress_bar.value()
+        if cancelled:
+            self.statusBar().showMessage(f"Processing cancelled after {done} of {len(self.queue)} images")
+        else:
+            self.statusBar().showMessage(
+                f"Processed {len(self.queue)} images ({self._queue_failures} failed)"
+            )
+
+    def _on_progress(self, done: int, total: int):
+        self.progress_bar.setValue(done)
+
+    def _on_format_finished(self, format_key: str, output_path: str):
+        self.statusBar().showMessage(f"Saved {format_key}")
+
+    def _on_format_failed(self, format_key: str, message: str):
+        self._failed_formats.append(format_key)
+        self.statusBar().showMessage(f"Error processing {format_key}: {message}")
+
+    def _on_processing_failed(self, message: str):
+        self._load_failed = True
+        self.statusBar().showMessage(f"Error loading image: {message}")
+
+    def _on_processing_finished(self, cancelled: bool):
+        self._finish_job()
+        if cancelled:
+            self.statusBar().showMessage("Processing cancelled")
+        elif self._failed_formats:
+            self.statusBar().showMessage(f"Failed: {', '.join(self._failed_formats)}")
+        elif not self._load_failed:
             self.statusBar().showMessage("Processing complete!")
             logger.info("Image processing completed successfully")
 
-        finally:
-            self.progress_bar.setVisible(False)
+    def closeEvent(self, event: QCloseEvent):
+        """Stop a running job before the window goes away"""
+        if self._job is not None:
+            self._job.cancel()
+        self.thread_pool.waitForDone()
+        super().closeEvent(event)
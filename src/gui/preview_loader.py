@@ -0,0 +1,104 @@
+"""Asynchronous preview thumbnails for the main window."""
+import logging
+from typing import Callable, Mapping, Optional
+from PIL import Image
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QImage
+from src.core.image_format import OutputFormat
+from src.processors import thumbnails
+from src.processors.format_previews import FormatPreviews
+from src.processors.thumbnails import ThumbnailCache
+
+logger = logging.getLogger(__name__)
+
+def to_qimage(image: Image.Image) -> QImage:
+    """Copy an RGBA Pillow image into a QImage, which unlike QPixmap may be built off the GUI thread.
+
+    The pixels are pasted straight into the QImage's own buffer, so they are
+    copied once and the QImage can outlive ``image`` and cross threads.
+    """
+    if image.mode != 'RGBA':
+        image = image.convert('RGBA')
+    image.load()
+    qimage = QImage(image.width, image.height, QImage.Format.Format_RGBA8888)
+    bits = qimage.bits()
+    bits.setsize(qimage.sizeInBytes())
+    target = Image.frombuffer('RGBA', image.size, bits, 'raw', 'RGBA', qimage.bytesPerLine(), 1)
+    # Image.paste would copy the read-only mapped image first; the core paste writes through
+    target.im.paste(image.im, (0, 0) + image.size)
+    return qimage
+
+class PreviewSignals(QObject):
+    ready = pyqtSignal(str, QImage)    # File path, thumbnail
+    failed = pyqtSignal(str, str)      # File path, error message
+
+class _ThumbnailJob(QRunnable):
+    def __init__(self, cache: ThumbnailCache, file_path: str, max_size: int, signals: PreviewSignals,
+                 decode: Optional[Callable[[], Image.Image]] = None):
+        super().__init__()
+        self.cache = cache
+        self.file_path = file_path
+        self.max_size = max_size
+        self.signals = signals
+        self.decode = decode
+
+    def run(self) -> None:
+        try:
+            thumbnail = self.cache.get(self.file_path, self.max_size, self.decode)
+        except Exception as e:
+            logger.error(f"Error creating preview for {self.file_path}: {e}")
+            self.signals.failed.emit(self.file_path, str(e))
+            return
+        self.signals.ready.emit(self.file_path, to_qimage(thumbnail))
+
+class PreviewLoader(QObject):
+    """Deliver preview thumbnails through ``signals.ready`` without blocking the GUI thread.
+
+    Thumbnails already in memory are delivered before ``request`` returns;
+    anything else is read from the disk cache (``thumbnails.CACHE_DIR``)
+    or decoded on ``thread_pool``. Results for a file that is no longer
+    wanted still arrive, so receivers compare the path.
+    """
+    def __init__(self, max_size: int, cache: Optional[ThumbnailCache] = None,
+                 thread_pool: Optional[QThreadPool] = None):
+        super().__init__()
+        self.max_size = max_size
+        self.cache = cache if cache is not None else ThumbnailCache(thumbnails.CACHE_DIR)
+        self.thread_pool = thread_pool or QThreadPool.globalInstance()
+        self.signals = PreviewSignals()
+
+    def request(self, file_path: str, decode: Optional[Callable[[], Image.Image]] = None) -> bool:
+        """Ask for the preview of ``file_path``; True when it was delivered immediately from memory.
+
+        ``decode`` supplies the decoded source if the thumbnail has to be rendered.
+        """
+        thumbnail = self.cache.cached(file_path, self.max_size)
+        if thumbnail is not None:
+            self.signals.ready.emit(file_path, to_qimage(thumbnail))
+            return True
+        self.thread_pool.start(_ThumbnailJob(self.cache, file_path, self.max_size, self.signals, decode))
+        return False
+
+class FormatPreviewSignals(QObject):
+    ready = pyqtSignal(str, str, QImage)   # File path, format key, preview
+    failed = pyqtSignal(str, str, str)     # File path, format key, error message
+
+class FormatPreviewJob(QRunnable):
+    """Render the previews of ``format_specs`` on a pool thread, one signal per format."""
+    def __init__(self, previews: FormatPreviews, format_specs: Mapping[str, OutputFormat],
+                 signals: FormatPreviewSignals):
+        super().__init__()
+        self.previews = previews
+        self.format_specs = dict(format_specs)
+        self.signals = signals
+
+    def run(self) -> None:
+        file_path = self.previews.source.file_path
+        for format_key, format_spec in self.format_specs.items():
+            try:
+                preview = self.previews.render(format_spec)
+            except Exception as e:
+                logger.error(f"Error previewing {format_key} for {file_path}: {e}")
+                self.signals.failed.emit(file_path, format_key, str(e))
+                continue
+            self.signals.ready.emit(file_path, format_key, to_qimage(preview))
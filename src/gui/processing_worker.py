@@ -0,0 +1,167 @@
+"""Background processing of the selected image, or a queue of images, for the main window."""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Mapping, Optional, Tuple
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+from src.core.image_format import OutputFormat
+from src.processors.decoded_source import DecodedSource
+from src.processors.fan_out import FanOutProcessor
+
+logger = logging.getLogger(__name__)
+
+class ProcessingSignals(QObject):
+    """Signals of a ``ProcessingJob``, delivered to the GUI thread by Qt's queued connections."""
+    progress = pyqtSignal(int, int)            # Formats done (saved or failed), total formats
+    format_finished = pyqtSignal(str, str)     # Format key, output path
+    format_failed = pyqtSignal(str, str)       # Format key, error message
+    failed = pyqtSignal(str)                   # Error message when the source cannot be loaded or planned
+    finished = pyqtSignal(bool)                # True when the job was cancelled
+
+class ProcessingJob(QRunnable):
+    """Load one image and render every selected format off the GUI thread.
+
+    Formats render in parallel on ``render_threads`` threads (by default one
+    per format, up to the CPU count) from a single shared ``FanOutProcessor``;
+    Pillow releases the GIL while resampling and encoding. Each output is
+    saved directly from its render thread, so ``format_finished`` means the
+    file is on disk. ``cancel`` stops formats that have not started yet.
+
+    With a ``source`` the job renders from its shared decode (made by the
+    preview, or by an earlier job) instead of decoding the file again.
+    """
+    def __init__(self, file_path: str, format_specs: Mapping[str, OutputFormat],
+                 output_paths: Mapping[str, str], render_threads: Optional[int] = None,
+                 source: Optional[DecodedSource] = None):
+        super().__init__()
+        self.file_path = file_path
+        self.source = source
+        self.format_specs = dict(format_specs)
+        self.output_paths = dict(output_paths)
+        self.render_threads = render_threads or min(len(self.format_specs), os.cpu_count() or 1) or 1
+        self.signals = ProcessingSignals()
+        self._cancelled = threading.Event()
+        # Keep the Python object (and its signals) alive until the GUI drops it
+        self.setAutoDelete(False)
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def run(self) -> None:
+        try:
+            if self.source is not None:
+                renderer = FanOutProcessor(self.source.image())
+            else:
+                renderer = FanOutProcessor.from_file(self.file_path, formats=self.format_specs.values())
+            with renderer, ThreadPoolExecutor(max_workers=self.render_threads, thread_name_prefix='render') as executor:
+                renderer.plan(self.format_specs.values())
+                self._render_all(renderer, executor)
+        except Exception as e:
+            logger.error(f"Error processing {self.file_path}: {e}")
+            self.signals.failed.emit(str(e))
+        finally:
+            # Always delivered, so the window never waits on a job that died
+            self.signals.finished.emit(self.cancelled)
+
+    def _render_all(self, renderer: FanOutProcessor, executor: ThreadPoolExecutor) -> None:
+        total, done = len(self.format_specs), 0
+        futures = {executor.submit(self._render, renderer, key): key for key in self.format_specs}
+        for future in as_completed(futures):
+            format_key = futures[future]
+            error = future.exception()
+            if error is None and not future.result():
+                continue
+            if error is not None:
+                logger.error(f"Error rendering {format_key}: {error}")
+                self.signals.format_failed.emit(format_key, str(error))
+            else:
+                self.signals.format_finished.emit(format_key, self.output_paths[format_key])
+            done += 1
+            self.signals.progress.emit(done, total)
+
+    def _render(self, renderer: FanOutProcessor, format_key: str) -> bool:
+        """Render and save one format; False when it was skipped because of cancellation."""
+        if self.cancelled:
+            return False
+        renderer.process(self.format_specs[format_key], self.output_paths[format_key])
+        return True
+
+def throughput(done: int, total: int, elapsed: float) -> Tuple[float, Optional[float]]:
+    """Images per second so far and the estimated seconds left; None until the first image is done."""
+    if done == 0 or elapsed <= 0:
+        return 0.0, None
+    rate = done / elapsed
+    return rate, (total - done) / rate
+
+class QueueSignals(QObject):
+    """Signals of a ``QueueJob``."""
+    file_finished = pyqtSignal(str, int, str)      # Source path, outputs written, error message ('' on success)
+    progress = pyqtSignal(int, int, float, float)  # Files done, total files, images per second, ETA seconds (-1 unknown)
+    finished = pyqtSignal(bool)                    # True when the queue was cancelled
+
+class QueueJob(QRunnable):
+    """Render every format for a queue of sources across a pool of worker processes.
+
+    ``plan`` maps each source to its own output folder, as
+    ``batch.plan_output_dirs`` builds it. Every file runs through
+    ``batch.process_file``, so results match the batch CLI. Workers are
+    spawned rather than forked, since forking a process that runs Qt threads
+    is unsafe. ``cancel`` drops the files that have not started; files
+    already rendering finish first.
+    """
+    def __init__(self, plan: Mapping[str, str], format_specs: Mapping[str, OutputFormat],
+                 workers: Optional[int] = None):
+        super().__init__()
+        self.plan = dict(plan)
+        self.format_specs = dict(format_specs)
+        self.workers = max(1, min(workers or os.cpu_count() or 1, len(self.plan)))
+        self.signals = QueueSignals()
+        self._cancelled = threading.Event()
+        self.setAutoDelete(False)
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def run(self) -> None:
+        # Imported here, so opening the window does not load the process pool machinery
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        from src import batch
+
+        total, done = len(self.plan), 0
+        start = time.perf_counter()
+        executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=batch._init_worker, initargs=(None, 0))
+        try:
+            sources = {executor.submit(batch.process_file, source, output_dir, self.format_specs): source
+                       for source, output_dir in self.plan.items()}
+            pending = set(sources)
+            while pending and not self.cancelled:
+                # Wake up regularly, so a cancel does not wait for the next file to finish
+                finished, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # The worker process itself failed, e.g. it was killed
+                        logger.error(f"Worker failed: {e}")
+                        result = batch.BatchResult(sources[future], self.plan[sources[future]], error=str(e))
+                    if result.error:
+                        logger.error(f"Failed to process {result.source}: {result.error}")
+                    self.signals.file_finished.emit(result.source, result.outputs, result.error or '')
+                    done += 1
+                    rate, eta = throughput(done, total, time.perf_counter() - start)
+                    self.signals.progress.emit(done, total, rate, -1.0 if eta is None else eta)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        self.signals.finished.emit(self.cancelled)
@@ -95,6 +95,17 @@ class StyleConfig:
             QLabel {{
                 color: {StyleConfig.colors['text']};
             }}
+            QListWidget {{
+                border: 1px solid {StyleConfig.colors['border']};
+                border-radius: 3px;
+                background-color: {StyleConfig.colors['white']};
+                color: {StyleConfig.colors['text']};
+                font-size: 9pt;
+            }}
+            QListWidget::item:selected {{
+                background-color: {StyleConfig.colors['primary_hover']};
+                color: {StyleConfig.colors['text']};
+            }}
             QStatusBar {{
                 background-color: {StyleConfig.colors['background']};
                 color: {StyleConfig.colors['text']};
@@ -119,3 +130,17 @@ class StyleConfig:
                 border-color: {StyleConfig.colors['primary']};
             }}
         """
+
+    @staticmethod
+    def get_preview_tile_style() -> str:
+        """Get style for output format preview tiles."""
+        return f"""
+            QLabel {{
+                background-color: {StyleConfig.colors['white']};
+                border: 1px solid {StyleConfig.colors['border']};
+                border-radius: 4px;
+                color: {StyleConfig.colors['disabled']};
+                font-size: 8pt;
+                padding: 2px;
+            }}
+        """
@@ -1,12 +1,19 @@
 import sys
 import os
-from PyQt6.QtWidgets import QApplication
-from PyQt6.QtGui import QIcon
-from PyQt6.QtCore import Qt
-from src.gui import ImageProcessorGUI
+import logging
+import multiprocessing
 
 def main():
     """Main application entry point"""
+    # The library leaves logging alone; the app logs at INFO
+    logging.basicConfig(level=logging.INFO)
+
+    # Imported here, so importing src.main stays cheap for headless users and tools
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtGui import QIcon
+    from PyQt6.QtCore import Qt
+    from src.gui import ImageProcessorGUI
+
     # Enable High DPI scaling
     if hasattr(Qt.ApplicationAttribute, 'AA_EnableHighDpiScaling'):
         QApplication.setAttribute(Qt.ApplicationAttribute.AA_EnableHighDpiScaling, True)
@@ -27,4 +34,6 @@ def main():
     return app.exec()
 
 if __name__ == '__main__':
+    # In the frozen build, spawned queue workers must run as workers, not reopen the GUI
+    multiprocessing.freeze_support()
     sys.exit(main())
\ No newline at end of file
@@ -1,3 +1,4 @@
 from .image_processor import ImageProcessor
+from .fan_out import FanOutProcessor
 
-__all__ = ['ImageProcessor']
+__all__ = ['ImageProcessor', 'FanOutProcessor']
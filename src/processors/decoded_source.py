@@ -0,0 +1,58 @@
+"""A source file decoded once and shared by the preview and processing."""
+import logging
+import os
+import threading
+from typing import Iterable, Optional
+from PIL import Image
+from src.core.image_format import OutputFormat
+from .image_processor import ImageProcessor
+
+logger = logging.getLogger(__name__)
+
+class DecodedSource:
+    """Decode ``file_path`` on first use and keep the pixels for every later user.
+
+    The decode covers all ``formats`` the file may be rendered to, so JPEG
+    sources are draft-decoded and very large sources reduced exactly as
+    ``ImageProcessor.load_image`` does; processing any subset of them reuses
+    it. If the file changes on disk it is decoded again. The image is shared,
+    so users must not modify it in place. Safe to use from several threads.
+    """
+    def __init__(self, file_path: str, formats: Iterable[OutputFormat]):
+        self.file_path = file_path
+        self.formats = list(formats)
+        self.decodes = 0
+        self._image: Optional[Image.Image] = None
+        self._stamp: Optional[tuple[int, int]] = None
+        self._lock = threading.Lock()
+
+    def _current_stamp(self) -> tuple[int, int]:
+        stat = os.stat(self.file_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def covers(self, formats: Iterable[OutputFormat]) -> bool:
+        """Whether the decode was made for all of ``formats``."""
+        return all(format_spec in self.formats for format_spec in formats)
+
+    @property
+    def decoded(self) -> bool:
+        """Whether the pixels are already in memory."""
+        return self._image is not None
+
+    def image(self) -> Image.Image:
+        """The decoded source, decoding it on the first call."""
+        stamp = self._current_stamp()
+        with self._lock:
+            if self._image is None or stamp != self._stamp:
+                if self._image is not None:
+                    logger.info(f"{self.file_path} changed on disk, decoding it again")
+                image = ImageProcessor.load_image(self.file_path, self.formats)
+                image.load()
+                self._image, self._stamp = image, stamp
+                self.decodes += 1
+            return self._image
+
+    def release(self) -> None:
+        """Drop the decoded pixels; the next ``image`` call decodes again."""
+        with self._lock:
+            self._image = None
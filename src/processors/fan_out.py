@@ -0,0 +1,232 @@
+"""Decode-once, multi-output rendering for a set of output formats."""
+import logging
+import os
+import threading
+from dataclasses import replace
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+from PIL import Image
+from src.core.image_format import OutputFormat
+from src.core import metrics, quantization, resampling
+from src.core.compositing import WHITE, flatten_premultiplied
+from src.core.dithering import dither
+from src.core.output_writer import OutputWriter, PendingWrite
+from src.core.quantization import Palette
+from src.core.resampling import Box, reduce_for_target
+from .image_processor import ImageProcessor
+from .output_cache import OutputCache
+from .resampling_dag import ResamplingDAG
+
+logger = logging.getLogger(__name__)
+
+class FanOutProcessor:
+    """Render every selected output format from one shared working copy.
+
+    The source is decoded and normalized once into premultiplied RGBa. Each
+    output is resampled from that copy, so the full-resolution conversion
+    that ``ImageProcessor.process_image`` repeats per format happens once.
+    Outputs with a white background are flattened after downscaling.
+
+    Large sources are box-reduced by whole factors before the final LANCZOS
+    pass. Reductions are kept and reused, so outputs of similar size share
+    one reduced intermediate. ``process_all`` also plans a resampling DAG:
+    smaller outputs are resampled from a larger rendered output when a
+    quality check shows the result is equivalent, see ``resampling_dag``.
+
+    Formats with a ``colors`` limit share one palette per quantizer, color
+    count, mode and background, computed from a sample of the source.
+
+    With an ``OutputCache`` the working copy is only built on the first
+    cache miss, so a fully cached source is never decoded.
+
+    With an ``OutputWriter`` outputs are encoded in memory and written in the
+    background while the next format renders; flush the writer before
+    relying on the files.
+
+    ``process`` and ``render`` may run on several threads at once: the
+    working copy, reductions and palettes are built once under a lock, and
+    the resampling itself runs in parallel, since Pillow releases the GIL
+    while resampling and encoding.
+    """
+    def __init__(self, image: Image.Image, cache: Optional[OutputCache] = None,
+                 source_digest: Optional[str] = None, writer: Optional[OutputWriter] = None):
+        self.source_size = image.size
+        self.cache = cache
+        self.writer = writer
+        self.source_digest = source_digest
+        self._source = image
+        self._owns_source = False
+        self._working = None
+        self._reductions: List[Tuple[Image.Image, Box]] = []
+        self._palettes: Dict[tuple, Palette] = {}
+        self._dag: Optional[ResamplingDAG] = None
+        # Guards the shared intermediates above when formats render on several threads
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_file(cls, file_path: str, cache: Optional[OutputCache] = None,
+                  formats: Optional[Iterable[OutputFormat]] = None,
+                  writer: Optional[OutputWriter] = None) -> 'FanOutProcessor':
+        """Open an image file; decoding is deferred until an output needs rendering.
+
+        Passing the ``formats`` that will be rendered lets JPEG sources decode
+        at a reduced scale; larger formats must not be rendered afterwards.
+        """
+        image = ImageProcessor.load_image(file_path, formats)
+        source_digest = None
+        if cache is not None:
+            # The decoded size is part of the key, since draft decoding depends on the formats
+            source_digest = f"{OutputCache.digest_file(file_path)}@{image.width}x{image.height}"
+        renderer = cls(image, cache, source_digest, writer)
+        renderer._owns_source = True
+        if cache is None:
+            # Nothing can be skipped, so decode now and release the file handle
+            renderer.working
+        return renderer
+
+    def close(self) -> None:
+        """Release the source file if this renderer opened it."""
+        if self._owns_source and self._source is not None:
+            self._source.close()
+            self._source = None
+
+    def __enter__(self) -> 'FanOutProcessor':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def working(self) -> Image.Image:
+        """Premultiplied RGBa working copy, built on first use."""
+        if self._working is None:
+            with self._lock:
+                if self._working is None:
+                    with metrics.stage('decode', self.source_size[0] * self.source_size[1], metrics.SOURCE):
+                        working = ImageProcessor._prepare_premultiplied_image(self._source)
+                    self.close()
+                    self._working = working
+        return self._working
+
+    def _reduced_source(self, dimensions: tuple[int, int]) -> Tuple[Image.Image, Box]:
+        """Smallest kept reduction that can still be resampled to ``dimensions``.
+
+        Returns the image together with the region of it covering the source.
+        """
+        source, box = self.working, (0, 0, self.working.width, self.working.height)
+        gap = resampling.REDUCING_GAP or 1
+        with self._lock:
+            for reduced, reduced_box in self._reductions:
+                if (reduced_box[2] - reduced_box[0] >= dimensions[0] * gap
+                        and reduced_box[3] - reduced_box[1] >= dimensions[1] * gap
+                        and reduced.width * reduced.height < source.width * source.height):
+                    source, box = reduced, reduced_box
+            reduced, reduced_box = reduce_for_target(source, dimensions, box=box)
+            if reduced is not source:
+                self._reductions.append((reduced, reduced_box))
+        return reduced, reduced_box
+
+    def _palette(self, format_spec: OutputFormat) -> Palette:
+        """Palette for ``format_spec``, built once from a sample of the source."""
+        key = (format_spec.colors, format_spec.quantizer, format_spec.mode, format_spec.background)
+        with self._lock:
+            if key not in self._palettes:
+                sample = quantization.sample(self.working).convert('RGBA')
+                # Give the sample the same mode and background as the finished output
+                sample = ImageProcessor._finish_standard_image(
+                    sample, replace(format_spec, colors=None, dimensions=sample.size)
+                )
+                with metrics.stage('palette', sample.width * sample.height):
+                    self._palettes[key] = quantization.build_palette(
+                        sample, format_spec.colors, format_spec.quantizer or quantization.DEFAULT_QUANTIZER
+                    )
+            return self._palettes[key]
+
+    def plan(self, formats: Iterable[OutputFormat]) -> ResamplingDAG:
+        """Plan which of the outputs for ``formats`` derive from larger ones."""
+        sizes = [ImageProcessor.target_size(fmt, self.source_size) for fmt in formats]
+        self._dag = ResamplingDAG(sizes, self._resize_direct, self._reduced_source)
+        return self._dag
+
+    def _resize(self, dimensions: tuple[int, int]) -> Image.Image:
+        """Resample the working copy to the given dimensions, through the DAG when planned."""
+        if self._dag is not None and dimensions in self._dag:
+            return self._dag.resize(dimensions)
+        return self._resize_direct(dimensions)
+
+    def _resize_direct(self, dimensions: tuple[int, int]) -> Image.Image:
+        """Resample the working copy itself to the given dimensions."""
+        pixels = self.working.width * self.working.height
+        with metrics.stage('resize', pixels):
+            source, box = self._reduced_source(dimensions)
+            return source.resize(dimensions, Image.Resampling.LANCZOS, box=box)
+
+    def _render_printlogo(self, dither_method: Optional[str] = None) -> Image.Image:
+        """Render the PRINTLOGO canvas (600x256), optionally dithered to 1-bit."""
+        dimensions = ImageProcessor._calculate_bounded_dimensions(*self.working.size, 256)
+        resized = self._resize(dimensions)
+        with metrics.stage('composite', resized.width * resized.height):
+            canvas = flatten_premultiplied(resized, WHITE, (600, 256))
+        if not dither_method:
+            return canvas
+        with metrics.stage('dither', canvas.width * canvas.height):
+            return dither(canvas, dither_method)
+
+    def _render_rptlogo(self) -> Image.Image:
+        """Render the RPTlogo canvas (155x110)."""
+        resized = self._resize((155, 110))
+        with metrics.stage('composite', resized.width * resized.height):
+            return flatten_premultiplied(resized, WHITE, (155, 110))
+
+    def render(self, format_spec: OutputFormat) -> Image.Image:
+        """Render a single output format without saving it."""
+        if format_spec.format in ('BMP', 'ESCPOS') and format_spec.is_thermal_printer:
+            return self._render_printlogo(format_spec.dither)
+        if format_spec.format == 'BMP' and format_spec.dimensions == (155, 110):
+            return self._render_rptlogo()
+        resized = self._resize(format_spec.dimensions)
+        with metrics.stage('unpremultiply', resized.width * resized.height):
+            resized = resized.convert('RGBA')
+        palette = self._palette(format_spec) if format_spec.colors else None
+        return ImageProcessor._finish_standard_image(resized, format_spec, palette)
+
+    def process(self, format_spec: OutputFormat, output_name: str) -> None:
+        """Render a single output format and save it to ``output_name``."""
+        with metrics.output(os.path.basename(output_name)):
+            self._process(format_spec, output_name)
+
+    def _process(self, format_spec: OutputFormat, output_name: str) -> None:
+        if self.cache is not None:
+            if self.source_digest is None:
+                self.source_digest = OutputCache.digest_image(self._source)
+            key = self.cache.key(self.source_digest, format_spec, pipeline=self._cache_pipeline(format_spec))
+            self.cache.render_through(key, output_name, lambda: self._render_and_save(format_spec, output_name))
+        else:
+            self._render_and_save(format_spec, output_name)
+
+    def _cache_pipeline(self, format_spec: OutputFormat) -> str:
+        """Pipeline part of the cache key; derived outputs also depend on their parent and quality check."""
+        derivation = None
+        if self._dag is not None:
+            derivation = self._dag.derivation(ImageProcessor.target_size(format_spec, self.source_size))
+        return 'fan_out' if derivation is None else f"fan_out derived from {derivation}"
+
+    def _render_and_save(self, format_spec: OutputFormat, output_name: str) -> Optional[PendingWrite]:
+        image = self.render(format_spec)
+        if format_spec.format == 'ESCPOS' and format_spec.is_thermal_printer:
+            return ImageProcessor._save_escpos_raster(image, format_spec, output_name, self.writer)
+        elif format_spec.format == 'BMP' and (format_spec.is_thermal_printer or format_spec.dimensions == (155, 110)):
+            return ImageProcessor._save_bmp_with_dpi(image, output_name, writer=self.writer)
+        else:
+            return ImageProcessor._save_standard_image(image, format_spec, output_name, self.writer)
+
+    def process_all(self, formats: Mapping[str, OutputFormat], output_dir: str) -> Dict[str, str]:
+        """Render and save every format into ``output_dir``, keyed by file name."""
+        os.makedirs(output_dir, exist_ok=True)
+        self.plan(formats.values())
+        outputs = {}
+        for format_key, format_spec in formats.items():
+            output_path = os.path.join(output_dir, format_key)
+            self.process(format_spec, output_path)
+            outputs[format_key] = output_path
+        logger.info(f"Rendered {len(outputs)} formats from one {self.source_size[0]}x{self.source_size[1]} source")
+        return outputs
@@ -0,0 +1,91 @@
+"""Previews of the output formats, rendered in memory from a shared decode."""
+import logging
+import threading
+import weakref
+from typing import Dict, Optional
+from PIL import Image
+from src.core.config_manager import CompiledFormat
+from src.core.image_format import OutputFormat
+from src.core.resampling import reduction_factor
+from .decoded_source import DecodedSource
+from .fan_out import FanOutProcessor
+from .image_processor import ImageProcessor
+from .thumbnails import fit_size, thumbnail_of
+
+logger = logging.getLogger(__name__)
+
+# Source rows converted at a time while building the reduced preview copy
+BAND_ROWS = 256
+
+def reduce_for_previews(image: Image.Image, max_size: int) -> Image.Image:
+    """RGBA copy of ``image`` box-reduced to about ``REDUCING_GAP`` times ``max_size``.
+
+    Converted and reduced a band of rows at a time, so no full-resolution
+    copy is made. Images that are already small are returned as they are.
+    """
+    factor = min(reduction_factor(image.size, fit_size(image.size, max_size)))
+    if factor == 1:
+        return image
+    rows = max(1, BAND_ROWS // factor) * factor
+    reduced = Image.new('RGBA', (-(-image.width // factor), -(-image.height // factor)))
+    for top in range(0, image.height, rows):
+        band = image.crop((0, top, image.width, min(image.height, top + rows)))
+        # Reduced premultiplied, as the working copy is, so transparent pixels do not bleed
+        band = ImageProcessor._prepare_premultiplied_image(band).reduce(factor).convert('RGBA')
+        reduced.paste(band, (0, top // factor))
+    return reduced
+
+class FormatPreviews:
+    """Render what each output format of ``source`` will look like, without writing files.
+
+    Formats are rendered by a ``FanOutProcessor``, so they go through the
+    same pipeline as processing, but over a copy of the shared decode
+    reduced to about ``REDUCING_GAP`` times ``max_size``: previews never hold
+    a full-resolution working copy next to the decode, and processing builds
+    its own only while it runs. Each preview is scaled to fit ``max_size``
+    and kept in memory per format spec, so showing a format again is free.
+    If the source file changes, everything is rendered again. Safe to use
+    from several threads.
+    """
+    def __init__(self, source: DecodedSource, max_size: int):
+        self.source = source
+        self.max_size = max_size
+        self.renders = 0
+        # The decode the renderer was built from, without keeping it alive
+        self._image: Optional[weakref.ref] = None
+        self._renderer: Optional[FanOutProcessor] = None
+        self._previews: Dict[CompiledFormat, Image.Image] = {}
+        self._lock = threading.Lock()
+
+    def cached(self, format_spec: OutputFormat) -> Optional[Image.Image]:
+        """The preview of ``format_spec`` if it is already rendered, without touching the source."""
+        with self._lock:
+            return self._previews.get(CompiledFormat.compile(format_spec))
+
+    def _current_renderer(self) -> FanOutProcessor:
+        image = self.source.image()
+        with self._lock:
+            if self._image is not None and self._image() is image:
+                return self._renderer
+        # First use, or the file changed on disk and was decoded again
+        reduced = reduce_for_previews(image, self.max_size)
+        with self._lock:
+            if self._image is None or self._image() is not image:
+                self._image = weakref.ref(image)
+                self._renderer = FanOutProcessor(reduced)
+                self._previews.clear()
+            return self._renderer
+
+    def render(self, format_spec: OutputFormat) -> Image.Image:
+        """RGBA preview of ``format_spec`` within ``max_size``, rendered on first request."""
+        renderer = self._current_renderer()
+        key = CompiledFormat.compile(format_spec)
+        with self._lock:
+            preview = self._previews.get(key)
+        if preview is None:
+            preview = thumbnail_of(renderer.render(format_spec), self.max_size)
+            with self._lock:
+                if self._renderer is renderer:
+                    self._previews[key] = preview
+                    self.renders += 1
+        return preview
@@ -1,21 +1,54 @@
 import logging
+import os
+from typing import Iterable, Optional
 from PIL import Image
+from src.core.compositing import WHITE, composite_over_color
+from src.core import bounded_loading, encoding, escpos, metrics
+from src.core.dithering import dither
+from src.core.pipeline import plan_for
+from src.core.quantization import Palette
 from src.core.image_format import OutputFormat
+from src.core.output_writer import OutputWriter, PendingWrite
+from src.core.resampling import draft_for_targets, reduce_for_target
+from .output_cache import OutputCache
 
 logger = logging.getLogger(__name__)
 
 class ImageProcessor:
     @staticmethod
-    def load_image(file_path: str) -> Image.Image:
-        """Load an image file."""
-        return Image.open(file_path)
+    def load_image(file_path: str, formats: Optional[Iterable[OutputFormat]] = None,
+                   memory_ceiling: Optional[int] = None) -> Image.Image:
+        """Load an image file.
+
+        When the output ``formats`` are known up front, JPEG sources are
+        decoded at a reduced scale that still covers the largest of them, and
+        sources too large for ``memory_ceiling`` (``bounded_loading.MEMORY_CEILING``
+        by default) are reduced band by band or refused.
+        """
+        if formats is None:
+            return bounded_loading.open_file(file_path)
+        image = bounded_loading.open_image(file_path, memory_ceiling)
+        with metrics.stage('load', image.width * image.height, metrics.SOURCE):
+            target_sizes = [ImageProcessor.target_size(fmt, image.size) for fmt in formats]
+            draft_for_targets(image, target_sizes)
+            return bounded_loading.load_bounded(image, target_sizes, memory_ceiling)
+
+    @staticmethod
+    def target_size(format_spec: OutputFormat, source_size: tuple[int, int]) -> tuple[int, int]:
+        """Size the source is resampled to for a given output format."""
+        if format_spec.is_thermal_printer:
+            return ImageProcessor._calculate_bounded_dimensions(*source_size, 256)
+        return tuple(format_spec.dimensions)
 
     @staticmethod
-    def _prepare_rgba_image(image: Image.Image) -> Image.Image:
-        """Convert image to RGBA and apply white background."""
-        img = image.convert('RGBA')
-        background = Image.new('RGBA', img.size, (255, 255, 255, 255))
-        return Image.alpha_composite(background, img)
+    def _flatten_on_white(image: Image.Image) -> Image.Image:
+        """Composite image over a white background into an RGB image."""
+        return composite_over_color(image, WHITE)
+
+    @staticmethod
+    def _prepare_premultiplied_image(image: Image.Image) -> Image.Image:
+        """Convert image to premultiplied RGBa for repeated resampling."""
+        return image.convert('RGBA').convert('RGBa')
 
     @staticmethod
     def _calculate_bounded_dimensions(width: int, height: int, max_size: int) -> tuple[int, int]:
@@ -36,81 +69,138 @@ class ImageProcessor:
         return canvas
 
     @staticmethod
-    def _save_bmp_with_dpi(image: Image.Image, output_path: str, dpi: tuple[int, int] = (203, 203)) -> None:
-        """Save image in BMP format with specified DPI."""
-        image.save(output_path, 'BMP', dpi=dpi)
+    def _save(image: Image.Image, output_path: str, writer: Optional[OutputWriter] = None,
+              *args, **kwargs) -> Optional[PendingWrite]:
+        """``Image.save`` to ``output_path``, or through ``writer`` if given."""
+        if writer is not None:
+            return writer.save(image, output_path, *args, **kwargs)
+        with metrics.stage('save', image.width * image.height) as sample:
+            image.save(output_path, *args, **kwargs)
+            sample.bytes_written = os.path.getsize(output_path)
+        return None
+
+    @staticmethod
+    def _save_bmp_with_dpi(image: Image.Image, output_path: str, dpi: tuple[int, int] = (203, 203),
+                           writer: Optional[OutputWriter] = None) -> Optional[PendingWrite]:
+        """Save image in BMP format with specified DPI, through ``writer`` if given."""
+        return ImageProcessor._save(image, output_path, writer, 'BMP', dpi=dpi)
+
+    @staticmethod
+    def _save_escpos_raster(image: Image.Image, format_spec: OutputFormat, output_path: str,
+                            writer: Optional[OutputWriter] = None) -> Optional[PendingWrite]:
+        """Save image as ESC/POS GS v 0 raster commands, through ``writer`` if given."""
+        with metrics.stage('encode', image.width * image.height):
+            data = escpos.encode_raster(image, format_spec.print_width, format_spec.band_height,
+                                        format_spec.dither or escpos.DEFAULT_DITHER)
+        if writer is not None:
+            return writer.write(data, output_path)
+        with metrics.stage('save') as sample:
+            with open(output_path, 'wb') as f:
+                f.write(data)
+            sample.bytes_written = len(data)
+        return None
+
+    @staticmethod
+    def create_printlogo_image(image: Image.Image, dither_method: Optional[str] = None) -> Image.Image:
+        """Build the PRINTLOGO canvas (600x256) from an already decoded image.
+
+        With ``dither_method`` the canvas is reduced to a 1-bit image.
+        """
+        new_width, new_height = ImageProcessor._calculate_bounded_dimensions(image.width, image.height, 256)
+        reduced, box = reduce_for_target(image, (new_width, new_height))
+        img = ImageProcessor._flatten_on_white(reduced)
+        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS, box=box)
+        final_image = ImageProcessor._create_centered_image(img, (600, 256))
+        return dither(final_image, dither_method) if dither_method else final_image
 
     @staticmethod
     def convert_printlogo_to_bmp_specs(input_path: str, output_path: str) -> None:
         """Convert image to PRINTLOGO BMP format (600x256, 203 DPI)."""
         with Image.open(input_path) as source_img:
-            img = ImageProcessor._prepare_rgba_image(source_img)
-            new_width, new_height = ImageProcessor._calculate_bounded_dimensions(img.width, img.height, 256)
-            img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            final_image = ImageProcessor._create_centered_image(img, (600, 256))
-            ImageProcessor._save_bmp_with_dpi(final_image, output_path)
+            final_image = ImageProcessor.create_printlogo_image(source_img)
+        ImageProcessor._save_bmp_with_dpi(final_image, output_path)
 
     @staticmethod
-    def convert_rptlogo_to_bmp_specs(image: Image.Image, output_path: str) -> None:
+    def convert_rptlogo_to_bmp_specs(image: Image.Image, output_path: str,
+                                     writer: Optional[OutputWriter] = None) -> Optional[PendingWrite]:
         """Convert image to RPTlogo BMP format (155x110, 203 DPI)."""
-        img = ImageProcessor._prepare_rgba_image(image)
-        img = img.resize((155, 110), Image.Resampling.LANCZOS)
-        final_image = ImageProcessor._create_centered_image(img, (155, 110))
-        ImageProcessor._save_bmp_with_dpi(final_image, output_path)
+        with metrics.stage('render', image.width * image.height):
+            reduced, box = reduce_for_target(image, (155, 110))
+            img = ImageProcessor._flatten_on_white(reduced)
+            img = img.resize((155, 110), Image.Resampling.LANCZOS, box=box)
+            final_image = ImageProcessor._create_centered_image(img, (155, 110))
+        return ImageProcessor._save_bmp_with_dpi(final_image, output_path, writer=writer)
 
     @staticmethod
     def _process_standard_image(image: Image.Image, format_spec: OutputFormat) -> Image.Image:
         """Process image according to standard format specifications."""
-        processed_image = image.resize(format_spec.dimensions, Image.Resampling.LANCZOS)
-        processed_image = processed_image.convert(format_spec.mode)
-
-        if format_spec.background:
-            background = Image.new(format_spec.mode, format_spec.dimensions, format_spec.background)
-            background.paste(processed_image, (0, 0), processed_image if format_spec.mode == 'RGBA' else None)
-            processed_image = background
+        return plan_for(format_spec).run(image)
 
-        if format_spec.colors:
-            processed_image = processed_image.convert('P', palette=Image.ADAPTIVE, colors=format_spec.colors)
+    @staticmethod
+    def _finish_standard_image(processed_image: Image.Image, format_spec: OutputFormat,
+                               palette: Optional[Palette] = None) -> Image.Image:
+        """Apply color mode, background and palette to an already resized image.
 
-        return processed_image
+        A precomputed ``palette`` is reused instead of quantizing from scratch.
+        """
+        return plan_for(format_spec, resize=False).run(processed_image, palette)
 
     @staticmethod
     def _get_save_kwargs(format_spec: OutputFormat) -> dict:
-        """Get optimized save parameters based on format."""
-        return {
-            'format': format_spec.format,
-            'quality': 95 if format_spec.format == 'JPEG' else None,
-            'optimize': True if format_spec.format in ['PNG', 'JPEG'] else None,
-            'dpi': (203, 203) if format_spec.format == 'BMP' else None
-        }
+        """Get optimized save parameters based on format, precomputed for config snapshot formats."""
+        precomputed = getattr(format_spec, 'save_kwargs', None)
+        return dict(precomputed) if precomputed is not None else encoding.save_kwargs(format_spec)
 
     @staticmethod
-    def process_image(image: Image.Image, format_spec: OutputFormat, output_name: str) -> None:
-        """Process an image according to format specifications."""
-        try:
-            if format_spec.format == 'BMP':
-                if format_spec.is_thermal_printer:
-                    # Handle PRINTLOGO format
-                    import tempfile, os
-                    temp_path = None
-                    try:
-                        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_file:
-                            temp_path = temp_file.name
-                            image.save(temp_path, 'PNG')
-                        ImageProcessor.convert_printlogo_to_bmp_specs(temp_path, output_name)
-                    finally:
-                        if temp_path and os.path.exists(temp_path):
-                            try:
-                                os.unlink(temp_path)
-                            except Exception as e:
-                                logger.warning(f"Failed to delete temporary file {temp_path}: {e}")
-                elif format_spec.dimensions == (155, 110):
-                    ImageProcessor.convert_rptlogo_to_bmp_specs(image, output_name)
-            else:
-                processed_image = ImageProcessor._process_standard_image(image, format_spec)
-                save_kwargs = ImageProcessor._get_save_kwargs(format_spec)
-                processed_image.save(output_name, **{k: v for k, v in save_kwargs.items() if v is not None})
+    def _save_standard_image(image: Image.Image, format_spec: OutputFormat, output_name: str,
+                             writer: Optional[OutputWriter] = None) -> Optional[PendingWrite]:
+        """Save a standard format image with its format-specific parameters, through ``writer`` if given."""
+        return ImageProcessor._save(image, output_name, writer, **ImageProcessor._get_save_kwargs(format_spec))
+
+    @staticmethod
+    def _render_and_save(image: Image.Image, format_spec: OutputFormat, output_name: str,
+                         writer: Optional[OutputWriter] = None) -> Optional[PendingWrite]:
+        """Render one output format and save it, without consulting a cache."""
+        if format_spec.format == 'ESCPOS' and format_spec.is_thermal_printer:
+            with metrics.stage('render', image.width * image.height):
+                final_image = ImageProcessor.create_printlogo_image(image, format_spec.dither)
+            return ImageProcessor._save_escpos_raster(final_image, format_spec, output_name, writer)
+        elif format_spec.format == 'BMP':
+            if format_spec.is_thermal_printer:
+                # Handle PRINTLOGO format
+                with metrics.stage('render', image.width * image.height):
+                    final_image = ImageProcessor.create_printlogo_image(image, format_spec.dither)
+                return ImageProcessor._save_bmp_with_dpi(final_image, output_name, writer=writer)
+            elif format_spec.dimensions == (155, 110):
+                return ImageProcessor.convert_rptlogo_to_bmp_specs(image, output_name, writer)
+        else:
+            processed_image = ImageProcessor._process_standard_image(image, format_spec)
+            return ImageProcessor._save_standard_image(processed_image, format_spec, output_name, writer)
+
+    @staticmethod
+    def process_image(image: Image.Image, format_spec: OutputFormat, output_name: str,
+                      cache: Optional[OutputCache] = None, source_digest: Optional[str] = None,
+                      writer: Optional[OutputWriter] = None) -> Optional[PendingWrite]:
+        """Process an image according to format specifications.
 
+        With a ``cache``, unchanged source/format combinations are served from
+        it instead of being rendered again. ``source_digest`` (for example from
+        ``OutputCache.digest_file``) avoids hashing the decoded pixels.
+
+        With a ``writer`` the output is encoded here and written in the
+        background; the returned ``PendingWrite`` tracks it. Flush the writer
+        before relying on the file.
+        """
+        if cache is not None:
+            key = cache.key(source_digest or OutputCache.digest_image(image), format_spec)
+            cache.render_through(
+                key, output_name, lambda: ImageProcessor.process_image(image, format_spec, output_name, writer=writer)
+            )
+            return None
+
+        try:
+            with metrics.output(os.path.basename(output_name)):
+                return ImageProcessor._render_and_save(image, format_spec, output_name, writer)
         except Exception as e:
             print(f"Error processing image: {str(e)}")
             raise
@@ -0,0 +1,223 @@
+"""Content-addressed on-disk cache for rendered output files."""
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional
+from PIL import Image
+from src.core.output_writer import PendingWrite, atomic_write
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever a change to the processing code alters output bytes, so
+# artifacts rendered by older code are never served again. test_output_cache
+# fails when the outputs of a reference source change without a bump.
+# 2: box-reduce and JPEG draft pre-scaling
+# 3: named PNG encode profiles
+# 4: smaller outputs resampled from larger ones (resampling DAG)
+# 5: output-sized RGB images quantized directly, not from a sampled palette
+PIPELINE_VERSION = 5
+
+class OutputCache:
+    """Cache of rendered artifacts keyed by source content and format spec.
+
+    Keys hash the source bytes, the serialized ``OutputFormat``/``FormatConfig``
+    and ``PIPELINE_VERSION``. Entries are evicted least recently used first
+    once the cache grows past ``max_bytes``; recency is tracked through each
+    entry's mtime so several processes can share one cache directory.
+
+    Hits are copied to the output path by default. ``hardlink=True`` links
+    instead, which is faster but means the output shares its inode with the
+    cache entry and must not be modified in place.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024, hardlink: bool = False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hardlink = hardlink
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._size = sum(os.path.getsize(path) for path in self._entries())
+
+    @staticmethod
+    def digest_file(file_path: str) -> str:
+        """Hash the raw bytes of a source file."""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def digest_image(image: Image.Image) -> str:
+        """Hash the decoded pixels of an in-memory source image."""
+        digest = hashlib.sha256(f"{image.mode}:{image.size}".encode())
+        digest.update(image.tobytes())
+        palette = image.getpalette() if image.mode == 'P' else None
+        if palette:
+            digest.update(bytes(palette))
+        return digest.hexdigest()
+
+    @staticmethod
+    def _serialize_format(format_spec: Any) -> str:
+        """Serialize an OutputFormat or FormatConfig to a stable string."""
+        return json.dumps(dataclasses.asdict(format_spec), sort_keys=True)
+
+    def key(self, source_digest: str, format_spec: Any, pipeline: str = 'standard') -> str:
+        """Build the cache key for one source/format/pipeline combination."""
+        digest = hashlib.sha256()
+        for part in (str(PIPELINE_VERSION), pipeline, source_digest, self._serialize_format(format_spec)):
+            digest.update(part.encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _entries(self):
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if not filename.startswith('.'):
+                    yield os.path.join(dirpath, filename)
+
+    def fetch(self, key: str, output_path: str) -> bool:
+        """Place the cached artifact at ``output_path``. Returns False on a miss."""
+        entry = self._entry_path(key)
+        if not os.path.exists(entry):
+            self.misses += 1
+            return False
+
+        try:
+            if not (self.hardlink and self._link(entry, output_path)):
+                with open(entry, 'rb') as f:
+                    atomic_write(output_path, f.read())
+        except FileNotFoundError:
+            # Evicted by another process between the check and the copy
+            self.misses += 1
+            return False
+
+        now = time.time()
+        try:
+            os.utime(entry, (now, now))
+        except OSError:
+            pass
+        self.hits += 1
+        return True
+
+    @staticmethod
+    def _link(entry: str, output_path: str) -> bool:
+        """Hard link ``entry`` into place as ``output_path``; False when it cannot be linked.
+
+        The output shares the entry's inode and so its permissions, which
+        ``atomic_write`` gave the entry when it was stored.
+        """
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+        fd, temp_path = tempfile.mkstemp(dir=output_dir, prefix='.cache-')
+        os.close(fd)
+        os.unlink(temp_path)
+        try:
+            os.link(entry, temp_path)
+        except OSError:
+            return False
+        try:
+            os.replace(temp_path, output_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return True
+
+    def fetch_bytes(self, key: str) -> Optional[bytes]:
+        """Return the cached artifact itself, or None on a miss."""
+        entry = self._entry_path(key)
+        try:
+            with open(entry, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        now = time.time()
+        try:
+            os.utime(entry, (now, now))
+        except OSError:
+            pass
+        self.hits += 1
+        return data
+
+    def store(self, key: str, output_path: str) -> None:
+        """Copy a freshly rendered artifact into the cache."""
+        with open(output_path, 'rb') as f:
+            self.store_bytes(key, f.read())
+
+    def store_bytes(self, key: str, data: bytes) -> None:
+        """Store an artifact that is still in memory, e.g. one queued on an ``OutputWriter``."""
+        entry = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        existed = os.path.exists(entry)
+        atomic_write(entry, data)
+        self._account(entry, existed)
+
+    def _account(self, entry: str, existed: bool) -> None:
+        if not existed:
+            self._size += os.path.getsize(entry)
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def render_through(self, key: str, output_path: str, render) -> bool:
+        """Serve ``output_path`` from the cache, or call ``render()`` and store the result.
+
+        ``render`` may return the ``PendingWrite`` of a background write.
+        Returns True when the artifact came from the cache.
+        """
+        if self.fetch(key, output_path):
+            return True
+        if os.path.lexists(output_path):
+            # Never write through an inode that may be shared with a cache entry
+            os.unlink(output_path)
+        result = render()
+        if isinstance(result, PendingWrite):
+            # Written in the background; the encoded bytes are already at hand
+            self.store_bytes(key, result.data)
+        elif os.path.exists(output_path):
+            self.store(key, output_path)
+        return False
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits ``max_bytes``."""
+        entries = []
+        for path in self._entries():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            self._size -= size
+        logger.debug(f"Cache evicted down to {self._size} bytes")
+
+    @property
+    def size(self) -> int:
+        """Approximate number of bytes currently held by the cache."""
+        return self._size
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters for this cache instance."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'bytes': self._size,
+        }
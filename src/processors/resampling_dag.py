@@ -0,0 +1,190 @@
+"""
+Resampling DAG for multi-output rendering.
+Smaller outputs are resampled from an already rendered larger output instead
+of from the source, where a quality check on sample tiles shows the result is
+equivalent to resampling directly.
+"""
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from PIL import Image, ImageChops
+from src.core import metrics
+from src.core.lazy_import import optional_module
+from src.core.resampling import Box
+
+# SSIM is skipped without NumPy, the max error check still applies; imported once first used
+np = optional_module('numpy')
+
+logger = logging.getLogger(__name__)
+
+Size = Tuple[int, int]
+
+# A size may be derived from another output at least this many times larger on both axes
+DERIVE_RATIO = 1.5
+
+# SSIM stabilizing constants for 8-bit channels
+_C1 = (0.01 * 255) ** 2
+_C2 = (0.03 * 255) ** 2
+
+def _raw(image: Image.Image) -> Image.Image:
+    """View premultiplied RGBa pixels as plain RGBA, so they are compared as stored."""
+    return Image.frombytes('RGBA', image.size, image.tobytes()) if image.mode == 'RGBa' else image
+
+def max_error(image: Image.Image, reference: Image.Image) -> int:
+    """Largest per-channel difference between two images of the same size and mode."""
+    return max(high for _, high in ImageChops.difference(_raw(image), _raw(reference)).getextrema())
+
+def ssim(image: Image.Image, reference: Image.Image, window: int = 8) -> float:
+    """Mean structural similarity over non-overlapping ``window`` blocks of every channel."""
+    a = np.asarray(_raw(image), dtype=np.float64)
+    b = np.asarray(_raw(reference), dtype=np.float64)
+    if a.ndim == 2:
+        a, b = a[..., None], b[..., None]
+    window = min(window, a.shape[0], a.shape[1])
+    height, width = a.shape[0] // window * window, a.shape[1] // window * window
+    shape = (height // window, window, width // window, window, a.shape[2])
+    a, b = a[:height, :width].reshape(shape), b[:height, :width].reshape(shape)
+    mean_a, mean_b = a.mean(axis=(1, 3)), b.mean(axis=(1, 3))
+    var_a, var_b = a.var(axis=(1, 3)), b.var(axis=(1, 3))
+    covariance = ((a - mean_a[:, None, :, None]) * (b - mean_b[:, None, :, None])).mean(axis=(1, 3))
+    similarity = ((2 * mean_a * mean_b + _C1) * (2 * covariance + _C2)) / \
+                 ((mean_a ** 2 + mean_b ** 2 + _C1) * (var_a + var_b + _C2))
+    return float(similarity.mean())
+
+@dataclass(frozen=True)
+class QualityCheck:
+    """Thresholds a derived output must meet against direct resampling.
+
+    Only the ``tiles`` most detailed ``tile_size`` squares of the derived
+    output are compared, since re-rendering all of it directly would cost
+    what deriving saves. ``max_error`` bounds the largest channel difference
+    (0-255) and ``min_ssim`` the SSIM of each tile; either may be None.
+    SSIM needs NumPy and is skipped without it.
+    """
+    max_error: Optional[int] = 8
+    min_ssim: Optional[float] = 0.995
+    tile_size: int = 32
+    tiles: int = 4
+
+    def sample_tiles(self, image: Image.Image) -> List[Box]:
+        """Tiles of ``image`` with the most detail, where resampling differences show first."""
+        raw = _raw(image)
+        # Mean gradient of every tile: difference to the diagonal neighbour, box-reduced per tile
+        gradient = ImageChops.difference(raw, ImageChops.offset(raw, 1, 1))
+        detail = gradient.reduce(self.tile_size)
+        scores = [sum(pixel) for pixel in detail.getdata()]
+        ranked = sorted(range(len(scores)), key=lambda index: scores[index], reverse=True)
+        tiles = []
+        for index in ranked[:self.tiles]:
+            left, top = index % detail.width * self.tile_size, index // detail.width * self.tile_size
+            tiles.append((left, top, min(left + self.tile_size, image.width), min(top + self.tile_size, image.height)))
+        return tiles
+
+    def passes(self, derived: Image.Image, direct: Image.Image) -> bool:
+        """Whether ``derived`` is equivalent to ``direct`` under these thresholds."""
+        if self.max_error is not None and max_error(derived, direct) > self.max_error:
+            return False
+        if self.min_ssim is not None and np is not None and ssim(derived, direct) < self.min_ssim:
+            return False
+        return True
+
+# Check applied before using a derived output; None disables deriving.
+# Read at call time, like resampling.REDUCING_GAP.
+QUALITY_CHECK: Optional[QualityCheck] = QualityCheck()
+
+def plan_parents(sizes: Iterable[Size], ratio: Optional[float] = None) -> Dict[Size, Optional[Size]]:
+    """Map each size to the smallest other size at least ``ratio`` times larger on both axes.
+
+    Sizes without such a parent map to None and are resampled from the source.
+    ``ratio`` defaults to the module-wide ``DERIVE_RATIO``.
+    """
+    ratio = ratio or DERIVE_RATIO
+    sizes = sorted(set(tuple(size) for size in sizes), key=lambda size: size[0] * size[1])
+    parents = {}
+    for size in sizes:
+        candidates = [other for other in sizes
+                      if other[0] >= size[0] * ratio and other[1] >= size[1] * ratio]
+        parents[size] = candidates[0] if candidates else None
+    return parents
+
+class ResamplingDAG:
+    """Resample one source to a set of sizes, deriving smaller ones from larger results.
+
+    ``resize_direct(size)`` resamples the source itself; ``reduced_source(size)``
+    returns the image and box it resamples from, which lets the quality check
+    render single tiles of the direct result. Outputs that other sizes derive
+    from are kept until the DAG is dropped. A derived output that fails the
+    check is resampled directly instead. ``resize`` may be called from
+    several threads; each kept output is still rendered only once.
+    """
+    def __init__(self, sizes: Iterable[Size], resize_direct: Callable[[Size], Image.Image],
+                 reduced_source: Callable[[Size], Tuple[Image.Image, Box]],
+                 quality_check: Optional[QualityCheck] = None):
+        self.parents = plan_parents(sizes)
+        self.quality_check = quality_check
+        self.derived: List[Size] = []
+        self.rejected: List[Size] = []
+        self._resize_direct = resize_direct
+        self._reduced_source = reduced_source
+        self._kept: Dict[Size, Image.Image] = {}
+        self._needed = set(parent for parent in self.parents.values() if parent is not None)
+        # Locks are only ever taken from a size towards larger parents, so they cannot deadlock
+        self._locks = {size: threading.Lock() for size in self._needed}
+
+    def __contains__(self, size: Size) -> bool:
+        return tuple(size) in self.parents
+
+    def derivation(self, size: Size) -> Optional[str]:
+        """Describe how ``size`` may be derived, for cache keys; None when always resampled directly."""
+        parent = self.parents.get(tuple(size))
+        quality_check = self.quality_check or QUALITY_CHECK
+        if parent is None or quality_check is None:
+            return None
+        return f"{parent[0]}x{parent[1]} {quality_check!r}"
+
+    def resize(self, size: Size) -> Image.Image:
+        """The source resampled to ``size``, derived from a larger output when equivalent."""
+        size = tuple(size)
+        if size in self._kept:
+            return self._kept[size]
+        if size in self._locks:
+            with self._locks[size]:
+                if size not in self._kept:
+                    self._kept[size] = self._render(size)
+            return self._kept[size]
+        return self._render(size)
+
+    def _render(self, size: Size) -> Image.Image:
+        result = None
+        parent = self.parents.get(size)
+        quality_check = self.quality_check or QUALITY_CHECK
+        if parent is not None and quality_check is not None:
+            parent_image = self.resize(parent)
+            with metrics.stage('derive', parent_image.width * parent_image.height):
+                derived = parent_image.resize(size, Image.Resampling.LANCZOS)
+            if self._equivalent(derived, size, quality_check):
+                self.derived.append(size)
+                result = derived
+            else:
+                logger.debug(f"Resampling {size[0]}x{size[1]} directly, derived output failed the quality check")
+                self.rejected.append(size)
+        if result is None:
+            result = self._resize_direct(size)
+        return result
+
+    def _equivalent(self, derived: Image.Image, size: Size, quality_check: QualityCheck) -> bool:
+        """Compare sample tiles of ``derived`` with the same tiles resampled directly."""
+        source, box = self._reduced_source(size)
+        scale_x = (box[2] - box[0]) / size[0]
+        scale_y = (box[3] - box[1]) / size[1]
+        with metrics.stage('quality_check', derived.width * derived.height):
+            for tile in quality_check.sample_tiles(derived):
+                # Same kernel positions as the full direct resize, so the tile matches it exactly
+                tile_box = (box[0] + tile[0] * scale_x, box[1] + tile[1] * scale_y,
+                            box[0] + tile[2] * scale_x, box[1] + tile[3] * scale_y)
+                direct = source.resize((tile[2] - tile[0], tile[3] - tile[1]), Image.Resampling.LANCZOS,
+                                       box=tile_box)
+                if not quality_check.passes(derived.crop(tile), direct):
+                    return False
+        return True
@@ -0,0 +1,148 @@
+"""
+Preview thumbnails with reduced decoding and two cache levels.
+Thumbnails are decoded at the smallest scale that still covers them and
+cached in memory (least recently used first) and on disk, keyed by the
+source path, mtime and size, so reselecting a file needs no decode at all.
+"""
+import hashlib
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+from PIL import Image
+from src.core import bounded_loading
+from src.core.resampling import draft_for_targets, resize_lanczos
+from .output_cache import OutputCache
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever a change here alters thumbnail pixels, so older disk entries are not served
+THUMBNAIL_VERSION = 1
+
+# Memory a thumbnail decode may use before raw sources are reduced band by band
+DECODE_CEILING = 64 * 1024 * 1024
+
+# Disk cache used by the GUI preview; None keeps thumbnails in memory only.
+# Read when a cache is created, like resampling.REDUCING_GAP.
+CACHE_DIR: Optional[str] = os.environ.get(
+    'LOGOCRAFT_THUMBNAIL_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'logocraft', 'thumbnails')
+)
+
+def fit_size(size: tuple[int, int], max_size: int) -> tuple[int, int]:
+    """``size`` scaled down to fit a ``max_size`` square, keeping the aspect ratio."""
+    scale = min(1.0, max_size / size[0], max_size / size[1])
+    return max(1, round(size[0] * scale)), max(1, round(size[1] * scale))
+
+def render_thumbnail(file_path: str, max_size: int) -> Image.Image:
+    """Decode ``file_path`` at reduced scale into an RGBA thumbnail within ``max_size``.
+
+    JPEG sources use draft decoding; uncompressed sources too large for
+    ``DECODE_CEILING`` are reduced band by band while they are read.
+    """
+    image = bounded_loading.open_image(file_path)
+    try:
+        target = fit_size(image.size, max_size)
+        draft_for_targets(image, [target])
+        if bounded_loading.can_stream(image):
+            image = bounded_loading.load_bounded(image, [target], DECODE_CEILING)
+        else:
+            image = bounded_loading.load_bounded(image, [target])
+        return thumbnail_of(image, max_size)
+    finally:
+        image.close()
+
+def thumbnail_of(image: Image.Image, max_size: int) -> Image.Image:
+    """RGBA thumbnail within ``max_size`` of an already decoded image, which is left untouched."""
+    # Premultiplied, so transparent pixels do not bleed into the edges
+    return resize_lanczos(image.convert('RGBA').convert('RGBa'), fit_size(image.size, max_size)).convert('RGBA')
+
+class ThumbnailCache:
+    """Thumbnails of source files, rendered once and served from memory or disk.
+
+    Keys cover the absolute path, mtime, file size and thumbnail size, so an
+    edited file is rendered again. The memory level holds the ``capacity``
+    most recently used thumbnails; the disk level (skipped without a
+    ``cache_dir``) is an ``OutputCache`` capped at ``max_bytes``. Safe to use
+    from several threads.
+    """
+    def __init__(self, cache_dir: Optional[str] = None, capacity: int = 64,
+                 max_bytes: int = 64 * 1024 * 1024):
+        self.capacity = capacity
+        self.disk = None
+        if cache_dir:
+            try:
+                self.disk = OutputCache(cache_dir, max_bytes)
+            except OSError as e:
+                logger.warning(f"Thumbnail disk cache disabled: {e}")
+        self._memory: 'OrderedDict[str, Image.Image]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(file_path: str, max_size: int) -> str:
+        stat = os.stat(file_path)
+        digest = hashlib.sha256()
+        for part in (str(THUMBNAIL_VERSION), os.path.abspath(file_path), str(stat.st_mtime_ns),
+                     str(stat.st_size), str(max_size)):
+            digest.update(part.encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def cached(self, file_path: str, max_size: int) -> Optional[Image.Image]:
+        """The thumbnail if it is in memory, without touching the disk or decoding."""
+        try:
+            key = self.key(file_path, max_size)
+        except OSError:
+            return None
+        with self._lock:
+            thumbnail = self._memory.get(key)
+            if thumbnail is not None:
+                self._memory.move_to_end(key)
+            return thumbnail
+
+    def get(self, file_path: str, max_size: int,
+            decode: Optional[Callable[[], Image.Image]] = None) -> Image.Image:
+        """The thumbnail from memory, then disk, rendering it on a miss.
+
+        ``decode`` supplies the decoded source on a miss, for example a
+        ``DecodedSource`` that processing reuses afterwards; without it the
+        file is decoded just for the thumbnail.
+        """
+        key = self.key(file_path, max_size)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        thumbnail = self._load(key)
+        if thumbnail is None:
+            thumbnail = thumbnail_of(decode(), max_size) if decode else render_thumbnail(file_path, max_size)
+            self._store(key, thumbnail)
+        with self._lock:
+            self._memory[key] = thumbnail
+            while len(self._memory) > self.capacity:
+                self._memory.popitem(last=False)
+        return thumbnail
+
+    def _load(self, key: str) -> Optional[Image.Image]:
+        data = self.disk.fetch_bytes(key) if self.disk else None
+        if data is None:
+            return None
+        try:
+            with Image.open(io.BytesIO(data)) as thumbnail:
+                thumbnail.load()
+                return thumbnail.convert('RGBA')
+        except OSError as e:
+            logger.warning(f"Ignoring unreadable thumbnail cache entry {key}: {e}")
+            return None
+
+    def _store(self, key: str, thumbnail: Image.Image) -> None:
+        if self.disk is None:
+            return
+        buffer = io.BytesIO()
+        thumbnail.save(buffer, 'PNG', compress_level=1)
+        try:
+            self.disk.store_bytes(key, buffer.getvalue())
+        except OSError as e:
+            # A read-only or full cache directory only costs the next decode
+            logger.warning(f"Cannot store thumbnail: {e}")
@@ -0,0 +1,78 @@
+"""
+Benchmark alpha flattening strategies.
+
+Flattens synthetic RGBA sources of increasing size over white with the
+original alpha_composite approach and with each compositing backend, and
+prints the median time and peak memory of each. Every measurement runs in
+a fresh subprocess so peak RSS is not inherited from earlier runs.
+
+Usage:
+    python tests/benchmark_compositing.py [--sizes 1000 2000 4000 6000] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from PIL import Image
+from src.core import compositing
+from memory_usage import format_mb, peak_rss_mb
+from test_resampling import create_detailed_image
+
+STRATEGIES = ('alpha_composite',) + compositing.available_backends()
+
+def legacy_flatten(image):
+    """The full-size background layer approach used before the compositing module"""
+    background = Image.new('RGBA', image.size, (255, 255, 255, 255))
+    return Image.alpha_composite(background, image).convert('RGB')
+
+def measure(strategy, size, repeat):
+    """Median seconds and peak RSS growth (MB) for one strategy, in this process"""
+    source = create_detailed_image(size, size)
+    if strategy == 'alpha_composite':
+        flatten = legacy_flatten
+    else:
+        compositing.set_backend(strategy)
+        flatten = compositing.composite_over_color
+    baseline = peak_rss_mb()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        flatten(source)
+        timings.append(time.perf_counter() - start)
+    peak = peak_rss_mb()
+    return {'seconds': statistics.median(timings), 'peak_mb': peak - baseline if peak is not None else None}
+
+def measure_in_subprocess(strategy, size, repeat):
+    output = subprocess.run(
+        [sys.executable, __file__, '--measure', strategy, '--sizes', str(size), '--repeat', str(repeat)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output)
+
+def run_benchmark(sizes, repeat):
+    print(f"{'source':>12} {'strategy':>16} {'median (s)':>11} {'peak RSS (MB)':>14}")
+    print("-" * 56)
+    for size in sizes:
+        for strategy in STRATEGIES:
+            result = measure_in_subprocess(strategy, size, repeat)
+            print(f"{size:>5}x{size:<6} {strategy:>16} {result['seconds']:>11.3f} {format_mb(result['peak_mb'], 14)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 2000, 4000, 6000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--measure', choices=STRATEGIES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.sizes[0], args.repeat)))
+    else:
+        run_benchmark(args.sizes, args.repeat)
+
+if __name__ == '__main__':
+    main()
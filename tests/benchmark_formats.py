@@ -0,0 +1,199 @@
+"""
+Benchmark every output format across realistic source sizes.
+
+Times ``ImageProcessor.process_image`` and ``ImageFormat.process`` /
+``ImageFormat.save`` for each format, on synthetic sources from 100px to
+8000px and on the files in tests/test_images. Reports the median and p95
+latency, the peak RSS (and the RSS once the source was loaded) and the
+output bytes of each. Every operation runs in a fresh subprocess, so peak
+RSS is not inherited from earlier runs. Peak RSS needs the Unix resource
+module or psutil and is reported as unavailable (null) without either.
+
+Results can be saved as JSON and compared against a saved baseline; the
+comparison lists every median, p95, peak RSS or output size that grew by
+more than the threshold and exits with status 1 if there is any.
+
+Usage:
+    python tests/benchmark_formats.py [--sizes 100 500 2000 8000] [--repeat 5] [--output results.json]
+    python tests/benchmark_formats.py --compare baseline.json [--threshold 0.2]
+    python tests/benchmark_formats.py --current results.json --compare baseline.json
+    python tests/run_tests.py --benchmark [options above]
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add project root to path to import from src
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+import PIL
+from PIL import Image
+from src.config import default_formats
+from src.core.image_format import ImageFormat, ThermalPrinterFormat
+from src.processors.image_processor import ImageProcessor
+from memory_usage import format_mb, peak_rss_mb
+from test_resampling import create_detailed_image
+
+OPERATIONS = ('process_image', 'ImageFormat.process', 'ImageFormat.save')
+SIZES = [100, 500, 2000, 8000]
+
+# Measured values compared against the baseline; all of them are better when lower
+METRICS = ('median_ms', 'p95_ms', 'peak_rss_mb', 'output_bytes')
+
+def synthetic_source(size):
+    """Name of a synthetic 4:3 source whose longest side is ``size``"""
+    return f"synthetic {size}x{max(1, size * 3 // 4)}"
+
+def default_sources(sizes):
+    sources = [synthetic_source(size) for size in sizes]
+    return sources + sorted(glob.glob(os.path.join(ROOT, 'tests', 'test_images', '*')))
+
+def load_source(source):
+    if source.startswith('synthetic '):
+        width, height = map(int, source.split()[1].split('x'))
+        return create_detailed_image(width, height)
+    image = Image.open(source)
+    image.load()
+    return image
+
+def percentile(values, percent):
+    """Nearest-rank percentile of ``values``"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+def format_handler(format_spec):
+    return ThermalPrinterFormat(format_spec) if format_spec.is_thermal_printer else ImageFormat(format_spec)
+
+def measure(source, format_key, operation, repeat):
+    """Latencies, peak RSS and output bytes of one operation, in this process"""
+    image = load_source(source)
+    source_rss = peak_rss_mb()
+    format_spec = default_formats[format_key]
+    handler = format_handler(format_spec)
+    processed = handler.process(image) if operation == 'ImageFormat.save' else None
+    timings = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, format_key)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            if operation == 'process_image':
+                ImageProcessor.process_image(image, format_spec, output_path)
+            elif operation == 'ImageFormat.process':
+                handler.process(image)
+            else:
+                handler.save(processed, output_path)
+            timings.append(time.perf_counter() - start)
+        output_bytes = os.path.getsize(output_path) if os.path.exists(output_path) else None
+    return {
+        'source': os.path.relpath(source, ROOT) if os.path.isabs(source) else source,
+        'format': format_key,
+        'operation': operation,
+        'median_ms': statistics.median(timings) * 1000,
+        'p95_ms': percentile(timings, 95) * 1000,
+        'peak_rss_mb': peak_rss_mb(),
+        'source_rss_mb': source_rss,
+        'output_bytes': output_bytes,
+    }
+
+def measure_in_subprocess(source, format_key, operation, repeat):
+    output = subprocess.run(
+        [sys.executable, __file__, '--measure', source, format_key, operation, '--repeat', str(repeat)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output)
+
+def run_benchmark(sources, formats, repeat):
+    """Every operation for every source and format, as a JSON-serializable report"""
+    print(f"{'source':<28} {'format':<14} {'operation':<20} {'median ms':>10} {'p95 ms':>9} "
+          f"{'peak RSS MB':>12} {'bytes':>9}")
+    print("-" * 108)
+    results = []
+    for source in sources:
+        for format_key in formats:
+            for operation in OPERATIONS:
+                result = measure_in_subprocess(source, format_key, operation, repeat)
+                results.append(result)
+                print(f"{os.path.basename(result['source'])[:28]:<28} {format_key:<14} {operation:<20} "
+                      f"{result['median_ms']:>10.2f} {result['p95_ms']:>9.2f} {format_mb(result['peak_rss_mb'], 12)} {result['output_bytes'] or '-':>9}")
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pillow': PIL.__version__,
+        'machine': platform.machine(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+def compare(baseline, current, threshold):
+    """Metrics of ``current`` that grew by more than ``threshold`` (a fraction) over ``baseline``"""
+    previous = {(r['source'], r['format'], r['operation']): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        before = previous.get((result['source'], result['format'], result['operation']))
+        if before is None:
+            continue
+        for metric in METRICS:
+            old, new = before.get(metric), result.get(metric)
+            if old and new is not None and new > old * (1 + threshold):
+                regressions.append({
+                    'source': result['source'], 'format': result['format'], 'operation': result['operation'],
+                    'metric': metric, 'baseline': old, 'current': new, 'change': new / old - 1,
+                })
+    return regressions
+
+def print_regressions(regressions, threshold):
+    if not regressions:
+        print(f"No regressions over {threshold:.0%}")
+        return
+    print(f"{len(regressions)} regressions over {threshold:.0%}:")
+    for r in regressions:
+        print(f"  {r['source']} {r['format']} {r['operation']}: {r['metric']} "
+              f"{r['baseline']:.2f} -> {r['current']:.2f} (+{r['change']:.0%})")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help='Longest side of the synthetic sources (default: %(default)s)')
+    parser.add_argument('--sources', nargs='+',
+                        help='Image files or "synthetic WxH" sources to benchmark instead of the defaults')
+    parser.add_argument('--formats', nargs='+', choices=sorted(default_formats), default=list(default_formats))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='Save the results as JSON')
+    parser.add_argument('--current', help='Compare these saved results instead of running the benchmark')
+    parser.add_argument('--compare', metavar='BASELINE', help='Flag regressions against saved baseline results')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Growth over the baseline reported as a regression (default: 0.2, i.e. 20%%)')
+    parser.add_argument('--measure', nargs=3, metavar=('SOURCE', 'FORMAT', 'OPERATION'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.measure:
+        print(json.dumps(measure(*args.measure, args.repeat)))
+        return 0
+
+    if args.current:
+        with open(args.current) as f:
+            report = json.load(f)
+    else:
+        sources = args.sources or default_sources(args.sizes)
+        report = run_benchmark(sources, args.formats, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        print_regressions(regressions, args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+Benchmark PNG encode profiles.
+
+Renders the PNG outputs of every test image (and the logos shipped in the
+repository root) once, then encodes them with each profile and prints the
+median encode time and total bytes per profile.
+
+Usage:
+    python tests/benchmark_png_profiles.py [--repeat 5]
+"""
+import argparse
+import glob
+import io
+import os
+import statistics
+import sys
+import time
+
+# Add project root to path to import from src
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from PIL import Image
+from src.core.encoding import DEFAULT_PNG_PROFILE, PNG_PROFILES, png_save_kwargs
+from src.processors.fan_out import FanOutProcessor
+from src.config import default_formats
+
+def render_png_outputs():
+    """Every PNG format rendered from every sample image"""
+    sources = sorted(glob.glob(os.path.join(ROOT, 'tests', 'test_images', '*')))
+    sources += sorted(glob.glob(os.path.join(ROOT, '*.png')) + glob.glob(os.path.join(ROOT, '*.ico')))
+    outputs = []
+    for source in sources:
+        with Image.open(source) as source_img, FanOutProcessor(source_img) as renderer:
+            for format_spec in default_formats.values():
+                if format_spec.format == 'PNG':
+                    outputs.append(renderer.render(format_spec))
+    return outputs
+
+def encode_all(images, profile):
+    """Seconds and total bytes to encode ``images`` with one profile"""
+    total = 0
+    start = time.perf_counter()
+    for image in images:
+        buffer = io.BytesIO()
+        image.save(buffer, 'PNG', **png_save_kwargs(profile))
+        total += buffer.tell()
+    return time.perf_counter() - start, total
+
+def run_benchmark(repeat):
+    images = render_png_outputs()
+    print(f"{len(images)} PNG outputs, default profile: {DEFAULT_PNG_PROFILE}")
+    print(f"{'profile':>10} {'encode (ms)':>12} {'bytes':>10} {'time vs smallest':>17} {'bytes vs smallest':>18}")
+    print("-" * 71)
+    results = {}
+    for profile in PNG_PROFILES:
+        runs = [encode_all(images, profile) for _ in range(repeat)]
+        results[profile] = (statistics.median(seconds for seconds, _ in runs), runs[0][1])
+    smallest_time, smallest_bytes = results['smallest']
+    for profile, (seconds, total) in results.items():
+        print(f"{profile:>10} {seconds * 1000:>12.1f} {total:>10} "
+              f"{seconds / smallest_time:>16.2f}x {total / smallest_bytes:>17.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run_benchmark(args.repeat)
+
+if __name__ == '__main__':
+    main()
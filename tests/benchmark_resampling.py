@@ -0,0 +1,68 @@
+"""
+Benchmark adaptive pre-scaling against direct LANCZOS resizing.
+
+Renders the full default format set from synthetic sources of increasing
+size, once with pre-scaling disabled and once enabled, and prints the
+speedup per source size and input type.
+
+Usage:
+    python tests/benchmark_resampling.py [--sizes 1000 2000 4000 6000] [--repeat 3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.core import resampling
+from src.processors.image_processor import ImageProcessor
+from src.config import default_formats
+from test_resampling import create_detailed_image
+
+def time_format_set(source_path, output_dir, use_draft, repeat):
+    """Median seconds to load a source and write every default format"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        image = ImageProcessor.load_image(source_path, default_formats.values() if use_draft else None)
+        for format_key, format_spec in default_formats.items():
+            ImageProcessor.process_image(image, format_spec, os.path.join(output_dir, format_key))
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def run_benchmark(sizes, repeat):
+    original_gap = resampling.REDUCING_GAP
+    print(f"{'source':>12} {'type':>5} {'direct (s)':>11} {'prescaled (s)':>14} {'speedup':>8}")
+    print("-" * 55)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for size in sizes:
+            source = create_detailed_image(size, size)
+            sources = {
+                'PNG': os.path.join(temp_dir, f"source_{size}.png"),
+                'JPEG': os.path.join(temp_dir, f"source_{size}.jpg"),
+            }
+            source.save(sources['PNG'])
+            source.convert('RGB').save(sources['JPEG'], quality=92)
+
+            for kind, source_path in sources.items():
+                try:
+                    resampling.REDUCING_GAP = None
+                    direct = time_format_set(source_path, temp_dir, False, repeat)
+                    resampling.REDUCING_GAP = original_gap
+                    prescaled = time_format_set(source_path, temp_dir, True, repeat)
+                finally:
+                    resampling.REDUCING_GAP = original_gap
+                print(f"{size:>5}x{size:<6} {kind:>5} {direct:>11.3f} {prescaled:>14.3f} {direct / prescaled:>7.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 2000, 4000, 6000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    run_benchmark(args.sizes, args.repeat)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark cold start of the library and the desktop app.
+
+Measures the import time of each entry point and the time from the start
+of the app's code to the first paint of the main window (offscreen unless
+QT_QPA_PLATFORM says otherwise), and prints the median and best of each
+against its budget. Every measurement runs in a fresh interpreter so no
+module is already imported. ``--check`` exits with status 1 when a median
+is over budget or a headless import loads PyQt6 or NumPy.
+
+Usage:
+    python tests/benchmark_startup.py [--runs 5] [--check]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional, Sequence
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Median seconds each measurement may take before --check fails
+BUDGETS = {
+    'import src.processors': 0.2,
+    'import src.batch': 0.25,
+    'import src.gui': 0.35,
+    'first paint': 0.4,
+}
+
+# Modules a headless import must not load
+HEAVY_MODULES = ('PyQt6', 'numpy')
+
+_IMPORT = """\
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps(sorted(name for name in {heavy!r} if name in sys.modules)))
+print(elapsed)
+"""
+
+_FIRST_PAINT = """\
+import time
+start = time.perf_counter()
+import sys
+from PyQt6.QtCore import QEvent, QObject, QTimer
+from PyQt6.QtWidgets import QApplication
+from src.gui import ImageProcessorGUI
+
+class FirstPaint(QObject):
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.Paint and not painted:
+            painted.append(time.perf_counter() - start)
+            QTimer.singleShot(0, app.quit)
+        return False
+
+painted = []
+app = QApplication(sys.argv[:1])
+window = ImageProcessorGUI()
+first_paint = FirstPaint()
+window.installEventFilter(first_paint)
+window.show()
+QTimer.singleShot(30000, app.quit)
+app.exec()
+print(painted[0])
+"""
+
+def _run(code: str) -> List[str]:
+    """Run ``code`` in a fresh interpreter from the project root; its output lines."""
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+    completed = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env,
+                               capture_output=True, text=True, check=True)
+    return completed.stdout.strip().splitlines()
+
+def heavy_imports(module: str) -> List[str]:
+    """Which of ``HEAVY_MODULES`` importing ``module`` loads."""
+    return json.loads(_run(_IMPORT.format(module=module, heavy=HEAVY_MODULES))[0])
+
+def measure_import(module: str, runs: int) -> List[float]:
+    """Seconds to import ``module`` in ``runs`` fresh interpreters."""
+    return [float(_run(_IMPORT.format(module=module, heavy=HEAVY_MODULES))[-1]) for _ in range(runs)]
+
+def measure_first_paint(runs: int) -> List[float]:
+    """Seconds from the first line of the app until the main window first paints."""
+    return [float(_run(_FIRST_PAINT)[-1]) for _ in range(runs)]
+
+def run(runs: int = 5) -> Dict[str, List[float]]:
+    """Every measurement in ``BUDGETS``, ``runs`` times each."""
+    results = {f'import {module}': measure_import(module, runs)
+               for module in ('src.processors', 'src.batch', 'src.gui')}
+    results['first paint'] = measure_first_paint(runs)
+    return results
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per measurement (default: 5)')
+    parser.add_argument('--check', action='store_true', help='Exit with status 1 when a median is over budget')
+    args = parser.parse_args(argv)
+
+    over_budget = []
+    for name, samples in run(args.runs).items():
+        median = statistics.median(samples)
+        status = 'ok' if median <= BUDGETS[name] else 'OVER BUDGET'
+        if median > BUDGETS[name]:
+            over_budget.append(name)
+        print(f"{name:<24} median {median * 1000:7.1f} ms  min {min(samples) * 1000:7.1f} ms  "
+              f"budget {BUDGETS[name] * 1000:5.0f} ms  {status}")
+    for module in ('src.processors', 'src.batch'):
+        loaded = heavy_imports(module)
+        if loaded:
+            print(f"import {module} loads {', '.join(loaded)}")
+            over_budget.append(module)
+    return 1 if args.check and over_budget else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
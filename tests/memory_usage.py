@@ -0,0 +1,29 @@
+"""
+Peak resident set size of the current process, for the benchmarks.
+
+Uses the Unix ``resource`` module where it exists and psutil (if
+installed) elsewhere; without either, peak RSS is reported as unavailable.
+"""
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_mb():
+    """Peak RSS of this process in MB, or None where it cannot be measured"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS reports bytes, Linux and the BSDs kilobytes
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    try:
+        import psutil
+    except ImportError:
+        return None
+    memory = psutil.Process().memory_info()
+    # peak_wset is the Windows peak working set
+    return getattr(memory, 'peak_wset', memory.rss) / (1024 * 1024)
+
+def format_mb(value, width):
+    return f"{value:>{width}.1f}" if value is not None else f"{'n/a':>{width}}"
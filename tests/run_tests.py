@@ -43,4 +43,8 @@ def run_test_suite():
     return 0 if result.wasSuccessful() else 1
 
 if __name__ == '__main__':
+    if '--benchmark' in sys.argv[1:]:
+        # Run the format benchmarks instead, passing the remaining options on
+        import benchmark_formats
+        sys.exit(benchmark_formats.main([arg for arg in sys.argv[1:] if arg != '--benchmark']))
     sys.exit(run_test_suite())
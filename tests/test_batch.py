@@ -0,0 +1,123 @@
+import unittest
+from PIL import Image
+import os
+import json
+import sys
+import tempfile
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import batch
+from src.config import config_manager, default_formats
+from src.core.error_handler import ConfigurationError
+
+class TestBatchCLI(unittest.TestCase):
+    def setUp(self):
+        """Create a small logo library with nested folders"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.temp_dir.name, "library")
+        self.output_dir = os.path.join(self.temp_dir.name, "output")
+        self.sources = []
+        for store, size in [("store_a", (300, 200)), ("store_b", (200, 400)), ("store_b/nested", (120, 120))]:
+            store_dir = os.path.join(self.input_dir, store)
+            os.makedirs(store_dir)
+            path = os.path.join(store_dir, "logo.png")
+            Image.new('RGBA', size, (255, 0, 0, 255)).save(path)
+            self.sources.append(path)
+        # Unsupported files should be skipped
+        with open(os.path.join(self.input_dir, "notes.txt"), 'w') as f:
+            f.write("not an image")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def assertOutputsComplete(self, output_dir):
+        for format_key, format_spec in default_formats.items():
+            with Image.open(os.path.join(output_dir, format_key)) as output_img:
+                self.assertEqual(output_img.size, format_spec.dimensions)
+
+    def test_find_images(self):
+        """Directory walk should find every supported image recursively"""
+        self.assertEqual(sorted(batch.find_images(self.input_dir)), sorted(self.sources))
+
+    def test_directory_with_process_pool(self):
+        """Each input should get its own output folder mirroring the input tree"""
+        exit_code = batch.main([self.input_dir, '-o', self.output_dir, '--workers', '2'])
+        self.assertEqual(exit_code, 0)
+        for store in ["store_a", "store_b", "store_b/nested"]:
+            self.assertOutputsComplete(os.path.join(self.output_dir, store, "logo"))
+
+    def test_same_stem_sources_get_separate_folders(self):
+        """Sources differing only by extension should not share an output folder"""
+        store_dir = os.path.join(self.input_dir, "store_a")
+        Image.new('RGB', (300, 200), (0, 0, 255)).save(os.path.join(store_dir, "logo.jpg"))
+        plan = batch.plan_output_dirs(batch.find_images(self.input_dir), self.output_dir, self.input_dir)
+        self.assertEqual(plan[os.path.join(store_dir, "logo.png")], os.path.join(self.output_dir, "store_a", "logo_png"))
+        self.assertEqual(plan[os.path.join(store_dir, "logo.jpg")], os.path.join(self.output_dir, "store_a", "logo_jpg"))
+        self.assertEqual(plan[self.sources[1]], os.path.join(self.output_dir, "store_b", "logo"))
+
+        exit_code = batch.main([self.input_dir, '-o', self.output_dir, '--workers', '2'])
+        self.assertEqual(exit_code, 0)
+        for folder, colour in [("logo_png", (255, 0, 0)), ("logo_jpg", (0, 0, 255))]:
+            output_dir = os.path.join(self.output_dir, "store_a", folder)
+            self.assertOutputsComplete(output_dir)
+            with Image.open(os.path.join(output_dir, "Logo.png")) as output_img:
+                centre = output_img.convert('RGB').getpixel((150, 150))
+            self.assertTrue(all(abs(a - b) < 16 for a, b in zip(centre, colour)), centre)
+
+        # A folder name that still collides fails instead of sharing the folder
+        Image.new('RGB', (30, 20)).save(os.path.join(store_dir, "logo_png.bmp"))
+        with self.assertRaises(ConfigurationError):
+            batch.plan_output_dirs(batch.find_images(self.input_dir), self.output_dir, self.input_dir)
+        self.assertEqual(batch.main([self.input_dir, '-o', self.output_dir]), 1)
+
+    def test_file_list(self):
+        """File lists resolve relative paths against the list's directory"""
+        list_path = os.path.join(self.temp_dir.name, "files.txt")
+        with open(list_path, 'w') as f:
+            f.write("# stores to refresh\n")
+            f.write("library/store_a/logo.png\n\n")
+            f.write(f"{self.sources[1]}\n")
+        exit_code = batch.main(['--file-list', list_path, '-o', self.output_dir, '--workers', '1'])
+        self.assertEqual(exit_code, 0)
+        self.assertOutputsComplete(os.path.join(self.output_dir, "store_a", "logo"))
+        self.assertOutputsComplete(os.path.join(self.output_dir, "store_b", "logo"))
+
+    def test_config_reloads_between_sources(self):
+        """Formats from --config apply to sources started after the file changes"""
+        original = config_manager.config
+        config_path = os.path.join(self.temp_dir.name, "formats.json")
+        with open(config_path, 'w') as f:
+            json.dump({'formats': {'Thumb.png': {'dimensions': [64, 64], 'mode': 'RGBA', 'format': 'PNG'}}}, f)
+        try:
+            batch._init_worker(None, 0, config_path=config_path)
+            first = batch.process_file(self.sources[0], os.path.join(self.output_dir, "first"))
+            with open(config_path, 'w') as f:
+                json.dump({'formats': {'Thumb.png': {'dimensions': [64, 64], 'mode': 'RGBA', 'format': 'PNG'},
+                                       'Wide.png': {'dimensions': [120, 40], 'mode': 'RGB', 'format': 'PNG'}}}, f)
+            stat = os.stat(config_path)
+            os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            second = batch.process_file(self.sources[1], os.path.join(self.output_dir, "second"))
+        finally:
+            batch._writer.close()
+            config_manager._config_path = config_manager._config_stamp = None
+            config_manager.publish(original)
+        self.assertEqual((first.error, first.outputs), (None, 1))
+        self.assertEqual((second.error, second.outputs), (None, 2))
+        with Image.open(os.path.join(self.output_dir, "second", "Wide.png")) as wide:
+            self.assertEqual(wide.size, (120, 40))
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, "first", "Wide.png")))
+
+    def test_failures_are_reported(self):
+        """A broken input should fail on its own without stopping the batch"""
+        broken = os.path.join(self.input_dir, "store_a", "broken.png")
+        with open(broken, 'wb') as f:
+            f.write(b"not a png")
+        plan = batch.plan_output_dirs(batch.find_images(self.input_dir), self.output_dir, self.input_dir)
+        summary = batch.run_batch(plan, workers=1)
+        self.assertEqual(len(summary.results), 4)
+        self.assertEqual([result.source for result in summary.failed], [broken])
+        self.assertGreater(summary.images_per_second, 0)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
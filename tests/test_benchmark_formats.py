@@ -0,0 +1,76 @@
+import unittest
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import benchmark_formats
+
+class TestBenchmarkFormats(unittest.TestCase):
+    def result(self, **metrics):
+        values = {'source': 'synthetic 100x75', 'format': 'Logo.png', 'operation': 'process_image',
+                  'median_ms': 10.0, 'p95_ms': 12.0, 'peak_rss_mb': 30.0, 'output_bytes': 1000}
+        values.update(metrics)
+        return values
+
+    def test_percentile(self):
+        self.assertEqual(benchmark_formats.percentile([3, 1, 2], 50), 2)
+        self.assertEqual(benchmark_formats.percentile(list(range(1, 101)), 95), 95)
+        self.assertEqual(benchmark_formats.percentile([5], 95), 5)
+
+    def test_compare_flags_growth_over_the_threshold(self):
+        baseline = {'results': [self.result(), self.result(format='Smalllogo.png')]}
+        current = {'results': [
+            self.result(median_ms=13.0, p95_ms=12.5, output_bytes=900),
+            self.result(format='Smalllogo.png', peak_rss_mb=40.0),
+            self.result(format='KDlogo.png', median_ms=99.0),  # Not in the baseline
+        ]}
+        regressions = benchmark_formats.compare(baseline, current, 0.2)
+        self.assertEqual([(r['format'], r['metric']) for r in regressions],
+                         [('Logo.png', 'median_ms'), ('Smalllogo.png', 'peak_rss_mb')])
+        self.assertAlmostEqual(regressions[0]['change'], 0.3)
+        self.assertEqual(benchmark_formats.compare(baseline, current, 0.5), [])
+
+    def test_saved_results_compare_against_a_baseline(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            results_path = os.path.join(temp_dir, 'results.json')
+            with contextlib.redirect_stdout(io.StringIO()):
+                status = benchmark_formats.main([
+                    '--sources', 'synthetic 100x75', '--formats', 'Logo.png', '--repeat', '2',
+                    '--output', results_path,
+                ])
+            self.assertEqual(status, 0)
+            with open(results_path) as f:
+                report = json.load(f)
+            self.assertEqual([r['operation'] for r in report['results']], list(benchmark_formats.OPERATIONS))
+            by_operation = {r['operation']: r for r in report['results']}
+            self.assertGreater(by_operation['process_image']['output_bytes'], 0)
+            self.assertEqual(by_operation['ImageFormat.save']['output_bytes'],
+                             by_operation['process_image']['output_bytes'])
+            self.assertIsNone(by_operation['ImageFormat.process']['output_bytes'])
+            for result in report['results']:
+                self.assertLessEqual(result['median_ms'], result['p95_ms'])
+                if result['peak_rss_mb'] is not None:
+                    self.assertGreaterEqual(result['peak_rss_mb'], result['source_rss_mb'])
+
+            # A slower run against the saved baseline is flagged
+            for result in report['results']:
+                result['median_ms'] *= 2
+                result['p95_ms'] *= 2
+            current_path = os.path.join(temp_dir, 'current.json')
+            with open(current_path, 'w') as f:
+                json.dump(report, f)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                status = benchmark_formats.main(['--current', current_path, '--compare', results_path])
+            self.assertEqual(status, 1)
+            self.assertIn("6 regressions over 20%", output.getvalue())
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(benchmark_formats.main(['--current', results_path, '--compare', results_path]), 0)
+
+if __name__ == '__main__':
+    unittest.main()
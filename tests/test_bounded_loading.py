@@ -0,0 +1,195 @@
+import unittest
+from unittest import mock
+from PIL import Image, ImageChops, TiffImagePlugin, UnidentifiedImageError
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import textwrap
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Add project root to path to import from src
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+from src.core import bounded_loading
+from src.core.error_handler import ImageProcessingError
+from src.processors.image_processor import ImageProcessor
+from src.config import default_formats
+
+MB = 1024 * 1024
+
+def create_large_image(width, height):
+    """Smooth RGB gradients, cheap to create at any size"""
+    gradient = Image.radial_gradient('L').resize((width, height))
+    return Image.merge('RGB', [
+        gradient,
+        gradient.transpose(Image.Transpose.FLIP_TOP_BOTTOM),
+        gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT),
+    ])
+
+def save_libtiff_strips(image, path):
+    """Uncompressed TIFF written by libtiff, which stores a few rows per strip"""
+    TiffImagePlugin.WRITE_LIBTIFF = True
+    try:
+        image.save(path, compression='raw')
+    finally:
+        TiffImagePlugin.WRITE_LIBTIFF = False
+
+def save_tiled_tiff(image, path, tile_size=256):
+    """Uncompressed RGB TIFF stored in tiles, which Pillow itself cannot write"""
+    width, height = image.size
+    tiles = []
+    for y in range(0, height, tile_size):
+        for x in range(0, width, tile_size):
+            # Edge tiles are padded to the full tile size
+            tile = Image.new('RGB', (tile_size, tile_size))
+            tile.paste(image.crop((x, y, min(x + tile_size, width), min(y + tile_size, height))))
+            tiles.append(tile.tobytes())
+    data_offset = 8
+    offsets = [data_offset + index * len(tiles[0]) for index in range(len(tiles))]
+    arrays_offset = data_offset + len(tiles) * len(tiles[0])
+    bits_offset = arrays_offset
+    offsets_offset = bits_offset + 6
+    counts_offset = offsets_offset + 4 * len(tiles)
+    ifd_offset = counts_offset + 4 * len(tiles)
+    entries = [
+        (256, 4, 1, width), (257, 4, 1, height), (258, 3, 3, bits_offset), (259, 3, 1, 1),
+        (262, 3, 1, 2), (277, 3, 1, 3), (284, 3, 1, 1), (322, 3, 1, tile_size), (323, 3, 1, tile_size),
+        (324, 4, len(tiles), offsets_offset), (325, 4, len(tiles), counts_offset),
+    ]
+    with open(path, 'wb') as f:
+        f.write(b'II*\x00' + struct.pack('<I', ifd_offset))
+        f.writelines(tiles)
+        f.write(struct.pack('<3H', 8, 8, 8))
+        f.write(struct.pack(f'<{len(tiles)}I', *offsets))
+        f.write(struct.pack(f'<{len(tiles)}I', *[len(tile) for tile in tiles]))
+        f.write(struct.pack('<H', len(entries)))
+        for tag, field_type, count, value in entries:
+            value = struct.pack('<HH', value, 0) if field_type == 3 and count == 1 else struct.pack('<I', value)
+            f.write(struct.pack('<HHI', tag, field_type, count) + value)
+        f.write(struct.pack('<I', 0))
+
+class TestBoundedLoading(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.rgb = create_large_image(4000, 3000)
+        cls.rgba = cls.rgb.convert('RGBA')
+        cls.rgba.putalpha(cls.rgb.getchannel(0))
+        cls.paths = {}
+        for name, image, kwargs in [
+            ('strip.tif', cls.rgb, {}),
+            ('bottom_up.bmp', cls.rgb, {}),
+            ('alpha.tif', cls.rgba, {}),
+            ('palette.bmp', cls.rgb.convert('P'), {}),
+            ('compressed.tif', cls.rgb, {'compression': 'tiff_lzw'}),
+        ]:
+            cls.paths[name] = os.path.join(cls.temp_dir.name, name)
+            image.save(cls.paths[name], **kwargs)
+        cls.paths['libtiff_strips.tif'] = os.path.join(cls.temp_dir.name, 'libtiff_strips.tif')
+        save_libtiff_strips(cls.rgb, cls.paths['libtiff_strips.tif'])
+        cls.paths['tiled.tif'] = os.path.join(cls.temp_dir.name, 'tiled.tif')
+        save_tiled_tiff(cls.rgb, cls.paths['tiled.tif'])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def load(self, name, memory_ceiling=16 * MB):
+        return ImageProcessor.load_image(self.paths[name], default_formats.values(), memory_ceiling)
+
+    def test_bands_match_full_reduce(self):
+        """Band-by-band reduction should equal reducing the fully decoded image"""
+        factor = (4, 3)
+        cases = {
+            'strip.tif': self.rgb.reduce(factor),
+            'bottom_up.bmp': self.rgb.reduce(factor),
+            'alpha.tif': self.rgba.convert('RGBa').reduce(factor).convert('RGBA'),
+            'palette.bmp': self.rgb.convert('P').convert('RGB').reduce(factor),
+            'libtiff_strips.tif': self.rgb.reduce(factor),
+            'tiled.tif': self.rgb.reduce(factor),
+        }
+        for name, expected in cases.items():
+            with self.subTest(source=name):
+                loaded = self.load(name)
+                self.assertEqual(loaded.mode, expected.mode)
+                self.assertIsNone(ImageChops.difference(loaded, expected).getbbox())
+
+    def test_strips_and_tiles_stream(self):
+        """TIFFs stored in many strips or tiles should stream, not just single-strip files"""
+        for name in ('libtiff_strips.tif', 'tiled.tif'):
+            with self.subTest(source=name), Image.open(self.paths[name]) as image:
+                self.assertGreater(len(image.tile), 100)
+                self.assertTrue(bounded_loading.can_stream(image))
+                band = bounded_loading._read_band(image, 1000, 1300)
+                self.assertIsNone(ImageChops.difference(band, self.rgb.crop((0, 1000, 4000, 1300))).getbbox())
+
+    def test_small_sources_untouched(self):
+        """Sources within the ceiling should load lazily, exactly as before"""
+        loaded = self.load('strip.tif', memory_ceiling=512 * MB)
+        self.assertEqual(loaded.size, (4000, 3000))
+        self.assertIsNone(loaded.im)
+        loaded.close()
+
+    def test_compressed_sources_refused(self):
+        """Sources that cannot be decoded in parts should fail before decoding when too large"""
+        with self.assertRaises(ImageProcessingError):
+            self.load('compressed.tif')
+        self.assertFalse(bounded_loading.can_stream(Image.open(self.paths['compressed.tif'])))
+
+    def test_ceiling_leaves_the_bomb_check_alone(self):
+        """A ceiling should admit large sources without lifting the limit for other Image.open calls"""
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000), \
+                mock.patch.object(Image, '_decompression_bomb_check', side_effect=AssertionError) as check:
+            with bounded_loading.open_image(self.paths['strip.tif'], memory_ceiling=16 * MB) as image:
+                self.assertEqual(image.size, (4000, 3000))
+            check.assert_not_called()
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000):
+            with self.assertRaises(Image.DecompressionBombError):
+                bounded_loading.open_image(self.paths['strip.tif'])
+        with self.assertRaises(UnidentifiedImageError):
+            bounded_loading.open_image(__file__, memory_ceiling=16 * MB)
+
+    def test_ceiling_defaults_to_the_batch_cli_only(self):
+        """Library and GUI loads keep no ceiling unless LOGOCRAFT_MEMORY_CEILING_MB is set"""
+        script = (f"import sys; sys.path.insert(0, {PROJECT_ROOT!r})\n"
+                  "from src.core import bounded_loading\n"
+                  "print(bounded_loading.MEMORY_CEILING)")
+        env = {key: value for key, value in os.environ.items() if key != 'LOGOCRAFT_MEMORY_CEILING_MB'}
+        for value, expected in [(None, 'None'), ('64', str(64 * MB))]:
+            if value:
+                env['LOGOCRAFT_MEMORY_CEILING_MB'] = value
+            output = subprocess.run([sys.executable, '-c', script], env=env, check=True,
+                                    capture_output=True, text=True).stdout
+            self.assertEqual(output.strip(), expected)
+
+    @unittest.skipIf(resource is None, "peak RSS is measured with the Unix resource module")
+    def test_peak_rss_under_ceiling(self):
+        """Rendering every format from a source far over the ceiling should stay within it"""
+        ceiling = 32 * MB
+        source_path = os.path.join(self.temp_dir.name, "huge.tif")
+        create_large_image(6000, 4500).save(source_path)
+        self.assertGreater(bounded_loading.estimate_load_bytes(Image.open(source_path)), 8 * ceiling)
+
+        script = textwrap.dedent(f"""
+            import resource, sys
+            sys.path.insert(0, {PROJECT_ROOT!r})
+            from src.config import default_formats
+            from src.processors.fan_out import FanOutProcessor
+            from src.processors.image_processor import ImageProcessor
+            before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            image = ImageProcessor.load_image({source_path!r}, default_formats.values(), {ceiling})
+            FanOutProcessor(image).process_all(default_formats, {os.path.join(self.temp_dir.name, 'out')!r})
+            print((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) * 1024)
+        """)
+        output = subprocess.run([sys.executable, '-c', script], check=True, capture_output=True, text=True)
+        peak_growth = int(output.stdout.split()[-1])
+        self.assertLess(peak_growth, ceiling)
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir.name, 'out', 'PRINTLOGO.bmp')))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,100 @@
+import unittest
+from unittest import mock
+from PIL import Image, ImageChops
+import os
+import sys
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.core import compositing
+from src.core.error_handler import ConfigurationError
+from src.processors.image_processor import ImageProcessor
+from src.processors.fan_out import FanOutProcessor
+from src.config import default_formats
+
+def create_alpha_grid():
+    """Every (value, alpha) combination once, so blends are checked exhaustively"""
+    values = Image.linear_gradient('L').rotate(90)
+    alpha = Image.linear_gradient('L')
+    return Image.merge('RGBA', [values, values.transpose(Image.Transpose.FLIP_LEFT_RIGHT), values, alpha])
+
+class TestCompositing(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.grid = create_alpha_grid()
+
+    def setUp(self):
+        self.original_backend = compositing.get_backend()
+
+    def tearDown(self):
+        compositing.set_backend(self.original_backend)
+
+    def render_with(self, backend, func):
+        compositing.set_backend(backend)
+        return func()
+
+    def assertBackendsMatch(self, func):
+        expected = self.render_with('pillow', func)
+        actual = self.render_with('numpy', func)
+        self.assertEqual(expected.mode, actual.mode)
+        self.assertEqual(expected.size, actual.size)
+        self.assertIsNone(ImageChops.difference(expected, actual).getbbox())
+
+    def test_matches_alpha_composite(self):
+        """Flattening over white must equal alpha-compositing onto an opaque background"""
+        background = Image.new('RGBA', self.grid.size, (255, 255, 255, 255))
+        expected = Image.alpha_composite(background, self.grid).convert('RGB')
+        for backend in compositing.available_backends():
+            with self.subTest(backend=backend):
+                result = self.render_with(backend, lambda: compositing.composite_over_color(self.grid))
+                self.assertIsNone(ImageChops.difference(expected, result).getbbox())
+
+    @unittest.skipUnless('numpy' in compositing.available_backends(), "NumPy not installed")
+    def test_numpy_backend_is_exact(self):
+        """The NumPy backend should reproduce the Pillow backend bit for bit"""
+        premultiplied = self.grid.convert('RGBa')
+        for color in [(255, 255, 255), (10, 100, 200)]:
+            for canvas_size in [None, (300, 280)]:
+                with self.subTest(color=color, canvas_size=canvas_size):
+                    for mode in ('RGB', 'RGBA'):
+                        self.assertBackendsMatch(
+                            lambda: compositing.composite_over_color(self.grid, color, canvas_size, mode)
+                        )
+                    self.assertBackendsMatch(
+                        lambda: compositing.flatten_premultiplied(premultiplied, color, canvas_size)
+                    )
+
+    @unittest.skipUnless('numpy' in compositing.available_backends(), "NumPy not installed")
+    def test_pipelines_identical_across_backends(self):
+        """Every output format should be identical whichever backend is selected"""
+        for format_key, format_spec in default_formats.items():
+            with self.subTest(format=format_key):
+                self.assertBackendsMatch(lambda: FanOutProcessor(self.grid).render(format_spec))
+        self.assertBackendsMatch(lambda: ImageProcessor.create_printlogo_image(self.grid))
+
+    def test_non_alpha_modes(self):
+        """Palette and grayscale sources are converted before compositing"""
+        palette = self.grid.convert('RGB').convert('P')
+        result = compositing.composite_over_color(palette, canvas_size=(300, 300))
+        self.assertEqual(result.mode, 'RGB')
+        self.assertEqual(result.getpixel((0, 0)), (255, 255, 255))
+
+    def test_unknown_backend(self):
+        """Selecting an unknown backend should raise a configuration error"""
+        with self.assertRaises(ConfigurationError):
+            compositing.set_backend('opencl')
+
+    def test_environment_backend(self):
+        """LOGOCRAFT_COMPOSITE_BACKEND applies on first use; a bad value falls back to pillow"""
+        for value, expected in [('pillow', 'pillow'), ('opencl', 'pillow')] + \
+                [('numpy', 'numpy')] * ('numpy' in compositing.available_backends()):
+            with self.subTest(value=value), mock.patch.dict(os.environ, {'LOGOCRAFT_COMPOSITE_BACKEND': value}), \
+                    mock.patch.object(compositing, '_backend', None):
+                if value == expected:
+                    self.assertEqual(compositing.get_backend(), expected)
+                else:
+                    with self.assertLogs(compositing.logger, 'WARNING'):
+                        self.assertEqual(compositing.get_backend(), expected)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
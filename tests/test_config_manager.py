@@ -0,0 +1,196 @@
+import unittest
+import json
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import FrozenInstanceError, asdict
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.config import config_manager, default_formats
+from src.core import encoding
+from src.core.config_manager import AppConfig, CompiledFormat, ConfigSnapshot, FormatConfig
+from src.core.pipeline import plan_for
+from src.processors.output_cache import OutputCache
+
+class TestConfigManager(unittest.TestCase):
+    def setUp(self):
+        self.original = config_manager.config
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config_path = os.path.join(self.temp_dir.name, 'config.json')
+
+    def tearDown(self):
+        config_manager.stop_watching()
+        config_manager._config_path = config_manager._config_stamp = None
+        config_manager.publish(self.original)
+        self.temp_dir.cleanup()
+
+    def write_config(self, formats, bump=0):
+        """Write a config file; ``bump`` moves its mtime forward so coarse clocks still see a change"""
+        with open(self.config_path, 'w') as f:
+            json.dump({'formats': formats}, f)
+        if bump:
+            stat = os.stat(self.config_path)
+            os.utime(self.config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump * 1_000_000_000))
+
+    def test_snapshots_are_immutable(self):
+        snapshot = config_manager.snapshot()
+        with self.assertRaises(FrozenInstanceError):
+            snapshot.version = 99
+        with self.assertRaises(FrozenInstanceError):
+            snapshot.config.preview_size = 1
+        with self.assertRaises(TypeError):
+            snapshot.formats['Logo.png'] = snapshot.formats['Smalllogo.png']
+        with self.assertRaises(FrozenInstanceError):
+            snapshot.get_format('Logo.png').mode = 'RGB'
+
+    def test_publish_bumps_version_and_keeps_old_snapshots(self):
+        before = config_manager.snapshot()
+        after = config_manager.update_formats({'Logo.png': FormatConfig((64, 64), 'RGB', 'PNG')})
+        self.assertEqual(after.version, before.version + 1)
+        self.assertIs(config_manager.snapshot(), after)
+        self.assertEqual(set(after.formats), {'Logo.png'})
+        # A reader holding the old snapshot is unaffected
+        self.assertEqual(before.get_format('Logo.png').dimensions, (300, 300))
+        self.assertEqual(after.config.preview_size, before.config.preview_size)
+
+    def test_load_config_publishes_compiled_formats(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'config.json')
+            with open(path, 'w') as f:
+                json.dump({'formats': {'Thumb.jpg': {'dimensions': [50, 40], 'mode': 'RGB', 'format': 'JPEG',
+                                                     'background': [255, 255, 255]}},
+                           'preview_size': 120}, f)
+            version = config_manager.snapshot().version
+            config_manager.load_config(path)
+            snapshot = config_manager.snapshot()
+            self.assertEqual(snapshot.version, version + 1)
+            self.assertEqual(snapshot.config.preview_size, 120)
+            thumb = config_manager.get_format('Thumb.jpg')
+            self.assertIsInstance(thumb, CompiledFormat)
+            self.assertEqual(thumb.dimensions, (50, 40))
+            self.assertEqual(thumb.background, (255, 255, 255))
+            self.assertTrue(config_manager.validate_format('Thumb.jpg'))
+            self.assertFalse(config_manager.validate_format('Logo.png'))
+
+            # Saving writes the plain fields back out
+            saved = os.path.join(temp_dir, 'saved', 'config.json')
+            config_manager.save_config(saved)
+            with open(saved) as f:
+                self.assertEqual(json.load(f)['formats']['Thumb.jpg']['dimensions'], [50, 40])
+
+    def test_compiled_formats_carry_plans_and_save_kwargs(self):
+        snapshot = config_manager.snapshot()
+        for key, spec in snapshot.formats.items():
+            with self.subTest(key=key):
+                self.assertEqual(dict(spec.save_kwargs), encoding.save_kwargs(spec))
+                if spec.is_thermal_printer:
+                    continue
+                self.assertIs(plan_for(spec), spec.plan)
+                self.assertIs(plan_for(spec, resize=False), spec.finish_plan)
+                self.assertEqual(spec.plan.stage_names[0], 'resize')
+                self.assertNotIn('resize', spec.finish_plan.stage_names)
+
+    def test_compiled_formats_keep_cache_keys(self):
+        spec = config_manager.get_format('Logo.png')
+        self.assertEqual(asdict(spec), asdict(FormatConfig(**asdict(spec))))
+        self.assertEqual(OutputCache._serialize_format(spec), OutputCache._serialize_format(default_formats['Logo.png']))
+
+    def test_snapshots_pickle(self):
+        snapshot = config_manager.snapshot()
+        restored = pickle.loads(pickle.dumps(snapshot))
+        self.assertEqual(restored.version, snapshot.version)
+        self.assertEqual(set(restored.formats), set(snapshot.formats))
+        logo = restored.get_format('Logo.png')
+        self.assertEqual(logo, snapshot.get_format('Logo.png'))
+        self.assertEqual(logo.plan.stage_names, snapshot.get_format('Logo.png').plan.stage_names)
+
+    def test_readers_see_consistent_snapshots_during_reloads(self):
+        sizes = [(size, size) for size in range(10, 60)]
+        configs = [AppConfig(formats={'a.png': FormatConfig(size, 'RGBA', 'PNG'),
+                                      'b.png': FormatConfig(size, 'RGB', 'PNG')}) for size in sizes]
+        stop = threading.Event()
+        errors = []
+
+        def read():
+            while not stop.is_set():
+                snapshot = config_manager.snapshot()
+                formats = snapshot.formats
+                if 'a.png' in formats and formats['a.png'].dimensions != formats['b.png'].dimensions:
+                    errors.append(snapshot.version)
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        versions = [config_manager.publish(config).version for config in configs]
+        stop.set()
+        for reader in readers:
+            reader.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(versions, list(range(versions[0], versions[0] + len(configs))))
+
+    def test_reload_recompiles_only_changed_formats(self):
+        logo = {'dimensions': [300, 300], 'mode': 'RGBA', 'format': 'PNG'}
+        thumb = {'dimensions': [64, 64], 'mode': 'RGBA', 'format': 'PNG'}
+        self.write_config({'Logo.png': logo, 'Thumb.png': thumb})
+        config_manager.load_config(self.config_path)
+        before = config_manager.snapshot()
+        self.assertIsNone(config_manager.reload_if_changed())
+
+        self.write_config({'Logo.png': logo, 'Thumb.png': dict(thumb, colors=16),
+                           'Wide.png': {'dimensions': [200, 50], 'mode': 'RGB', 'format': 'PNG'}}, bump=1)
+        after = config_manager.reload_if_changed()
+        self.assertEqual(after.version, before.version + 1)
+        self.assertIs(after.get_format('Logo.png'), before.get_format('Logo.png'))
+        self.assertIsNot(after.get_format('Thumb.png'), before.get_format('Thumb.png'))
+        self.assertIn('quantize', after.get_format('Thumb.png').plan.stage_names)
+        self.assertEqual(after.get_format('Wide.png').dimensions, (200, 50))
+        # Jobs that took the earlier snapshot keep its formats
+        self.assertNotIn('Wide.png', before.formats)
+        self.assertNotIn('quantize', before.get_format('Thumb.png').plan.stage_names)
+
+    def test_invalid_reload_keeps_current_snapshot(self):
+        self.write_config({'Thumb.png': {'dimensions': [64, 64], 'mode': 'RGBA', 'format': 'PNG'}})
+        config_manager.load_config(self.config_path)
+        current = config_manager.snapshot()
+        with open(self.config_path, 'w') as f:
+            f.write('{"formats": {"Thumb.png": ')
+        stat = os.stat(self.config_path)
+        os.utime(self.config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        with self.assertLogs('src.core.config_manager', 'ERROR'):
+            self.assertIsNone(config_manager.reload_if_changed())
+        self.write_config({'Thumb.png': {'dimensions': [64, 64], 'mode': 'RGBA', 'format': 'PNG',
+                                         'encode_profile': 'tiny'}}, bump=2)
+        with self.assertLogs('src.core.config_manager', 'ERROR'):
+            self.assertIsNone(config_manager.reload_if_changed())
+        self.assertIs(config_manager.snapshot(), current)
+
+    def test_watch_picks_up_changes(self):
+        self.write_config({'Thumb.png': {'dimensions': [64, 64], 'mode': 'RGBA', 'format': 'PNG'}})
+        config_manager.watch(self.config_path, interval=0.01)
+        self.assertEqual(config_manager.get_format('Thumb.png').dimensions, (64, 64))
+        self.write_config({'Thumb.png': {'dimensions': [96, 96], 'mode': 'RGBA', 'format': 'PNG'}}, bump=1)
+        deadline = time.monotonic() + 5
+        while config_manager.get_format('Thumb.png').dimensions != (96, 96) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(config_manager.get_format('Thumb.png').dimensions, (96, 96))
+
+    def test_snapshot_compiles_output_formats(self):
+        snapshot = ConfigSnapshot(1, AppConfig(formats=default_formats))
+        self.assertIsInstance(snapshot.get_format('RPTlogo.bmp'), CompiledFormat)
+        self.assertEqual(snapshot.get_format('RPTlogo.bmp').save_kwargs['format'], 'BMP')
+
+    def test_compiled_format_equals_its_spec(self):
+        spec = FormatConfig((64, 64), 'RGBA', 'PNG')
+        compiled = CompiledFormat.compile(spec)
+        self.assertEqual(compiled, spec)
+        self.assertEqual(spec, compiled)
+        self.assertEqual(hash(compiled), hash(spec))
+        self.assertIn(spec, {compiled: 'preview'})
+        self.assertNotEqual(compiled, FormatConfig((64, 64), 'RGB', 'PNG'))
+
+if __name__ == '__main__':
+    unittest.main()
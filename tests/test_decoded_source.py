@@ -0,0 +1,92 @@
+import unittest
+from unittest import mock
+from PIL import Image
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt6.QtWidgets import QApplication
+from src.config import default_formats
+from src.gui.main_window import ImageProcessorGUI
+from src.processors import thumbnails
+from src.processors.decoded_source import DecodedSource
+from src.processors.fan_out import FanOutProcessor
+from src.processors.image_processor import ImageProcessor
+from test_resampling import create_detailed_image
+
+class TestDecodedSource(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source_path = os.path.join(self.temp_dir.name, "logo.jpg")
+        create_detailed_image(2400, 1800).convert('RGB').save(self.source_path, quality=90)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_decodes_once_for_concurrent_users(self):
+        source = DecodedSource(self.source_path, default_formats.values())
+        images = []
+        threads = [threading.Thread(target=lambda: images.append(source.image())) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(source.decodes, 1)
+        self.assertTrue(all(image is images[0] for image in images))
+        # Same reduced decode as loading the file for those formats
+        expected = ImageProcessor.load_image(self.source_path, default_formats.values())
+        self.assertEqual(images[0].size, expected.size)
+        self.assertEqual(images[0].tobytes(), expected.tobytes())
+
+    def test_changed_file_is_decoded_again(self):
+        source = DecodedSource(self.source_path, default_formats.values())
+        source.image()
+        Image.new('RGB', (640, 480), (0, 128, 255)).save(self.source_path)
+        stat = os.stat(self.source_path)
+        os.utime(self.source_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertEqual(source.image().size, (640, 480))
+        self.assertEqual(source.decodes, 2)
+
+    def test_processing_renders_from_the_shared_decode(self):
+        source = DecodedSource(self.source_path, default_formats.values())
+        shared = source.image()
+        before = shared.tobytes()
+        with FanOutProcessor(shared) as renderer:
+            rendered = renderer.render(default_formats['Logo.png'])
+        with FanOutProcessor.from_file(self.source_path, formats=default_formats.values()) as renderer:
+            expected = renderer.render(default_formats['Logo.png'])
+        self.assertEqual(rendered.tobytes(), expected.tobytes())
+        # Rendering leaves the shared pixels untouched for the next user
+        self.assertEqual(shared.tobytes(), before)
+
+    def test_window_decodes_once_for_preview_and_processing(self):
+        app = QApplication.instance() or QApplication([])
+        thumbnails.CACHE_DIR, cache_dir = None, thumbnails.CACHE_DIR
+        self.addCleanup(setattr, thumbnails, 'CACHE_DIR', cache_dir)
+        window = ImageProcessorGUI()
+        window.dir_path.setText(self.temp_dir.name)
+        with mock.patch.object(ImageProcessor, 'load_image', wraps=ImageProcessor.load_image) as load_image:
+            window.process_selected_file(self.source_path)
+            deadline = time.monotonic() + 30
+            while (window.preview_label.pixmap() is None or window.preview_label.pixmap().isNull()) \
+                    and time.monotonic() < deadline:
+                app.processEvents()
+                time.sleep(0.01)
+            self.assertTrue(window.source.decoded)
+            window.process_images()
+            while window._job is not None and time.monotonic() < deadline:
+                app.processEvents()
+                time.sleep(0.01)
+        self.assertEqual(window.statusBar().currentMessage(), "Processing complete!")
+        self.assertEqual(load_image.call_count, 1)
+        self.assertEqual(window.source.decodes, 1)
+        self.assertEqual(window.preview_label.pixmap().width(), 200)
+        window.close()
+
+if __name__ == '__main__':
+    unittest.main()
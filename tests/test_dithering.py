@@ -0,0 +1,83 @@
+import unittest
+from PIL import Image, ImageStat
+import os
+import sys
+import tempfile
+from dataclasses import replace
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.core.dithering import DITHER_METHODS, dither
+from src.core.error_handler import ConfigurationError
+from src.core.image_format import ThermalPrinterFormat
+from src.processors.image_processor import ImageProcessor
+from src.processors.fan_out import FanOutProcessor
+from src.config import default_formats
+from test_resampling import create_detailed_image
+
+class TestDithering(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.gradient = Image.linear_gradient('L').rotate(90).resize((600, 256))
+        cls.source = create_detailed_image(800, 600)
+        cls.temp_dir = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def test_methods_keep_tone(self):
+        """Every method should produce a 1-bit image with roughly the source brightness"""
+        source_mean = ImageStat.Stat(self.gradient).mean[0]
+        for method in DITHER_METHODS:
+            with self.subTest(method=method):
+                result = dither(self.gradient, method)
+                self.assertEqual(result.mode, '1')
+                self.assertEqual(result.size, self.gradient.size)
+                self.assertAlmostEqual(ImageStat.Stat(result.convert('L')).mean[0], source_mean, delta=4)
+
+    def test_threshold_level(self):
+        """Threshold mode should cut exactly at the requested level"""
+        result = dither(Image.new('L', (4, 1), 99), 'threshold', threshold=100)
+        self.assertEqual(result.getpixel((0, 0)), 0)
+        result = dither(Image.new('L', (4, 1), 100), 'threshold', threshold=100)
+        self.assertEqual(result.getpixel((0, 0)), 255)
+
+    def test_bayer_pattern(self):
+        """Ordered dithering of flat gray should give an exact, repeating pattern"""
+        result = dither(Image.new('L', (16, 16), 128), 'bayer')
+        pixels = list(result.getdata())
+        self.assertEqual(pixels.count(255), 128)
+        self.assertEqual(result.crop((0, 0, 8, 8)).tobytes(), result.crop((8, 8, 16, 16)).tobytes())
+
+    def test_unknown_method(self):
+        """An unknown dithering method should raise a configuration error"""
+        with self.assertRaises(ConfigurationError):
+            dither(self.gradient, 'atkinson')
+
+    def test_printlogo_bmp_is_one_bit(self):
+        """A dithered PRINTLOGO should be a small 1bpp BMP on every processing path"""
+        format_spec = replace(default_formats['PRINTLOGO.bmp'], dither='floyd-steinberg')
+        rgb_path = os.path.join(self.temp_dir.name, 'rgb.bmp')
+        ImageProcessor.process_image(self.source, default_formats['PRINTLOGO.bmp'], rgb_path)
+
+        paths = {
+            'image_processor': os.path.join(self.temp_dir.name, 'processor.bmp'),
+            'fan_out': os.path.join(self.temp_dir.name, 'fan_out.bmp'),
+            'thermal_format': os.path.join(self.temp_dir.name, 'thermal_format.bmp'),
+        }
+        ImageProcessor.process_image(self.source, format_spec, paths['image_processor'])
+        FanOutProcessor(self.source).process(format_spec, paths['fan_out'])
+        thermal = ThermalPrinterFormat(format_spec)
+        thermal.save(thermal.process(self.source), paths['thermal_format'])
+
+        for name, path in paths.items():
+            with self.subTest(path=name), Image.open(path) as img:
+                self.assertEqual(img.mode, '1')
+                self.assertEqual(img.size, (600, 256))
+                self.assertEqual(round(img.info['dpi'][0]), 203)
+                self.assertLess(os.path.getsize(path), 20 * 1024)
+                self.assertLess(os.path.getsize(path) * 20, os.path.getsize(rgb_path))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,56 @@
+import unittest
+from PIL import Image, ImageChops
+import os
+import sys
+import tempfile
+from dataclasses import replace
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.core import encoding
+from src.core.encoding import DEFAULT_PNG_PROFILE, PNG_PROFILES, png_save_kwargs
+from src.core.error_handler import ConfigurationError
+from src.core.image_format import ImageFormat
+from src.processors.image_processor import ImageProcessor
+from src.config import default_formats
+from test_resampling import create_detailed_image
+
+class TestPngProfiles(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.source = create_detailed_image(600, 600)
+        cls.temp_dir = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def test_save_kwargs(self):
+        """Only the smallest profile should pay for optimize"""
+        self.assertEqual(png_save_kwargs(), PNG_PROFILES[DEFAULT_PNG_PROFILE])
+        self.assertTrue(png_save_kwargs('smallest')['optimize'])
+        self.assertNotIn('optimize', png_save_kwargs('fast'))
+        format_spec = replace(default_formats['Logo.png'], encode_profile='fast')
+        self.assertEqual(ImageProcessor._get_save_kwargs(format_spec)['compress_level'], 1)
+        self.assertEqual(ImageFormat(format_spec)._get_save_kwargs()['compress_level'], 1)
+        for spec in default_formats.values():
+            self.assertEqual(ImageFormat(spec)._get_save_kwargs(), encoding.save_kwargs(spec))
+        with self.assertRaises(ConfigurationError):
+            png_save_kwargs('lossy')
+
+    def test_profiles_are_lossless(self):
+        """Every profile should write the same pixels, with sizes ordered by effort"""
+        sizes = {}
+        for profile in ('fast', 'balanced', 'smallest'):
+            output_path = os.path.join(self.temp_dir.name, f"{profile}.png")
+            format_spec = replace(default_formats['Logo.png'], encode_profile=profile)
+            ImageProcessor.process_image(self.source, format_spec, output_path)
+            sizes[profile] = os.path.getsize(output_path)
+            with Image.open(output_path) as output_img:
+                expected = ImageProcessor._process_standard_image(self.source, format_spec)
+                self.assertIsNone(ImageChops.difference(output_img.convert('RGBA'), expected).getbbox())
+        self.assertLessEqual(sizes['smallest'], sizes['balanced'])
+        self.assertLessEqual(sizes['balanced'], sizes['fast'])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
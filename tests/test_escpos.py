@@ -0,0 +1,106 @@
+import unittest
+from unittest import mock
+from PIL import Image, ImageChops
+import os
+import sys
+import tempfile
+from dataclasses import replace
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.core import escpos
+from src.core.dithering import dither
+from src.core.error_handler import ConfigurationError
+from src.core.image_format import ThermalPrinterFormat
+from src.processors.image_processor import ImageProcessor
+from src.processors.fan_out import FanOutProcessor
+from src.config import default_formats
+from test_resampling import create_detailed_image
+
+class TestEscposRaster(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.source = create_detailed_image(800, 600)
+        cls.bitmap = dither(ImageProcessor.create_printlogo_image(cls.source), 'floyd-steinberg')
+        cls.format_spec = replace(default_formats['PRINTLOGO.bmp'], format='ESCPOS', dither='floyd-steinberg')
+        cls.temp_dir = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def assertSameBits(self, expected, actual):
+        self.assertEqual(expected.size, actual.size)
+        self.assertIsNone(ImageChops.difference(expected.convert('L'), actual.convert('L')).getbbox())
+
+    def test_header(self):
+        """A single band should carry the GS v 0 header with width in bytes and height in rows"""
+        data = escpos.encode_raster(self.bitmap)
+        self.assertEqual(data[:8], b'\x1dv0\x00' + bytes((75, 0, 0, 1)))
+        self.assertEqual(len(data), 8 + 75 * 256)
+
+    def test_round_trip(self):
+        """Decoding the stream should give back the exact 1-bit image"""
+        self.assertSameBits(self.bitmap, escpos.decode_raster(escpos.encode_raster(self.bitmap)))
+
+    def test_black_is_set_bit(self):
+        """Black dots are 1 bits in the raster data"""
+        image = Image.new('1', (8, 1), 255)
+        image.putpixel((0, 0), 0)
+        self.assertEqual(escpos.encode_raster(image)[8:], b'\x80')
+
+    def test_bands(self):
+        """Band height should split the image into several commands of at most that many rows"""
+        data = escpos.encode_raster(self.bitmap, band_height=24)
+        self.assertEqual(data.count(escpos.GS_V_0 + b'\x00\x4b\x00\x18\x00'), 10)
+        self.assertEqual(len(data), 11 * 8 + 75 * 256)
+        self.assertSameBits(self.bitmap, escpos.decode_raster(data))
+        with self.assertRaises(ConfigurationError):
+            escpos.encode_raster(self.bitmap, band_height=0)
+
+    def test_print_width(self):
+        """Print width should crop or pad the canvas symmetrically around the logo"""
+        narrow = escpos.decode_raster(escpos.encode_raster(self.bitmap, print_width=384))
+        self.assertSameBits(self.bitmap.crop((108, 0, 492, 256)), narrow)
+        # Widths that are not a multiple of 8 are padded with white dots
+        odd = escpos.decode_raster(escpos.encode_raster(self.bitmap, print_width=602))
+        self.assertEqual(odd.width, 608)
+        self.assertSameBits(self.bitmap, odd.crop((1, 0, 601, 256)))
+        self.assertEqual(odd.crop((601, 0, 608, 256)).getextrema(), (255, 255))
+
+    def test_without_numpy(self):
+        """The Pillow fallback should pack the same bytes as NumPy"""
+        expected = escpos.encode_raster(self.bitmap, print_width=500)
+        with mock.patch.object(escpos, 'np', None):
+            self.assertEqual(escpos.encode_raster(self.bitmap, print_width=500), expected)
+
+    def test_processing_paths(self):
+        """Every processing path should write a .bin that decodes to the dithered PRINTLOGO"""
+        paths = {name: os.path.join(self.temp_dir.name, f"{name}.bin")
+                 for name in ('image_processor', 'fan_out', 'thermal_format')}
+        ImageProcessor.process_image(self.source, self.format_spec, paths['image_processor'])
+        FanOutProcessor(self.source).process(self.format_spec, paths['fan_out'])
+        thermal = ThermalPrinterFormat(self.format_spec)
+        thermal.save(thermal.process(self.source), paths['thermal_format'])
+
+        for name, path in paths.items():
+            with self.subTest(path=name), open(path, 'rb') as f:
+                decoded = escpos.decode_raster(f.read())
+                self.assertEqual(decoded.size, (600, 256))
+                if name == 'image_processor':
+                    self.assertSameBits(self.bitmap, decoded)
+
+    def test_raster_next_to_bmp(self):
+        """ThermalPrinterFormat should be able to write the raster stream alongside the BMP"""
+        thermal = ThermalPrinterFormat(replace(default_formats['PRINTLOGO.bmp'], print_width=576))
+        image = thermal.process(self.source)
+        bmp_path = os.path.join(self.temp_dir.name, 'PRINTLOGO.bmp')
+        bin_path = os.path.join(self.temp_dir.name, 'PRINTLOGO.bin')
+        thermal.save(image, bmp_path)
+        thermal.save_raster(image, bin_path)
+        with Image.open(bmp_path) as bmp, open(bin_path, 'rb') as f:
+            self.assertEqual(bmp.mode, 'RGB')
+            self.assertEqual(escpos.decode_raster(f.read()).size, (576, 256))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
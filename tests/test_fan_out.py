@@ -0,0 +1,57 @@
+import unittest
+from PIL import Image, ImageChops, ImageDraw, ImageStat
+import os
+import sys
+import tempfile
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.processors.image_processor import ImageProcessor
+from src.processors.fan_out import FanOutProcessor
+from src.config import default_formats
+
+class TestFanOutProcessor(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Create a logo-like source with soft transparency"""
+        cls.source = Image.new('RGBA', (480, 360), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(cls.source)
+        draw.ellipse((60, 40, 420, 320), fill=(200, 30, 60, 180))
+        draw.rectangle((0, 0, 160, 120), fill=(10, 200, 30, 255))
+
+    def test_outputs_match_format_specs(self):
+        """Every default format should be written with its size and mode"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            outputs = FanOutProcessor(self.source).process_all(default_formats, temp_dir)
+            self.assertEqual(set(outputs), set(default_formats))
+            for format_key, format_spec in default_formats.items():
+                with Image.open(outputs[format_key]) as output_img:
+                    self.assertEqual(output_img.size, format_spec.dimensions)
+                    self.assertEqual(output_img.mode, format_spec.mode)
+
+    def test_matches_per_format_processing(self):
+        """Fan-out output should be equivalent to one process_image call per format"""
+        renderer = FanOutProcessor(self.source)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for format_key, format_spec in default_formats.items():
+                with self.subTest(format=format_key):
+                    reference_path = os.path.join(temp_dir, format_key)
+                    ImageProcessor.process_image(self.source, format_spec, reference_path)
+                    with Image.open(reference_path) as reference:
+                        diff = ImageChops.difference(renderer.render(format_spec), reference)
+                        # Resampling premultiplied data before flattening only moves edge pixels
+                        self.assertLess(max(ImageStat.Stat(diff).mean), 1.0)
+                        if format_spec.mode == 'RGBA':
+                            self.assertLessEqual(max(high for _, high in diff.getextrema()), 1)
+
+    def test_from_file(self):
+        """Building from a path should decode the source once and close the file"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_path = os.path.join(temp_dir, "source.png")
+            self.source.save(input_path)
+            renderer = FanOutProcessor.from_file(input_path)
+            self.assertEqual(renderer.source_size, (480, 360))
+            self.assertEqual(renderer.working.mode, 'RGBa')
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,113 @@
+import unittest
+from unittest import mock
+from PIL import Image, ImageChops
+import gc
+import os
+import sys
+import tempfile
+import time
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt6.QtWidgets import QApplication
+from src.config import default_formats
+from src.gui.main_window import ImageProcessorGUI
+from src.processors import thumbnails
+from src.processors.decoded_source import DecodedSource
+from src.processors.fan_out import FanOutProcessor
+from src.processors.format_previews import FormatPreviews
+from src.processors.thumbnails import thumbnail_of
+from test_resampling import create_detailed_image
+
+class TestFormatPreviews(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source_path = os.path.join(self.temp_dir.name, "logo.png")
+        create_detailed_image(1200, 800).save(self.source_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_previews_match_the_rendered_outputs(self):
+        """Previews from the reduced copy should look like the full-resolution outputs"""
+        previews = FormatPreviews(DecodedSource(self.source_path, default_formats.values()), 80)
+        with FanOutProcessor.from_file(self.source_path, formats=default_formats.values()) as renderer:
+            for format_key, format_spec in default_formats.items():
+                preview = previews.render(format_spec)
+                expected = thumbnail_of(renderer.render(format_spec), 80)
+                self.assertEqual(preview.mode, 'RGBA', format_key)
+                self.assertEqual(preview.size, expected.size, format_key)
+                extrema = ImageChops.difference(preview, expected).getextrema()
+                self.assertLessEqual(max(high for _, high in extrema), 16, format_key)
+
+    def test_previews_hold_no_full_resolution_copy(self):
+        """The preview working copy is reduced, and the decode is not kept alive by it"""
+        source = DecodedSource(self.source_path, default_formats.values())
+        previews = FormatPreviews(source, 80)
+        previews.render(default_formats['Logo.png'])
+        self.assertEqual(previews._renderer.working.size, (240, 160))
+        source.release()
+        gc.collect()
+        self.assertIsNone(previews._image())
+
+    def test_previews_are_rendered_once_per_spec(self):
+        previews = FormatPreviews(DecodedSource(self.source_path, default_formats.values()), 80)
+        spec = default_formats['Logo.png']
+        self.assertIsNone(previews.cached(spec))
+        first = previews.render(spec)
+        self.assertIs(previews.cached(spec), first)
+        self.assertIs(previews.render(spec), first)
+        self.assertEqual(previews.renders, 1)
+
+    def test_changed_file_is_rendered_again(self):
+        previews = FormatPreviews(DecodedSource(self.source_path, default_formats.values()), 80)
+        previews.render(default_formats['Logo.png'])
+        Image.new('RGBA', (300, 300), (0, 0, 255, 255)).save(self.source_path)
+        stat = os.stat(self.source_path)
+        os.utime(self.source_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        preview = previews.render(default_formats['Logo.png'])
+        self.assertEqual(preview.getpixel((40, 40)), (0, 0, 255, 255))
+        self.assertEqual(previews.renders, 2)
+
+    def test_window_strip_debounces_toggles_and_reuses_previews(self):
+        app = QApplication.instance() or QApplication([])
+        thumbnails.CACHE_DIR, cache_dir = None, thumbnails.CACHE_DIR
+        self.addCleanup(setattr, thumbnails, 'CACHE_DIR', cache_dir)
+        window = ImageProcessorGUI()
+
+        def settle(condition):
+            deadline = time.monotonic() + 30
+            while not condition() and time.monotonic() < deadline:
+                app.processEvents()
+                time.sleep(0.01)
+
+        def rendered(format_key):
+            pixmap = window.format_preview_tiles[format_key].pixmap()
+            return pixmap is not None and not pixmap.isNull()
+
+        window.process_selected_file(self.source_path)
+        settle(lambda: all(rendered(key) for key in window.format_checks))
+        self.assertTrue(window.format_preview_group.isVisibleTo(window))
+        self.assertTrue(all(rendered(key) for key in window.format_checks))
+        self.assertEqual(window.format_previews.renders, len(window.format_checks))
+        self.assertEqual(window.format_preview_tiles['PRINTLOGO.bmp'].pixmap().width(), 80)
+
+        # Count strip updates through the timer that triggers them
+        updates = []
+        with mock.patch.object(FanOutProcessor, 'render', side_effect=AssertionError("rendered again")):
+            window._format_preview_timer.timeout.connect(lambda: updates.append(time.monotonic()))
+            for _ in range(3):
+                window.format_checks['KDlogo.png'].setChecked(False)
+                window.format_checks['KDlogo.png'].setChecked(True)
+            window.format_checks['RPTlogo.bmp'].setChecked(False)
+            self.assertTrue(window._format_preview_timer.isActive())
+            settle(lambda: updates)
+        self.assertEqual(len(updates), 1)
+        self.assertFalse(window.format_preview_tiles['RPTlogo.bmp'].isVisibleTo(window))
+        self.assertTrue(window.format_preview_tiles['KDlogo.png'].isVisibleTo(window))
+        self.assertTrue(rendered('KDlogo.png'))
+        window.close()
+
+if __name__ == '__main__':
+    unittest.main()
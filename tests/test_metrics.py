@@ -0,0 +1,127 @@
+import unittest
+from PIL import Image
+import json
+import os
+import sys
+import tempfile
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import batch
+from src.core import metrics
+from src.core.output_writer import OutputWriter
+from src.processors.fan_out import FanOutProcessor
+from src.processors.image_processor import ImageProcessor
+from src.config import default_formats
+from test_resampling import create_detailed_image
+
+class TestMetrics(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.source = create_detailed_image(800, 600)
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = self.temp_dir.name
+
+    def tearDown(self):
+        metrics.disable()
+        self.temp_dir.cleanup()
+
+    def by_key(self, recorder):
+        return {(record.format, record.stage): record for record in recorder.records()}
+
+    def test_disabled_by_default(self):
+        """Without a recorder stages should cost nothing and record nothing"""
+        self.assertIsNone(metrics.recorder)
+        with metrics.output('Logo.png'), metrics.stage('resize', 10) as sample:
+            sample.bytes_written = 5
+        self.assertIsNone(metrics.recorder)
+
+    def test_every_format_and_stage_recorded(self):
+        """Each output should be broken down by stage, with bytes matching the files written"""
+        recorder = metrics.enable()
+        FanOutProcessor(self.source).process_all(default_formats, os.path.join(self.output_dir, "sync"))
+        with OutputWriter() as writer:
+            FanOutProcessor(self.source, writer=writer).process_all(default_formats,
+                                                                    os.path.join(self.output_dir, "async"))
+        records = self.by_key(recorder)
+
+        self.assertEqual(records[(metrics.SOURCE, 'decode')].calls, 2)
+        self.assertEqual(records[(metrics.SOURCE, 'decode')].pixels, 2 * 800 * 600)
+        self.assertEqual(records[('Logo.png', 'resize')].calls, 2)
+        self.assertEqual(records[('PRINTLOGO.bmp', 'composite')].pixels, 2 * 256 * 192)
+        for format_key in default_formats:
+            with self.subTest(format=format_key):
+                size = os.path.getsize(os.path.join(self.output_dir, "sync", format_key))
+                self.assertEqual(records[(format_key, 'save')].bytes_written, size)
+                self.assertEqual(records[(format_key, 'write')].bytes_written, size)
+                self.assertGreater(records[(format_key, 'encode')].wall_seconds, 0)
+        totals = list(recorder.wall_seconds_by_format().values())
+        self.assertEqual(totals, sorted(totals, reverse=True))
+
+    def test_image_processor_stages(self):
+        """The per-format processor should report plan stages under the output name"""
+        recorder = metrics.enable()
+        for format_key, format_spec in default_formats.items():
+            ImageProcessor.process_image(self.source, format_spec, os.path.join(self.output_dir, format_key))
+        records = self.by_key(recorder)
+        self.assertEqual(records[('Logo.png', 'resize')].pixels, 800 * 600)
+        self.assertEqual(records[('Logo.png', 'convert')].pixels, 300 * 300)
+        self.assertIn(('PRINTLOGO.bmp', 'render'), records)
+        self.assertIn(('RPTlogo.bmp', 'render'), records)
+        self.assertNotIn(metrics.UNLABELLED, {record.format for record in recorder.records()})
+
+    def test_allocation_peaks(self):
+        """Traced peaks should cover allocations freed before the stage ends, including nested stages"""
+        recorder = metrics.enable(trace_allocations=True)
+        with metrics.output('Logo.png'):
+            with metrics.stage('outer'):
+                block = bytearray(8 * 1024 * 1024)
+                del block
+                with metrics.stage('inner'):
+                    small = bytearray(1024 * 1024)
+                    del small
+        records = self.by_key(recorder)
+        # Small interpreter allocations come and go around the measured blocks
+        slack = 64 * 1024
+        self.assertGreater(records[('Logo.png', 'outer')].peak_alloc_bytes, 8 * 1024 * 1024 - slack)
+        self.assertGreater(records[('Logo.png', 'inner')].peak_alloc_bytes, 1024 * 1024 - slack)
+        self.assertLess(records[('Logo.png', 'inner')].peak_alloc_bytes, 2 * 1024 * 1024)
+
+    def test_exports(self):
+        """JSON lines and Prometheus text should carry every record"""
+        recorder = metrics.MetricsRecorder()
+        recorder.merge([metrics.StageMetrics('Logo.png', 'resize', 2, 0.5, 0.25, 100, 0, 0),
+                        metrics.StageMetrics('say "hi"', 'write', 1, 0.1, 0.0, 0, 42, 0)])
+        recorder.merge([metrics.StageMetrics('Logo.png', 'resize', 1, 0.5, 0.25, 50, 0, 0)])
+
+        path = os.path.join(self.output_dir, "metrics.jsonl")
+        recorder.write(path)
+        with open(path) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(lines[0], {'format': 'Logo.png', 'stage': 'resize', 'calls': 3, 'wall_seconds': 1.0,
+                                    'cpu_seconds': 0.5, 'pixels': 150, 'bytes_written': 0, 'peak_alloc_bytes': 0})
+
+        prometheus = recorder.to_prometheus()
+        self.assertIn('# TYPE logocraft_stage_wall_seconds_total counter', prometheus)
+        self.assertIn('logocraft_stage_pixels_total{format="Logo.png",stage="resize"} 150', prometheus)
+        self.assertIn('logocraft_stage_bytes_written_total{format="say \\"hi\\"",stage="write"} 42', prometheus)
+        samples = [line for line in prometheus.splitlines() if not line.startswith('#')]
+        self.assertEqual(len(samples), 6 * 2)
+
+    def test_batch_collects_worker_metrics(self):
+        """A batch run should merge the metrics of every source"""
+        input_dir = os.path.join(self.output_dir, "library")
+        os.makedirs(input_dir)
+        for name in ("a.png", "b.png"):
+            Image.new('RGBA', (400, 300), (255, 0, 0, 255)).save(os.path.join(input_dir, name))
+        summary = batch.run_batch(batch.plan_output_dirs(batch.find_images(input_dir), os.path.join(self.output_dir, "out"),
+                                                         input_dir), workers=1, collect_metrics=True)
+        self.assertIsNone(metrics.recorder)
+        records = self.by_key(summary.metrics)
+        self.assertEqual(records[(metrics.SOURCE, 'decode')].calls, 2)
+        self.assertEqual(set(summary.metrics.wall_seconds_by_format()), set(default_formats) | {metrics.SOURCE})
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,160 @@
+import unittest
+import PIL
+from PIL import Image
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.processors.image_processor import ImageProcessor
+from src.processors.fan_out import FanOutProcessor
+from src.processors import output_cache
+from src.processors.output_cache import OutputCache
+from src.core.config_manager import FormatConfig
+from src.config import default_formats
+from test_resampling import create_detailed_image
+
+FINGERPRINT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reference", "pipeline_fingerprint.json")
+
+def pipeline_fingerprint(output_dir):
+    """SHA-256 of every default output of a fixed detailed source, from both pipelines"""
+    source = create_detailed_image(3000, 2400)
+    paths = {}
+    with FanOutProcessor(source) as renderer:
+        for format_key, path in renderer.process_all(default_formats, os.path.join(output_dir, "fan_out")).items():
+            paths[f"fan_out/{format_key}"] = path
+    for format_key, format_spec in default_formats.items():
+        paths[f"process_image/{format_key}"] = os.path.join(output_dir, format_key)
+        ImageProcessor.process_image(source, format_spec, paths[f"process_image/{format_key}"])
+    digests = {}
+    for name, path in sorted(paths.items()):
+        with open(path, 'rb') as f:
+            digests[name] = hashlib.sha256(f.read()).hexdigest()
+    return digests
+
+def record_fingerprint():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        outputs = pipeline_fingerprint(temp_dir)
+    with open(FINGERPRINT_PATH, 'w') as f:
+        json.dump({'pipeline_version': output_cache.PIPELINE_VERSION, 'pillow': PIL.__version__,
+                   'outputs': outputs}, f, indent=2)
+        f.write('\n')
+
+class TestOutputCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temp_dir.name, "cache")
+        self.output_dir = os.path.join(self.temp_dir.name, "output")
+        os.makedirs(self.output_dir)
+        self.image = Image.new('RGBA', (200, 150), (255, 0, 0, 200))
+        self.logo_spec = default_formats['Logo.png']
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_process_image_hit_and_miss(self):
+        """Second render of the same source and format should come from the cache"""
+        cache = OutputCache(self.cache_dir)
+        first = os.path.join(self.output_dir, "first.png")
+        second = os.path.join(self.output_dir, "second.png")
+        ImageProcessor.process_image(self.image, self.logo_spec, first, cache=cache)
+        ImageProcessor.process_image(self.image, self.logo_spec, second, cache=cache)
+
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+        with open(first, 'rb') as a, open(second, 'rb') as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_key_covers_source_and_format(self):
+        """Changing the source or the format spec must change the key"""
+        cache = OutputCache(self.cache_dir)
+        digest = OutputCache.digest_image(self.image)
+        other_digest = OutputCache.digest_image(Image.new('RGBA', (200, 150), (0, 255, 0, 200)))
+        key = cache.key(digest, self.logo_spec)
+
+        self.assertNotEqual(key, cache.key(other_digest, self.logo_spec))
+        self.assertNotEqual(key, cache.key(digest, default_formats['Smalllogo.png']))
+        self.assertNotEqual(key, cache.key(digest, self.logo_spec, pipeline='fan_out'))
+        # OutputFormat and FormatConfig with the same fields describe the same output
+        as_config = FormatConfig(**vars(self.logo_spec))
+        self.assertEqual(key, cache.key(digest, as_config))
+
+    def test_lru_eviction(self):
+        """Least recently used entries are evicted once the size cap is exceeded"""
+        artifact = os.path.join(self.output_dir, "artifact.bin")
+        with open(artifact, 'wb') as f:
+            f.write(b'x' * 1000)
+        cache = OutputCache(self.cache_dir, max_bytes=2500)
+        for key in ('aa1', 'bb2'):
+            cache.store(key, artifact)
+        # Make 'aa1' the most recently used entry
+        time.sleep(0.01)
+        self.assertTrue(cache.fetch('aa1', os.path.join(self.output_dir, "restored.bin")))
+        cache.store('cc3', artifact)
+
+        self.assertEqual(cache.evictions, 1)
+        self.assertLessEqual(cache.size, 2500)
+        self.assertTrue(cache.fetch('aa1', artifact))
+        self.assertFalse(cache.fetch('bb2', artifact))
+        self.assertTrue(cache.fetch('cc3', artifact))
+
+    def test_hardlink_hits(self):
+        """Hardlink mode should place the cached artifact without copying"""
+        cache = OutputCache(self.cache_dir, hardlink=True)
+        first = os.path.join(self.output_dir, "first.png")
+        second = os.path.join(self.output_dir, "second.png")
+        ImageProcessor.process_image(self.image, self.logo_spec, first, cache=cache)
+        ImageProcessor.process_image(self.image, self.logo_spec, second, cache=cache)
+        self.assertEqual(cache.hits, 1)
+        with Image.open(second) as output_img:
+            self.assertEqual(output_img.size, self.logo_spec.dimensions)
+
+    @unittest.skipIf(os.name == 'nt', "POSIX permissions")
+    def test_hits_follow_the_umask(self):
+        """Outputs served from the cache should get the same permissions as rendered ones"""
+        self.addCleanup(os.umask, os.umask(0o022))
+        for hardlink in (False, True):
+            with self.subTest(hardlink=hardlink):
+                cache = OutputCache(os.path.join(self.cache_dir, str(hardlink)), hardlink=hardlink)
+                for name in ("rendered.png", "cached.png"):
+                    output_path = os.path.join(self.output_dir, f"{hardlink}-{name}")
+                    ImageProcessor.process_image(self.image, self.logo_spec, output_path, cache=cache)
+                    self.assertEqual(os.stat(output_path).st_mode & 0o777, 0o644, name)
+                self.assertEqual(cache.hits, 1)
+
+    def test_fan_out_skips_decode_when_cached(self):
+        """A fully cached source file should never be decoded"""
+        source_path = os.path.join(self.temp_dir.name, "source.png")
+        self.image.save(source_path)
+        cache = OutputCache(self.cache_dir)
+        with FanOutProcessor.from_file(source_path, cache) as renderer:
+            renderer.process_all(default_formats, self.output_dir)
+        self.assertEqual(cache.misses, len(default_formats))
+
+        with FanOutProcessor.from_file(source_path, cache) as renderer:
+            renderer.process_all(default_formats, self.output_dir)
+        self.assertEqual(cache.hits, len(default_formats))
+        self.assertIsNone(renderer._working)
+
+    def test_pipeline_version_tracks_output_bytes(self):
+        """Outputs that differ from the recorded ones need a new PIPELINE_VERSION"""
+        with open(FINGERPRINT_PATH) as f:
+            recorded = json.load(f)
+        if recorded['pillow'] != PIL.__version__:
+            self.skipTest(f"outputs were recorded with Pillow {recorded['pillow']}")
+        update = "then record the outputs with: python tests/test_output_cache.py --record-fingerprint"
+        if pipeline_fingerprint(self.output_dir) != recorded['outputs']:
+            self.assertNotEqual(output_cache.PIPELINE_VERSION, recorded['pipeline_version'],
+                                f"Output bytes changed: bump PIPELINE_VERSION, {update}")
+        self.assertEqual(output_cache.PIPELINE_VERSION, recorded['pipeline_version'],
+                         f"PIPELINE_VERSION changed: {update}")
+
+if __name__ == '__main__':
+    if '--record-fingerprint' in sys.argv[1:]:
+        record_fingerprint()
+    else:
+        unittest.main(verbosity=2)
@@ -0,0 +1,139 @@
+import unittest
+from unittest import mock
+from PIL import Image
+import os
+import sys
+import tempfile
+import threading
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.core import output_writer
+from src.core.image_format import ImageFormat, ThermalPrinterFormat
+from src.core.output_writer import OutputWriter, atomic_write
+from src.processors.fan_out import FanOutProcessor
+from src.processors.image_processor import ImageProcessor
+from src.processors.output_cache import OutputCache
+from src.config import default_formats
+from test_resampling import create_detailed_image
+
+class TestOutputWriter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.source = create_detailed_image(800, 600)
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_atomic_write(self):
+        """A failed rename should leave the previous file intact and no temporary files"""
+        path = os.path.join(self.output_dir, "Logo.png")
+        atomic_write(path, b"old")
+        with mock.patch.object(output_writer.os, 'replace', side_effect=OSError("share went away")):
+            with self.assertRaises(OSError):
+                atomic_write(path, b"new")
+        self.assertEqual(self.read(path), b"old")
+        self.assertEqual(os.listdir(self.output_dir), ["Logo.png"])
+        atomic_write(path, b"new")
+        self.assertEqual(self.read(path), b"new")
+
+    @unittest.skipIf(os.name == 'nt', "POSIX permissions")
+    def test_outputs_follow_the_umask(self):
+        """Outputs should get the permissions Image.save would give them, not 0600"""
+        self.addCleanup(os.umask, os.umask(0o022))
+        path = os.path.join(self.output_dir, "Logo.png")
+        atomic_write(path, b"new")
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o644)
+        # Overwriting keeps the mode of the file being replaced
+        os.chmod(path, 0o664)
+        atomic_write(path, b"newer")
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o664)
+
+        os.umask(0o027)
+        with OutputWriter() as writer:
+            writer.save(self.source, os.path.join(self.output_dir, "Smalllogo.png"), 'PNG')
+        self.assertEqual(os.stat(os.path.join(self.output_dir, "Smalllogo.png")).st_mode & 0o777, 0o640)
+
+    def test_outputs_match_synchronous_saves(self):
+        """Background writes should produce the same bytes as saving in place"""
+        sync_dir = os.path.join(self.output_dir, "sync")
+        async_dir = os.path.join(self.output_dir, "async")
+        FanOutProcessor(self.source).process_all(default_formats, sync_dir)
+        with OutputWriter(max_workers=2) as writer:
+            FanOutProcessor(self.source, writer=writer).process_all(default_formats, async_dir)
+            os.makedirs(os.path.join(async_dir, "processor"))
+            for format_key, format_spec in default_formats.items():
+                ImageProcessor.process_image(self.source, format_spec,
+                                             os.path.join(async_dir, "processor", format_key), writer=writer)
+
+        for format_key in default_formats:
+            with self.subTest(format=format_key):
+                expected = self.read(os.path.join(sync_dir, format_key))
+                self.assertEqual(self.read(os.path.join(async_dir, format_key)), expected)
+        self.assertEqual(sorted(os.listdir(async_dir)), sorted(list(default_formats) + ["processor"]))
+
+    def test_image_format_classes(self):
+        """ImageFormat and ThermalPrinterFormat should save through the writer"""
+        with OutputWriter() as writer:
+            for format_key, format_class in (('Logo.png', ImageFormat), ('PRINTLOGO.bmp', ThermalPrinterFormat)):
+                handler = format_class(default_formats[format_key], writer)
+                handler.save(handler.process(self.source), os.path.join(self.output_dir, format_key))
+        with Image.open(os.path.join(self.output_dir, 'PRINTLOGO.bmp')) as printlogo:
+            self.assertEqual(printlogo.size, (600, 256))
+        with Image.open(os.path.join(self.output_dir, 'Logo.png')) as logo:
+            self.assertEqual(logo.size, (300, 300))
+
+    def test_pending_writes_are_bounded(self):
+        """Encoding should block once max_pending outputs are waiting to be written"""
+        release = threading.Event()
+        started = threading.Event()
+
+        def slow_write(path, data, fsync=False):
+            started.set()
+            release.wait(5)
+
+        writer = OutputWriter(max_workers=1, max_pending=2)
+        with mock.patch.object(output_writer, 'atomic_write', slow_write):
+            writer.write(b"1", "first")
+            writer.write(b"2", "second")
+            third = threading.Thread(target=writer.write, args=(b"3", "third"))
+            third.start()
+            started.wait(5)
+            third.join(0.2)
+            self.assertTrue(third.is_alive())
+            release.set()
+            third.join(5)
+            self.assertFalse(third.is_alive())
+            writer.close()
+
+    def test_flush_reports_errors(self):
+        """A failed background write should surface on flush"""
+        writer = OutputWriter()
+        writer.write(b"data", os.path.join(self.output_dir, "missing", "Logo.png"))
+        with self.assertRaises(FileNotFoundError):
+            writer.flush()
+        writer.close()
+
+    def test_cache_stores_encoded_bytes(self):
+        """Cache misses should store the in-memory encoding without waiting for the write"""
+        cache = OutputCache(os.path.join(self.output_dir, "cache"))
+        output_path = os.path.join(self.output_dir, "Logo.png")
+        with OutputWriter() as writer:
+            ImageProcessor.process_image(self.source, default_formats['Logo.png'], output_path,
+                                         cache=cache, writer=writer)
+        self.assertEqual(cache.misses, 1)
+        os.unlink(output_path)
+        ImageProcessor.process_image(self.source, default_formats['Logo.png'], output_path, cache=cache)
+        self.assertEqual(cache.hits, 1)
+        self.assertTrue(os.path.exists(output_path))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,82 @@
+import unittest
+from PIL import Image, ImageChops
+import os
+import sys
+from dataclasses import replace
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.core.compositing import composite_over_color
+from src.core.image_format import ImageFormat, OutputFormat
+from src.core.pipeline import compile_plan
+from src.core.quantization import quantize
+from src.core.resampling import resize_lanczos
+from src.processors.image_processor import ImageProcessor
+from src.config import default_formats
+from test_resampling import create_detailed_image
+
+def unplanned(image, format_spec):
+    """The pipeline as it ran before plans: every step, every time"""
+    processed = resize_lanczos(image, format_spec.dimensions).convert(format_spec.mode)
+    if format_spec.background and processed.mode == 'RGBA':
+        processed = composite_over_color(processed, format_spec.background, format_spec.dimensions, format_spec.mode)
+    if format_spec.colors:
+        processed = quantize(processed, format_spec.colors, format_spec.quantizer)
+    return processed
+
+class TestPipeline(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rgba = create_detailed_image(900, 700)
+        cls.sources = {mode: rgba.convert(mode) for mode in ('RGBA', 'RGB', 'LA', 'L', 'P')}
+        cls.formats = {
+            'plain': default_formats['Logo.png'],
+            'background': replace(default_formats['Logo.png'], background=(20, 40, 60)),
+            'palette': replace(default_formats['KDlogo.png'], colors=32),
+            'background_palette': replace(default_formats['Logo.png'], background=(255, 255, 255), colors=16),
+            'rgb_background': OutputFormat((155, 110), 'RGB', 'PNG', background=(255, 255, 255)),
+            'grayscale': OutputFormat((120, 120), 'L', 'PNG'),
+        }
+
+    def test_plans_skip_identity_stages(self):
+        """Only stages that can change the output should be compiled in"""
+        expected = {
+            'plain': ('resize', 'convert'),
+            'background': ('resize', 'composite'),
+            'palette': ('resize', 'convert', 'quantize'),
+            'background_palette': ('resize', 'composite', 'quantize'),
+            # Without an alpha channel in the output the background can never show
+            'rgb_background': ('resize', 'convert'),
+            'grayscale': ('resize', 'convert'),
+        }
+        for name, stage_names in expected.items():
+            with self.subTest(format=name):
+                self.assertEqual(compile_plan(self.formats[name]).stage_names, stage_names)
+        self.assertEqual(compile_plan(self.formats['plain'], resize=False).stage_names, ('convert',))
+
+    def test_matches_unplanned_pipeline(self):
+        """Plans should produce exactly the pixels of the step-by-step pipeline"""
+        for source_mode, source in self.sources.items():
+            for name, format_spec in self.formats.items():
+                expected = unplanned(source, format_spec)
+                for path, result in [
+                    ('image_processor', ImageProcessor._process_standard_image(source, format_spec)),
+                    ('image_format', ImageFormat(format_spec).process(source)),
+                ]:
+                    with self.subTest(source=source_mode, format=name, path=path):
+                        self.assertEqual(result.mode, expected.mode)
+                        self.assertEqual(result.size, expected.size)
+                        if expected.mode == 'P':
+                            self.assertEqual(result.getpalette(), expected.getpalette())
+                            self.assertEqual(result.tobytes(), expected.tobytes())
+                        else:
+                            self.assertIsNone(ImageChops.difference(result, expected).getbbox())
+
+    def test_no_copies_when_nothing_changes(self):
+        """An image already at the output size and mode should pass through untouched"""
+        resized = resize_lanczos(self.sources['RGBA'], (300, 300))
+        self.assertIs(ImageProcessor._finish_standard_image(resized, default_formats['Logo.png']), resized)
+        self.assertIs(ImageFormat(default_formats['Logo.png']).process(resized), resized)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
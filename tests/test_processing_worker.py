@@ -0,0 +1,107 @@
+import unittest
+from unittest import mock
+from PIL import Image
+import os
+import sys
+import tempfile
+import time
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt6.QtWidgets import QApplication
+from src.config import default_formats
+from src.gui.main_window import ImageProcessorGUI
+from src.gui.processing_worker import ProcessingJob
+from src.processors import thumbnails
+from src.processors.fan_out import FanOutProcessor
+from test_resampling import create_detailed_image
+
+class TestProcessingJob(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.temp_dir.name, "source.png")
+        create_detailed_image(800, 600).save(self.source)
+        self.output_paths = {key: os.path.join(self.temp_dir.name, key) for key in default_formats}
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def run_job(self, job):
+        """Run the job synchronously and collect its signals"""
+        events = {'progress': [], 'finished': [], 'format_finished': [], 'format_failed': [], 'failed': []}
+        for name, received in events.items():
+            getattr(job.signals, name).connect(lambda *args, received=received: received.append(args))
+        job.run()
+        return events
+
+    def test_renders_formats_in_parallel_like_fan_out(self):
+        job = ProcessingJob(self.source, default_formats, self.output_paths, render_threads=3)
+        events = self.run_job(job)
+        self.assertEqual(events['finished'], [(False,)])
+        self.assertEqual(sorted(key for key, _ in events['format_finished']), sorted(default_formats))
+        self.assertEqual([done for done, _ in events['progress']], list(range(1, len(default_formats) + 1)))
+        self.assertEqual(events['format_failed'], [])
+
+        # Threads share intermediates, so the outputs match rendering the formats one by one
+        with FanOutProcessor.from_file(self.source, formats=default_formats.values()) as renderer:
+            renderer.plan(default_formats.values())
+            for key, spec in default_formats.items():
+                with Image.open(self.output_paths[key]) as output:
+                    self.assertEqual(output.tobytes(), renderer.render(spec).tobytes(), key)
+
+    def test_cancel_skips_formats_not_started(self):
+        job = ProcessingJob(self.source, default_formats, self.output_paths, render_threads=1)
+        job.signals.format_finished.connect(lambda *args: job.cancel())
+        events = self.run_job(job)
+        self.assertEqual(events['finished'], [(True,)])
+        # The single render thread may already have picked up the next format when the first one is reported
+        self.assertLessEqual(len(events['format_finished']), 2)
+        self.assertEqual(sum(os.path.exists(path) for path in self.output_paths.values()),
+                         len(events['format_finished']))
+
+    def test_errors_are_reported(self):
+        missing = ProcessingJob(os.path.join(self.temp_dir.name, "missing.png"), default_formats, self.output_paths)
+        events = self.run_job(missing)
+        self.assertEqual(len(events['failed']), 1)
+        self.assertEqual(events['finished'], [(False,)])
+
+        paths = dict(self.output_paths, **{'Logo.png': os.path.join(self.temp_dir.name, "missing", "Logo.png")})
+        events = self.run_job(ProcessingJob(self.source, default_formats, paths))
+        self.assertEqual([key for key, _ in events['format_failed']], ['Logo.png'])
+        self.assertEqual(len(events['format_finished']), len(default_formats) - 1)
+
+    def test_planning_errors_still_finish(self):
+        with mock.patch.object(FanOutProcessor, 'plan', side_effect=MemoryError("plan too large")):
+            events = self.run_job(ProcessingJob(self.source, default_formats, self.output_paths))
+        self.assertEqual(events['failed'], [("plan too large",)])
+        self.assertEqual(events['finished'], [(False,)])
+        self.assertEqual(events['format_finished'], [])
+
+    def test_window_stays_responsive_while_processing(self):
+        thumbnails.CACHE_DIR, cache_dir = None, thumbnails.CACHE_DIR
+        self.addCleanup(setattr, thumbnails, 'CACHE_DIR', cache_dir)
+        window = ImageProcessorGUI()
+        window.process_selected_file(self.source)
+        window.dir_path.setText(self.temp_dir.name)
+        window.process_images()
+        self.assertIsNotNone(window._job)
+        self.assertEqual(window.process_button.text(), "Cancel")
+        deadline = time.monotonic() + 30
+        while window._job is not None and time.monotonic() < deadline:
+            # The GUI thread keeps handling events while the job runs
+            self.app.processEvents()
+            time.sleep(0.01)
+        self.assertIsNone(window._job)
+        self.assertEqual(window.statusBar().currentMessage(), "Processing complete!")
+        self.assertEqual(window.process_button.text(), "Process Image")
+        for key in default_formats:
+            self.assertTrue(os.path.exists(os.path.join(self.temp_dir.name, key)), key)
+        window.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+from PIL import Image
+import logging
+import os
+import pstats
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+# Add project root to path to import from src
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+from src import batch
+from src.core import profiling
+from src.core.error_handler import ConfigurationError, handle_errors, log_operation
+
+logger = logging.getLogger(__name__)
+
+@log_operation(logger)
+def render(size):
+    return Image.new('RGB', (size, size), (255, 0, 0)).resize((size // 2, size // 2))
+
+@log_operation(logger)
+def render_twice(size):
+    return render(size), render(size)
+
+class Window:
+    @handle_errors(logger)
+    def update_preview(self):
+        return render(64)
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.profile_dir = self.temp_dir.name
+
+    def tearDown(self):
+        profiling.disable()
+        self.temp_dir.cleanup()
+
+    def files(self, suffix):
+        return sorted(name for name in os.listdir(self.profile_dir) if name.endswith(suffix))
+
+    def test_disabled_by_default(self):
+        """Without a profiler decorated calls should write nothing"""
+        self.assertIsNone(profiling.profiler)
+        self.assertEqual(render(32).size, (16, 16))
+        self.assertEqual(os.listdir(self.profile_dir), [])
+
+    def test_every_nth_call_is_profiled(self):
+        """Sampled calls should write a loadable profile and memory snapshot"""
+        profiler = profiling.enable(self.profile_dir, every=2)
+        for _ in range(4):
+            self.assertEqual(render(32).size, (16, 16))
+        pid = os.getpid()
+        self.assertEqual(self.files('.pstats'), [f'render-{pid}-00002.pstats', f'render-{pid}-00004.pstats'])
+        self.assertEqual(len(self.files('.tracemalloc')), 2)
+        self.assertEqual(profiler.profiled, [os.path.join(self.profile_dir, name) for name in self.files('.pstats')])
+        self.assertFalse(tracemalloc.is_tracing())
+
+        stats = pstats.Stats(profiler.profiled[0]).stats
+        self.assertTrue(any(function[2] == 'resize' for function in stats))
+        tracemalloc.Snapshot.load(os.path.join(self.profile_dir, self.files('.tracemalloc')[0]))
+
+    def test_nested_calls_are_profiled_once(self):
+        """Only the outermost decorated call should be profiled"""
+        profiling.enable(self.profile_dir, trace_memory=False)
+        render_twice(32)
+        self.assertEqual(self.files('.pstats'), [f'render_twice-{os.getpid()}-00001.pstats'])
+        self.assertEqual(self.files('.tracemalloc'), [])
+
+    def test_handle_errors_entry_points(self):
+        """Methods wrapped by handle_errors should be profiled by qualified name"""
+        profiling.enable(self.profile_dir, trace_memory=False)
+        self.assertEqual(Window().update_preview().size, (32, 32))
+        self.assertEqual(self.files('.pstats'), [f'Window.update_preview-{os.getpid()}-00001.pstats'])
+
+    def test_invalid_interval(self):
+        with self.assertRaises(ConfigurationError):
+            profiling.enable(self.profile_dir, every=0)
+
+    def test_environment(self):
+        """The variables apply on the first decorated call; a bad interval is ignored, not raised"""
+        script = (f"import sys; sys.path.insert(0, {PROJECT_ROOT!r})\n"
+                  "from src.core.error_handler import log_operation\n"
+                  "from src.core import profiling\n"
+                  "print(profiling.profiler)\n"
+                  "log_operation()(sorted)([2, 1])\n"
+                  "print(profiling.profiler.every)")
+        for every, expected in [('3', '3'), ('0', '1'), ('x', '1')]:
+            with self.subTest(every=every):
+                env = dict(os.environ, LOGOCRAFT_PROFILE_DIR=self.profile_dir, LOGOCRAFT_PROFILE_EVERY=every)
+                result = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True)
+                self.assertEqual(result.returncode, 0, result.stderr)
+                self.assertEqual(result.stdout.split(), ['None', expected])
+                self.assertEqual('Ignoring LOGOCRAFT_PROFILE_EVERY' in result.stderr, every != expected)
+
+    def test_summary(self):
+        """The summary should rank functions by own time across every profile"""
+        profiling.enable(self.profile_dir, trace_memory=False)
+        render(256)
+        render(256)
+        hot = profiling.hot_functions(self.profile_dir, top=5)
+        self.assertEqual(len(hot), 5)
+        self.assertEqual([entry[2] for entry in hot], sorted((entry[2] for entry in hot), reverse=True))
+        summary = profiling.write_summary(self.profile_dir, top=5)
+        self.assertTrue(summary.startswith("Top 5 functions by own time across 2 profiled calls"))
+        with open(os.path.join(self.profile_dir, profiling.SUMMARY_FILE)) as f:
+            self.assertEqual(f.read(), summary)
+
+    def test_batch_profiles_sources(self):
+        """--profile should profile process_file and print the summary"""
+        input_dir = os.path.join(self.profile_dir, 'library')
+        output_dir = os.path.join(self.profile_dir, 'output')
+        profile_dir = os.path.join(self.profile_dir, 'profiles')
+        os.makedirs(input_dir)
+        for index in range(3):
+            Image.new('RGBA', (200, 150), (0, 0, 255, 255)).save(os.path.join(input_dir, f'logo{index}.png'))
+        status = batch.main([input_dir, '-o', output_dir, '--workers', '1',
+                             '--profile', profile_dir, '--profile-every', '2', '--profile-top', '5'])
+        self.assertEqual(status, 0)
+        self.assertIsNone(profiling.profiler)
+        profiles = sorted(name for name in os.listdir(profile_dir) if name.endswith('.pstats'))
+        self.assertEqual(profiles, [f'process_file-{os.getpid()}-00002.pstats'])
+        self.assertIn(profiling.SUMMARY_FILE, os.listdir(profile_dir))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+from unittest import mock
+from PIL import Image, ImageChops, ImageStat
+import io
+import os
+import sys
+from dataclasses import replace
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.core import quantization
+from src.core.error_handler import ConfigurationError
+from src.core.image_format import ImageFormat
+from src.processors.image_processor import ImageProcessor
+from src.processors.fan_out import FanOutProcessor
+from src.config import default_formats
+from test_resampling import create_detailed_image
+
+def mean_error(original, quantized):
+    mode = 'RGBA' if original.mode == 'RGBA' else 'RGB'
+    diff = ImageChops.difference(original.convert(mode), quantized.convert(mode))
+    return sum(ImageStat.Stat(diff).mean) / len(mode)
+
+class TestQuantization(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.source = create_detailed_image(1200, 900)
+        cls.photo = Image.radial_gradient('L').resize((1200, 900)).convert('RGB')
+        cls.photo = Image.merge('RGB', [cls.photo.getchannel(0), cls.photo.getchannel(0).rotate(90),
+                                        Image.linear_gradient('L').resize((1200, 900))])
+
+    def test_methods(self):
+        """Every quantizer should be deterministic and about as close as the adaptive convert"""
+        for image in (self.source, self.photo):
+            legacy_error = mean_error(image, image.convert('P', palette=Image.ADAPTIVE, colors=32))
+            for method in quantization.QUANTIZERS:
+                with self.subTest(method=method, mode=image.mode):
+                    result = quantization.quantize(image, 32, method)
+                    self.assertEqual(result.mode, 'P')
+                    self.assertLessEqual(len(result.getcolors(256)), 32)
+                    self.assertLess(mean_error(image, result), legacy_error * 1.1)
+                    self.assertEqual(result.tobytes(), quantization.quantize(image, 32, method).tobytes())
+
+    def test_kmeans_refines_median_cut(self):
+        """K-means starts from the median-cut palette and should not make it worse"""
+        median_cut = quantization.quantize(self.photo, 16, 'median-cut')
+        kmeans = quantization.quantize(self.photo, 16, 'kmeans')
+        self.assertLessEqual(mean_error(self.photo, kmeans), mean_error(self.photo, median_cut))
+
+    def test_small_images_match_adaptive_convert(self):
+        """The default quantizer keeps the previous output for output-sized images"""
+        for size in ((300, 300), (600, 256), (1000, 1000)):
+            with self.subTest(size=size), mock.patch.object(quantization, 'build_palette') as build_palette:
+                small = self.source.resize(size)
+                expected = small.convert('P', palette=Image.ADAPTIVE, colors=64)
+                self.assertEqual(quantization.quantize(small, 64).tobytes(), expected.tobytes())
+                build_palette.assert_not_called()
+
+    def test_large_images_use_a_sampled_palette(self):
+        """RGB images over DIRECT_PIXELS should only be mapped onto a palette built from a sample"""
+        large = self.photo.resize((1280, 960))
+        with mock.patch.object(quantization, 'build_palette', wraps=quantization.build_palette) as build_palette:
+            result = quantization.quantize(large, 64)
+        build_palette.assert_called_once_with(large, 64, 'median-cut')
+        self.assertEqual(result.tobytes(),
+                         quantization.apply_palette(large, quantization.build_palette(large, 64)).tobytes())
+        adaptive = large.convert('P', palette=Image.ADAPTIVE, colors=64)
+        self.assertLess(mean_error(large, result), mean_error(large, adaptive) * 1.1)
+
+    def test_shared_palette_keeps_alpha(self):
+        """Mapping onto an RGBA palette should keep transparency through a PNG round trip"""
+        image = self.source.copy()
+        image.paste((0, 0, 0, 0), (0, 0, 50, 50))
+        palette = quantization.build_palette(image, 32)
+        self.assertEqual(palette.mode, 'RGBA')
+        self.assertLessEqual(len(palette), 32)
+
+        output = io.BytesIO()
+        quantization.apply_palette(image.resize((300, 225)), palette).save(output, 'PNG')
+        with Image.open(output) as saved:
+            rgba = saved.convert('RGBA')
+            self.assertEqual(rgba.getpixel((0, 0))[3], 0)
+            self.assertEqual(rgba.getpixel((150, 112))[3], image.getpixel((600, 450))[3])
+
+    def test_fan_out_reuses_palette(self):
+        """Every output size of one source should be mapped onto the same palette"""
+        renderer = FanOutProcessor(self.source)
+        for format_key in ('Logo.png', 'Smalllogo.png', 'KDlogo.png'):
+            renderer.render(replace(default_formats[format_key], colors=32))
+        self.assertEqual(len(renderer._palettes), 1)
+        large = renderer.render(replace(default_formats['Logo.png'], colors=32))
+        small = renderer.render(replace(default_formats['Smalllogo.png'], colors=32))
+        self.assertEqual(large.getpalette('RGBA'), small.getpalette('RGBA'))
+
+    def test_processing_paths(self):
+        """ImageProcessor and ImageFormat should honour the quantizer setting"""
+        format_spec = replace(default_formats['Logo.png'], colors=16, quantizer='octree')
+        expected = self.source.resize((300, 300), Image.Resampling.LANCZOS).quantize(16, Image.Quantize.FASTOCTREE)
+        for name, result in [
+            ('image_processor', ImageProcessor._process_standard_image(self.source, format_spec)),
+            ('image_format', ImageFormat(format_spec).process(self.source)),
+        ]:
+            with self.subTest(path=name):
+                self.assertEqual(result.mode, 'P')
+                self.assertEqual(result.getpalette('RGBA'), expected.getpalette('RGBA'))
+
+    def test_unknown_quantizer(self):
+        """An unknown quantizer should raise a configuration error"""
+        with self.assertRaises(ConfigurationError):
+            quantization.quantize(self.source, 16, 'neuquant')
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,90 @@
+import unittest
+from PIL import Image
+import os
+import sys
+import tempfile
+import time
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt6.QtWidgets import QApplication
+from src import batch
+from src.config import default_formats
+from src.gui.main_window import ImageProcessorGUI
+from src.gui.processing_worker import QueueJob, throughput
+from src.processors import thumbnails
+
+class TestQueue(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.temp_dir.name, "input")
+        self.output_dir = os.path.join(self.temp_dir.name, "output")
+        os.makedirs(os.path.join(self.input_dir, "nested"))
+        self.sources = []
+        for index, name in enumerate(["a.png", "b.png", os.path.join("nested", "c.png")]):
+            path = os.path.join(self.input_dir, name)
+            Image.new('RGBA', (120 + index, 90), (255, 0, 0, 255)).save(path)
+            self.sources.append(path)
+        thumbnails.CACHE_DIR, cache_dir = None, thumbnails.CACHE_DIR
+        self.addCleanup(setattr, thumbnails, 'CACHE_DIR', cache_dir)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_throughput(self):
+        self.assertEqual(throughput(0, 10, 5.0), (0.0, None))
+        self.assertEqual(throughput(4, 10, 2.0), (2.0, 3.0))
+        self.assertEqual(throughput(10, 10, 5.0), (2.0, 0.0))
+
+    def test_queue_job_renders_every_file_into_its_own_folder(self):
+        plan = batch.plan_output_dirs(self.sources, self.output_dir)
+        job = QueueJob(plan, default_formats, workers=2)
+        finished, progress, done = [], [], []
+        job.signals.file_finished.connect(lambda source, outputs, error: finished.append((source, outputs, error)))
+        job.signals.progress.connect(lambda *args: progress.append(args))
+        job.signals.finished.connect(done.append)
+        job.run()
+
+        self.assertEqual(done, [False])
+        self.assertEqual(sorted(finished), sorted((source, len(default_formats), '') for source in self.sources))
+        self.assertEqual([args[:2] for args in progress], [(1, 3), (2, 3), (3, 3)])
+        self.assertEqual(progress[-1][3], 0.0)
+        for source, output_dir in plan.items():
+            for format_key in default_formats:
+                self.assertTrue(os.path.exists(os.path.join(output_dir, format_key)), (source, format_key))
+
+    def test_window_queues_files_and_folders(self):
+        app = QApplication.instance() or QApplication([])
+        window = ImageProcessorGUI()
+        window.dir_path.setText(self.output_dir)
+        unsupported = os.path.join(self.temp_dir.name, "notes.txt")
+        open(unsupported, 'w').close()
+
+        window.add_files([self.sources[0]])
+        self.assertEqual(window.queue, [])
+        self.assertEqual(window.current_file, self.sources[0])
+
+        window.add_files([os.path.join(self.input_dir, "nested"), self.sources[1], unsupported])
+        self.assertEqual(window.queue, [self.sources[0], self.sources[2], self.sources[1]])
+        self.assertEqual(window.queue_list.count(), 3)
+        self.assertEqual(window.process_button.text(), "Process 3 Images")
+
+        window.process_images()
+        deadline = time.monotonic() + 120
+        while window._job is not None and time.monotonic() < deadline:
+            app.processEvents()
+            time.sleep(0.01)
+        self.assertEqual(window.statusBar().currentMessage(), "Processed 3 images (0 failed)")
+        self.assertEqual(window.process_button.text(), "Process 3 Images")
+        for row in range(3):
+            self.assertIn(f"done ({len(default_formats)} outputs)", window.queue_list.item(row).text())
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, "nested", "c", "Logo.png")))
+
+        window.clear_queue()
+        self.assertEqual(window.queue, [])
+        self.assertEqual(window.process_button.text(), "Process Image")
+        window.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+from PIL import Image, ImageChops, ImageDraw, ImageStat
+import os
+import sys
+import tempfile
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.core import resampling
+from src.core.image_format import ImageFormat, ThermalPrinterFormat
+from src.processors.image_processor import ImageProcessor
+from src.processors.fan_out import FanOutProcessor
+from src.config import default_formats
+
+def create_detailed_image(width, height):
+    """Gradient with thin diagonal lines and a translucent shape, hard to downscale"""
+    img = Image.radial_gradient('L').resize((width, height)).convert('RGBA')
+    draw = ImageDraw.Draw(img)
+    for x in range(0, width, max(1, width // 40)):
+        draw.line((x, 0, width - x, height), fill=(200, 20, 40, 255), width=max(1, width // 300))
+    draw.ellipse((width // 4, height // 4, 3 * width // 4, 3 * height // 4), fill=(20, 90, 200, 160))
+    return img
+
+class TestPrescaleQuality(unittest.TestCase):
+    """Quality guard: pre-scaled output must stay equivalent to a direct LANCZOS resize"""
+    max_mean_error = 1.0
+    max_pixel_error = 16
+
+    @classmethod
+    def setUpClass(cls):
+        cls.source = create_detailed_image(2400, 1800)
+        cls.temp_dir = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def setUp(self):
+        self.original_gap = resampling.REDUCING_GAP
+
+    def tearDown(self):
+        resampling.REDUCING_GAP = self.original_gap
+
+    def render(self, render_func, reducing_gap):
+        resampling.REDUCING_GAP = reducing_gap
+        output = render_func()
+        return output.convert('RGBA' if output.mode == 'RGBA' else 'RGB')
+
+    def assertEquivalent(self, render_func, name):
+        exact = self.render(render_func, None)
+        prescaled = self.render(render_func, 3.0)
+        self.assertEqual(exact.size, prescaled.size, name)
+        diff = ImageChops.difference(exact, prescaled)
+        self.assertLess(max(ImageStat.Stat(diff).mean), self.max_mean_error, name)
+        self.assertLessEqual(max(high for _, high in diff.getextrema()), self.max_pixel_error, name)
+
+    def test_image_processor_outputs(self):
+        """Every ImageProcessor output should match the unreduced result"""
+        for format_key, format_spec in default_formats.items():
+            with self.subTest(format=format_key):
+                output_path = os.path.join(self.temp_dir.name, format_key)
+
+                def render():
+                    ImageProcessor.process_image(self.source, format_spec, output_path)
+                    with Image.open(output_path) as output_img:
+                        return output_img.copy()
+                self.assertEquivalent(render, format_key)
+
+    def test_fan_out_outputs(self):
+        """Shared reductions in the fan-out renderer should match the unreduced result"""
+        for format_key, format_spec in default_formats.items():
+            with self.subTest(format=format_key):
+                self.assertEquivalent(lambda: FanOutProcessor(self.source).render(format_spec), format_key)
+
+    def test_image_format_classes(self):
+        """ImageFormat and ThermalPrinterFormat should pre-scale the same way"""
+        self.assertEquivalent(lambda: ImageFormat(default_formats['Logo.png']).process(self.source), 'ImageFormat')
+        self.assertEquivalent(
+            lambda: ThermalPrinterFormat(default_formats['PRINTLOGO.bmp']).process(self.source), 'ThermalPrinterFormat'
+        )
+
+    def test_reduction_keeps_gap(self):
+        """Reduction should stop at roughly REDUCING_GAP times the target"""
+        reduced, box = resampling.reduce_for_target(self.source, (155, 110), 3.0)
+        self.assertGreaterEqual(box[2] - box[0], 155 * 3)
+        self.assertGreaterEqual(box[3] - box[1], 110 * 3)
+        self.assertLess(reduced.width, self.source.width)
+        # Small sources are left alone
+        small = Image.new('RGB', (400, 300))
+        self.assertIs(resampling.reduce_for_target(small, (300, 300), 3.0)[0], small)
+
+    def test_jpeg_draft_decoding(self):
+        """JPEG sources should decode at reduced scale without visible quality loss"""
+        jpeg_path = os.path.join(self.temp_dir.name, "source.jpg")
+        self.source.convert('RGB').save(jpeg_path, quality=92)
+
+        drafted = ImageProcessor.load_image(jpeg_path, default_formats.values())
+        self.assertLess(drafted.width, 2400)
+        self.assertGreaterEqual(drafted.width, 300 * 3)
+
+        for format_key in ('Logo.png', 'PRINTLOGO.bmp'):
+            format_spec = default_formats[format_key]
+            with self.subTest(format=format_key), Image.open(jpeg_path) as full:
+                exact = ImageProcessor.create_printlogo_image(full) if format_spec.is_thermal_printer \
+                    else ImageProcessor._process_standard_image(full, format_spec)
+                fast = ImageProcessor.create_printlogo_image(drafted) if format_spec.is_thermal_printer \
+                    else ImageProcessor._process_standard_image(drafted, format_spec)
+                diff = ImageChops.difference(exact.convert('RGB'), fast.convert('RGB'))
+                self.assertLess(max(ImageStat.Stat(diff).mean), self.max_mean_error)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,113 @@
+import unittest
+from PIL import Image, ImageChops, ImageDraw
+import os
+import sys
+import tempfile
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.processors import resampling_dag
+from src.processors.fan_out import FanOutProcessor
+from src.processors.output_cache import OutputCache
+from src.processors.resampling_dag import QualityCheck, max_error, plan_parents, ssim
+from src.config import default_formats
+from test_resampling import create_detailed_image
+
+def create_text_image(width, height):
+    """Dense small text, where resampling twice visibly softens glyphs"""
+    image = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    for top in range(0, height, 14):
+        draw.text((0, top), "LogoCraft sample text 0123456789 " * (width // 150), fill=(0, 0, 0, 255))
+    return image
+
+class TestResamplingDAG(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.source = create_detailed_image(1600, 1200)
+
+    def tearDown(self):
+        resampling_dag.QUALITY_CHECK = QualityCheck()
+
+    def render_all(self, source):
+        renderer = FanOutProcessor(source)
+        renderer.plan(default_formats.values())
+        outputs = {key: renderer.render(spec) for key, spec in default_formats.items()}
+        return renderer, outputs
+
+    def test_plan(self):
+        """Smaller outputs should hang off the smallest output large enough to derive them"""
+        self.assertEqual(plan_parents([(300, 300), (136, 136), (140, 112), (155, 110), (256, 192)]), {
+            (136, 136): (300, 300),
+            (140, 112): (256, 192),
+            (155, 110): (256, 192),
+            (256, 192): None,
+            (300, 300): None,
+        })
+
+    def test_tiles_match_direct_resize(self):
+        """A tile rendered through a box should equal the same region of the full resize"""
+        full = self.source.resize((136, 136), Image.Resampling.LANCZOS)
+        scale_x, scale_y = 1600 / 136, 1200 / 136
+        tile = (64, 32, 96, 64)
+        direct = self.source.resize((32, 32), Image.Resampling.LANCZOS, box=(
+            tile[0] * scale_x, tile[1] * scale_y, tile[2] * scale_x, tile[3] * scale_y))
+        self.assertIsNone(ImageChops.difference(direct, full.crop(tile)).getbbox())
+
+    def test_derives_equivalent_outputs(self):
+        """Detailed logos should derive the small outputs, staying close to direct resampling"""
+        renderer, outputs = self.render_all(self.source)
+        self.assertEqual(sorted(renderer._dag.derived), [(136, 136), (140, 112), (155, 110)])
+        resampling_dag.QUALITY_CHECK = None
+        direct_renderer, direct = self.render_all(self.source)
+        self.assertEqual(direct_renderer._dag.derived, [])
+        for format_key in default_formats:
+            with self.subTest(format=format_key):
+                output, reference = outputs[format_key], direct[format_key]
+                self.assertGreater(ssim(output, reference), 0.995)
+                # The direct path's partial edge blocks can move single border pixels further
+                interior = (2, 2, output.width - 2, output.height - 2)
+                self.assertLessEqual(max_error(output.crop(interior), reference.crop(interior)), 8)
+
+    def test_rejects_unequivalent_outputs(self):
+        """Where deriving would soften detail, outputs should be resampled directly"""
+        text = create_text_image(1600, 1200)
+        renderer, outputs = self.render_all(text)
+        self.assertIn((136, 136), renderer._dag.rejected)
+        self.assertNotIn((136, 136), renderer._dag.derived)
+        direct = FanOutProcessor(text).render(default_formats['Smalllogo.png'])
+        self.assertIsNone(ImageChops.difference(outputs['Smalllogo.png'], direct).getbbox())
+
+    def test_process_all_plans(self):
+        """process_all should write every format through the DAG"""
+        renderer = FanOutProcessor(self.source)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            outputs = renderer.process_all(default_formats, temp_dir)
+            for format_key, format_spec in default_formats.items():
+                with Image.open(outputs[format_key]) as output:
+                    self.assertEqual(output.size, format_spec.dimensions)
+        self.assertTrue(renderer._dag.derived)
+
+    def test_cache_keys(self):
+        """Derived outputs should be cached apart from directly resampled ones"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = OutputCache(os.path.join(temp_dir, "cache"))
+            renderer = FanOutProcessor(self.source, cache, source_digest="source")
+            direct_key = renderer._cache_pipeline(default_formats['Smalllogo.png'])
+            renderer.plan(default_formats.values())
+            self.assertEqual(renderer._cache_pipeline(default_formats['Logo.png']), direct_key)
+            self.assertNotEqual(renderer._cache_pipeline(default_formats['Smalllogo.png']), direct_key)
+            resampling_dag.QUALITY_CHECK = None
+            self.assertEqual(renderer._cache_pipeline(default_formats['Smalllogo.png']), direct_key)
+
+    def test_metrics(self):
+        """Identical images should score perfectly, and a shifted copy should not"""
+        image = self.source.resize((64, 64))
+        self.assertEqual(max_error(image, image), 0)
+        self.assertAlmostEqual(ssim(image, image), 1.0)
+        shifted = image.transform(image.size, Image.Transform.AFFINE, (1, 0, 2, 0, 1, 0))
+        self.assertFalse(QualityCheck().passes(shifted, image))
+        self.assertTrue(QualityCheck(max_error=None, min_ssim=None).passes(shifted, image))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
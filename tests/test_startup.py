@@ -0,0 +1,68 @@
+import unittest
+from PIL import Image
+import os
+import sys
+import tempfile
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import benchmark_startup as startup
+from src.core import bounded_loading
+from src.core.lazy_import import optional_module
+
+class TestStartup(unittest.TestCase):
+    def test_headless_imports_skip_gui_numpy_and_logging_setup(self):
+        for module in ('src.processors', 'src.batch'):
+            self.assertEqual(startup.heavy_imports(module), [], module)
+        # Importing the library must not install handlers on the root logger
+        output = startup._run("import logging, src.processors, src.config; print(logging.getLogger().handlers)")
+        self.assertEqual(output, ['[]'])
+
+    def test_default_formats_are_compiled_on_first_use(self):
+        output = startup._run(
+            "from src.config import config_manager\n"
+            "print(config_manager._snapshot.version, config_manager._deferred_formats is not None)\n"
+            "print(sorted(config_manager.snapshot().formats), config_manager.snapshot().version)"
+        )
+        self.assertEqual(output[0], '0 True')
+        self.assertEqual(output[1], "['KDlogo.png', 'Logo.png', 'PRINTLOGO.bmp', 'RPTlogo.bmp', 'Smalllogo.png'] 1")
+
+    def test_publishing_replaces_deferred_formats(self):
+        output = startup._run(
+            "from src.config import config_manager\n"
+            "from src.core.config_manager import AppConfig\n"
+            "config_manager.defer_formats(lambda: 1 / 0)\n"
+            "config_manager.publish(AppConfig())\n"
+            "print(dict(config_manager.snapshot().formats), config_manager.snapshot().version)"
+        )
+        self.assertEqual(output, ['{} 1'])
+
+    def test_optional_module(self):
+        self.assertIsNone(optional_module('logocraft_not_installed'))
+        self.assertIs(optional_module('os'), os)
+        output = startup._run(
+            "import sys\n"
+            "from src.core.lazy_import import optional_module\n"
+            "np = optional_module('numpy')\n"
+            "print('numpy' in sys.modules, np.uint8(7) + 1, 'numpy' in sys.modules)"
+        )
+        self.assertEqual(output, ['False 8 True'])
+
+    def test_open_file_imports_only_the_named_plugin(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            tiff = os.path.join(temp_dir, 'logo.tiff')
+            misnamed = os.path.join(temp_dir, 'misnamed.tiff')
+            Image.new('RGB', (8, 8), (255, 0, 0)).save(tiff)
+            Image.new('RGB', (8, 8), (0, 255, 0)).save(misnamed, format='PNG')
+            with bounded_loading.open_file(misnamed) as image:
+                self.assertEqual(image.format, 'PNG')
+            output = startup._run(
+                "import sys\n"
+                "from src.core import bounded_loading\n"
+                f"image = bounded_loading.open_file({tiff!r})\n"
+                "print(image.format, image.getpixel((0, 0)), 'PIL.WebPImagePlugin' in sys.modules)"
+            )
+        self.assertEqual(output, ['TIFF (255, 0, 0) False'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+from unittest import mock
+from PIL import Image
+import os
+import sys
+import tempfile
+import time
+
+# Add project root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt6.QtWidgets import QApplication
+from src.core import bounded_loading
+from src.gui.preview_loader import PreviewLoader, to_qimage
+from src.processors import thumbnails
+from src.processors.thumbnails import ThumbnailCache, fit_size, render_thumbnail
+from test_resampling import create_detailed_image
+
+class TestThumbnails(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temp_dir.name, "thumbnails")
+        self.source = os.path.join(self.temp_dir.name, "logo.png")
+        create_detailed_image(900, 600).save(self.source)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_fit_size(self):
+        self.assertEqual(fit_size((900, 600), 200), (200, 133))
+        self.assertEqual(fit_size((600, 900), 200), (133, 200))
+        self.assertEqual(fit_size((100, 50), 200), (100, 50))
+
+    def test_jpeg_sources_use_draft_decoding(self):
+        jpeg = os.path.join(self.temp_dir.name, "photo.jpg")
+        create_detailed_image(2400, 1600).convert('RGB').save(jpeg, quality=90)
+        decoded_sizes = []
+        def load_bounded(image, *args):
+            decoded_sizes.append(image.size)
+            return image
+        with mock.patch.object(bounded_loading, 'load_bounded', side_effect=load_bounded):
+            thumbnail = render_thumbnail(jpeg, 200)
+        self.assertEqual(thumbnail.size, (200, 133))
+        self.assertEqual(thumbnail.mode, 'RGBA')
+        # Decoded at 1/4 scale, the smallest that still covers the thumbnail with the reducing gap
+        self.assertEqual(decoded_sizes, [(600, 400)])
+
+    def test_large_raw_sources_are_reduced_while_decoding(self):
+        bmp = os.path.join(self.temp_dir.name, "scan.bmp")
+        create_detailed_image(3000, 2000).convert('RGB').save(bmp)
+        with mock.patch.object(thumbnails, 'DECODE_CEILING', 4 * 1024 * 1024), \
+                mock.patch.object(bounded_loading, '_read_band', wraps=bounded_loading._read_band) as read_band:
+            thumbnail = render_thumbnail(bmp, 200)
+        self.assertGreater(read_band.call_count, 1)
+        self.assertEqual(thumbnail.size, (200, 133))
+
+    def test_memory_then_disk_cache(self):
+        cache = ThumbnailCache(self.cache_dir)
+        self.assertIsNone(cache.cached(self.source, 200))
+        first = cache.get(self.source, 200)
+        self.assertEqual(first.size, (200, 133))
+        self.assertIs(cache.cached(self.source, 200), first)
+        self.assertIs(cache.get(self.source, 200), first)
+
+        # A fresh cache (a restarted app) reads the thumbnail from disk without decoding the source
+        with mock.patch.object(thumbnails, 'render_thumbnail', side_effect=AssertionError("decoded again")):
+            from_disk = ThumbnailCache(self.cache_dir).get(self.source, 200)
+        self.assertEqual(from_disk.tobytes(), first.tobytes())
+
+    def test_changed_sources_are_rendered_again(self):
+        cache = ThumbnailCache(self.cache_dir)
+        before = cache.get(self.source, 200)
+        Image.new('RGBA', (90, 60), (0, 0, 255, 255)).save(self.source)
+        stat = os.stat(self.source)
+        os.utime(self.source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        after = cache.get(self.source, 200)
+        self.assertEqual(after.size, (90, 60))
+        self.assertNotEqual(after.size, before.size)
+
+    def test_memory_cache_is_bounded(self):
+        cache = ThumbnailCache(capacity=2)
+        sources = []
+        for index in range(3):
+            path = os.path.join(self.temp_dir.name, f"logo{index}.png")
+            Image.new('RGB', (50 + index, 50)).save(path)
+            sources.append(path)
+            cache.get(path, 100)
+        self.assertIsNone(cache.cached(sources[0], 100))
+        self.assertIsNotNone(cache.cached(sources[2], 100))
+
+    def test_preview_loader_delivers_asynchronously_then_instantly(self):
+        app = QApplication.instance() or QApplication([])
+        loader = PreviewLoader(200, ThumbnailCache(self.cache_dir))
+        ready = []
+        loader.signals.ready.connect(lambda path, image: ready.append((path, image.width(), image.height())))
+        self.assertFalse(loader.request(self.source))
+        deadline = time.monotonic() + 10
+        while not ready and time.monotonic() < deadline:
+            app.processEvents()
+            time.sleep(0.01)
+        self.assertEqual(ready, [(self.source, 200, 133)])
+        self.assertTrue(loader.request(self.source))
+        self.assertEqual(len(ready), 2)
+
+    def test_to_qimage_owns_its_pixels(self):
+        image = create_detailed_image(301, 157).convert('RGBA')
+        image.putpixel((300, 156), (1, 2, 3, 4))
+        expected = image.copy()
+        qimage = to_qimage(image)
+        del image
+        self.assertEqual(qimage.bytesPerLine(), 301 * 4)
+        self.assertEqual(qimage.bits().asstring(qimage.sizeInBytes()), expected.tobytes())
+        self.assertEqual(to_qimage(expected.convert('RGB')).pixelColor(300, 156).getRgb(), (1, 2, 3, 255))
+
+if __name__ == '__main__':
+    unittest.main()
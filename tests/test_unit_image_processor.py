@@ -1,5 +1,5 @@
 import unittest
-from PIL import Image
+from PIL import Image, ImageChops
 import os
 import sys
 import tempfile
@@ -8,6 +8,7 @@ import shutil
 # Add project root to path to import from src
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.processors.image_processor import ImageProcessor
+from src.core.image_format import OutputFormat
 
 class TestImageProcessor(unittest.TestCase):
     @classmethod
@@ -140,5 +141,58 @@ class TestImageProcessor(unittest.TestCase):
         with self.assertRaises(Exception):
             ImageProcessor.convert_printlogo_to_bmp_specs("nonexistent.png", "output.bmp")
 
+class TestPrintlogoRegression(unittest.TestCase):
+    """Compare the in-memory PRINTLOGO pipeline against the reference BMPs.
+
+    References and sources live in tests/reference, which no test writes to;
+    test_image_formats.py regenerates tests/output and tests/test_images.
+    """
+    reference_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reference")
+    input_dir = os.path.join(reference_dir, "sources")
+    # Reference file -> source image it was generated from
+    reference_inputs = {
+        'printlogo_100x100.bmp': 'test_100x100.png',
+        'printlogo_123x456.bmp': 'test_123x456.png',
+        'printlogo_200x400.bmp': 'test_200x400.png',
+        'printlogo_200x800.bmp': 'test_200x800.png',
+        'printlogo_300x300.bmp': 'test_300x300.jpeg',
+        'printlogo_300x600.bmp': 'test_300x600.png',
+        'printlogo_400x200.bmp': 'test_400x200.png',
+        'printlogo_400x300.bmp': 'test_400x300.bmp',
+        'printlogo_500x500.bmp': 'test_500x500.png',
+        'printlogo_600x300.bmp': 'test_600x300.png',
+        'printlogo_800x200.bmp': 'test_800x200.png',
+        'printlogo_999x111.bmp': 'test_999x111.png',
+    }
+
+    def assertSamePixels(self, actual, expected, name):
+        self.assertEqual(actual.size, expected.size, name)
+        diff = ImageChops.difference(actual.convert('RGB'), expected.convert('RGB'))
+        self.assertIsNone(diff.getbbox(), f"Pixel mismatch for {name}")
+
+    def test_create_printlogo_image_matches_reference(self):
+        """In-memory PRINTLOGO output should match the reference BMPs pixel for pixel"""
+        for reference_name, input_name in self.reference_inputs.items():
+            with self.subTest(reference=reference_name):
+                with Image.open(os.path.join(self.input_dir, input_name)) as source, \
+                        Image.open(os.path.join(self.reference_dir, reference_name)) as reference:
+                    result = ImageProcessor.create_printlogo_image(source)
+                    self.assertEqual(result.mode, 'RGB')
+                    self.assertSamePixels(result, reference, reference_name)
+
+    def test_process_image_thermal_matches_reference(self):
+        """process_image should write the same PRINTLOGO pixels without a temp file round trip"""
+        format_spec = OutputFormat(dimensions=(600, 256), mode='RGB', format='BMP', is_thermal_printer=True)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for reference_name, input_name in self.reference_inputs.items():
+                with self.subTest(reference=reference_name):
+                    output_path = os.path.join(temp_dir, reference_name)
+                    source = ImageProcessor.load_image(os.path.join(self.input_dir, input_name))
+                    ImageProcessor.process_image(source, format_spec, output_path)
+                    with Image.open(output_path) as result, \
+                            Image.open(os.path.join(self.reference_dir, reference_name)) as reference:
+                        self.assertAlmostEqual(result.info['dpi'][0], 203, delta=1)
+                        self.assertSamePixels(result, reference, reference_name)
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)